@@ -1,15 +1,20 @@
 import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 from punq import Container
 
 from application.api.exception_handlers import exception_registry
+from application.api.v1.stats.handlers import router as stats_router
 from application.api.v1.users.handlers import router
 from application.external_events.consumers.base import BaseConsumer
+from infrastructure.cache.base import BaseUserRepositoryCacher
+from infrastructure.outbox.base import BaseOutboxRelay
 from infrastructure.producers.base import BaseProducer
+from infrastructure.storages.s3.base import BaseS3Client
+from service.message_bus import EventDispatcher
 from settings.container import initialize_container
 from settings.config import settings
 
@@ -25,19 +30,38 @@ async def lifespan(app: FastAPI):
     container: Container = initialize_container()
     consumer: BaseConsumer = container.resolve(BaseConsumer)
     producer: BaseProducer = container.resolve(BaseProducer)
+    s3_client: BaseS3Client = container.resolve(BaseS3Client)
+    user_cacher: BaseUserRepositoryCacher = container.resolve(BaseUserRepositoryCacher)
+    outbox_relay: BaseOutboxRelay = container.resolve(BaseOutboxRelay)
+    event_dispatcher: EventDispatcher = container.resolve(EventDispatcher)
+
+    await s3_client.start()
+    await user_cacher.start()
 
     await consumer.start()
     consume_task = asyncio.create_task(consumer.consume())
 
     await producer.start()
+    if settings.USER_SERVICE_OUTBOX_ENABLED:
+        await outbox_relay.start()
+    if settings.MESSAGE_BUS_ASYNC_DISPATCH:
+        await event_dispatcher.start()
 
     yield
 
-    await producer.stop()
-
     consume_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await consume_task
     await consumer.stop()
 
+    # drained before the producer closes, since the queued events are published through it
+    await event_dispatcher.stop()
+    await outbox_relay.stop()
+    await producer.stop()
+
+    await user_cacher.stop()
+    await s3_client.stop()
+
 
 def create_app():
     app = FastAPI(
@@ -49,6 +73,8 @@ def create_app():
         default_response_class=ORJSONResponse,
     )
     app.include_router(router, prefix=settings.USER_SERVICE_API_PREFIX)
+    if settings.USER_SERVICE_API_STATS_ENABLED:
+        app.include_router(stats_router, prefix=settings.USER_SERVICE_API_PREFIX)
     exception_registry(app)
 
     return app
@@ -0,0 +1,34 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from punq import Container
+
+from application.api.v1.users.handlers import get_current_user_id
+from application.external_events.consumers.base import BaseConsumer
+from infrastructure.cache.base import BaseUserRepositoryCacher
+from infrastructure.outbox.base import BaseOutboxRelay
+from infrastructure.producers.base import BaseProducer
+from service.message_bus import EventDispatcher, HandlerTimings
+from settings.container import initialize_container
+
+
+router = APIRouter(
+    tags=['Stats'],
+    prefix='/stats',
+    include_in_schema=False,
+    dependencies=[Depends(get_current_user_id)],
+)
+
+
+@router.get('/')
+async def get_stats(
+    container: Annotated[Container, Depends(initialize_container)],
+) -> dict:
+    return {
+        'handlers': container.resolve(HandlerTimings).stats(),
+        'event_dispatch': container.resolve(EventDispatcher).stats(),
+        'user_cache': container.resolve(BaseUserRepositoryCacher).stats(),
+        'consumer': container.resolve(BaseConsumer).stats(),
+        'outbox': container.resolve(BaseOutboxRelay).stats(),
+        'producer': container.resolve(BaseProducer).stats(),
+    }
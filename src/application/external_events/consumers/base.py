@@ -18,6 +18,9 @@ class BaseConsumer(ABC):
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.stop()
 
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {}
+
     @abstractmethod
     async def start(self):
         ...
@@ -1,9 +1,13 @@
+import asyncio
+import itertools
 import logging
+import zlib
+from collections.abc import Callable
 from dataclasses import dataclass, field
 
 import orjson
 
-from aio_pika import connect_robust
+from aio_pika import DeliveryMode, Message, connect_robust
 from aio_pika.abc import (
     AbstractRobustConnection,
     AbstractRobustChannel,
@@ -14,10 +18,19 @@ from aio_pika.abc import (
 )
 
 from application.external_events.consumers.base import BaseConsumer
+from application.external_events.handlers.base import BaseExternalEventHandler, BaseBatchExternalEventHandler
+from infrastructure.converters.events import SCHEMA_VERSION_HEADER
+from infrastructure.exception.messages import MessageInProgressException
+from infrastructure.idempotency.base import BaseIdempotencyStore
+from settings.config import settings
 
 
 logger = logging.getLogger(__name__)
 
+ATTEMPT_HEADER = 'x-attempt'
+ORIGINAL_ROUTING_KEY_HEADER = 'x-original-routing-key'
+ERROR_HEADER = 'x-error'
+
 
 @dataclass
 class RabbitMQConsumer(BaseConsumer):
@@ -33,6 +46,22 @@ class RabbitMQConsumer(BaseConsumer):
     channel: AbstractRobustChannel | None = None
     exchange: AbstractRobustExchange | None = None
     queue: AbstractRobustQueue | None = None
+    prefetch_count: int = settings.USER_SERVICE_CONSUMER_PREFETCH_COUNT
+    workers: int = settings.USER_SERVICE_CONSUMER_WORKERS
+    external_events_map_factory: Callable[[], dict[str, BaseExternalEventHandler]] | None = None
+    batch_size: int = settings.USER_SERVICE_CONSUMER_BATCH_SIZE
+    batch_timeout_ms: int = settings.USER_SERVICE_CONSUMER_BATCH_TIMEOUT_MS
+    partition_key: str = settings.USER_SERVICE_CONSUMER_PARTITION_KEY
+    hash_partition: int | None = settings.USER_SERVICE_CONSUMER_HASH_PARTITION
+    hash_header: str = settings.USER_SERVICE_CONSUMER_HASH_HEADER
+    hash_exchange: AbstractRobustExchange | None = None
+    unpartitioned_messages: int = field(default=0, init=False)
+    unkeyed_lanes: itertools.count = field(default_factory=itertools.count)
+    idempotency_store: BaseIdempotencyStore | None = None
+    max_attempts: int = settings.USER_SERVICE_CONSUMER_MAX_ATTEMPTS
+    shutdown_timeout_seconds: float = settings.USER_SERVICE_CONSUMER_SHUTDOWN_TIMEOUT_SECONDS
+    retry_base_delay_ms: int = settings.USER_SERVICE_CONSUMER_RETRY_BASE_DELAY_MS
+    in_progress_delay_ms: int = settings.IDEMPOTENCY_IN_PROGRESS_SECONDS * 1000
 
     async def start(self):
         self.connection = await connect_robust(
@@ -43,26 +72,107 @@ class RabbitMQConsumer(BaseConsumer):
             virtual_host=self.virtual_host,
         )
         self.channel = await self.connection.channel()
+        await self.channel.set_qos(prefetch_count=max(self.prefetch_count, self.batch_size))
         self.exchange = await self.channel.declare_exchange(
             self.exchange_name,
             ExchangeType.TOPIC,
             durable=True,
         )
-        self.queue = await self.channel.declare_queue(
-            self.queue_name,
+        if self.hash_partition is not None:
+            await self.declare_hash_partition()
+        else:
+            self.queue = await self.channel.declare_queue(
+                self.queue_name,
+                durable=True,
+            )
+            for key in self.consuming_topics:
+                await self.queue.bind(self.exchange, routing_key=key)
+                logger.info(
+                    'Queue %(queue)s bound to routing key %(routing_key)s.',
+                    {
+                        'queue': self.queue.name,
+                        'routing_key': key,
+                    },
+                )
+
+        await self.declare_retry_queues()
+        if self.idempotency_store:
+            await self.idempotency_store.start()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        stats = {}
+        if self.idempotency_store:
+            stats['idempotency'] = self.idempotency_store.stats()
+        if self.hash_partition is not None:
+            stats['partitioning'] = {'unpartitioned_messages': self.unpartitioned_messages}
+        return stats
+
+    async def declare_hash_partition(self):
+        # needs the rabbitmq_consistent_hash_exchange plugin; a user's messages only share a partition when their
+        # publisher sets the hash header to the user id, which RabbitMQ cannot enforce
+        self.hash_exchange = await self.channel.declare_exchange(
+            f'{self.queue_name}.{self.hash_header}-hash',
+            ExchangeType.X_CONSISTENT_HASH,
             durable=True,
+            arguments={'hash-header': self.hash_header},
         )
         for key in self.consuming_topics:
-            await self.queue.bind(self.exchange, routing_key=key)
-            logger.info(
-                'Queue %(queue)s bound to routing key %(routing_key)s.',
-                {
-                    'queue': self.queue.name,
-                    'routing_key': key,
+            await self.hash_exchange.bind(self.exchange, routing_key=key)
+
+        self.queue = await self.channel.declare_queue(
+            f'{self.queue_name}.{self.hash_partition}',
+            durable=True,
+        )
+        await self.queue.bind(self.hash_exchange, routing_key='1')
+        logger.info(
+            'Queue %(queue)s bound to consistent-hash exchange %(exchange)s.',
+            {
+                'queue': self.queue.name,
+                'exchange': self.hash_exchange.name,
+            },
+        )
+
+    async def declare_retry_queues(self):
+        # delay queues have no consumers, an expired message is dead-lettered back onto the consumed queue
+        for attempt in range(1, self.max_attempts):
+            await self.channel.declare_queue(
+                self.get_retry_queue_name(attempt),
+                durable=True,
+                arguments={
+                    'x-message-ttl': self.get_retry_delay_ms(attempt),
+                    'x-dead-letter-exchange': '',
+                    'x-dead-letter-routing-key': self.queue.name,
                 },
             )
+        await self.channel.declare_queue(
+            self.in_progress_queue_name,
+            durable=True,
+            arguments={
+                'x-message-ttl': self.in_progress_delay_ms,
+                'x-dead-letter-exchange': '',
+                'x-dead-letter-routing-key': self.queue.name,
+            },
+        )
+        await self.channel.declare_queue(self.dead_letter_queue_name, durable=True)
+
+    def get_retry_delay_ms(self, attempt: int) -> int:
+        return self.retry_base_delay_ms * 2 ** (attempt - 1)
+
+    def get_retry_queue_name(self, attempt: int) -> str:
+        # the delay is part of the name, since RabbitMQ refuses to redeclare a queue with a different TTL
+        return f'{self.queue.name}.retry.{self.get_retry_delay_ms(attempt)}ms'
+
+    @property
+    def in_progress_queue_name(self) -> str:
+        return f'{self.queue.name}.in-progress.{self.in_progress_delay_ms}ms'
+
+    @property
+    def dead_letter_queue_name(self) -> str:
+        return f'{self.queue.name}.dead-letter'
 
     async def stop(self):
+        if self.idempotency_store:
+            await self.idempotency_store.stop()
         if self.channel:
             await self.channel.close()
         if self.connection:
@@ -72,20 +182,317 @@ class RabbitMQConsumer(BaseConsumer):
         if not self.connection:
             await self.start()
 
+        if self.batch_size > 1:
+            await self.consume_batches()
+            return
+
+        if self.workers <= 1:
+            async with self.queue.iterator() as queue_iter:
+                async for message in queue_iter:
+                    await self.settle_message(message)
+            return
+
+        logger.info('Consuming with %d lanes and prefetch count %d', self.workers, self.prefetch_count)
+        lane_size = max(self.prefetch_count // self.workers, 1)
+        lanes = [asyncio.Queue(maxsize=lane_size) for _ in range(self.workers)]
+        worker_tasks = [
+            asyncio.create_task(self.work(lane, self.get_worker_external_events_map()))
+            for lane in lanes
+        ]
+        try:
+            async with self.queue.iterator() as queue_iter:
+                async for message in queue_iter:
+                    body = self.decode_body(message)
+                    await lanes[self.get_lane(body, len(lanes))].put((message, body))
+        finally:
+            await self.drain_lanes(lanes)
+            for task in worker_tasks:
+                task.cancel()
+            await asyncio.gather(*worker_tasks, return_exceptions=True)
+
+    async def drain_lanes(self, lanes: list[asyncio.Queue]):
+        try:
+            await asyncio.wait_for(asyncio.gather(*(lane.join() for lane in lanes)), self.shutdown_timeout_seconds)
+        except TimeoutError:
+            logger.warning(
+                'Lanes not drained within %ss, leaving %d messages to be redelivered',
+                self.shutdown_timeout_seconds,
+                sum(lane.qsize() for lane in lanes),
+            )
+
+    async def consume_batches(self):
+        logger.info('Consuming in batches of up to %d messages or %dms', self.batch_size, self.batch_timeout_ms)
+        loop = asyncio.get_running_loop()
         async with self.queue.iterator() as queue_iter:
-            async for message in queue_iter:
-                async with message.process():
-                    await self.process_message(message)
+            while True:
+                batch = [await anext(queue_iter)]
+                deadline = loop.time() + self.batch_timeout_ms / 1000
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(anext(queue_iter), timeout))
+                    except TimeoutError:
+                        break
+
+                await self.process_batch(batch)
+                await self.ack_batch(batch)
+
+    @staticmethod
+    async def ack_batch(batch: list[AbstractIncomingMessage]):
+        unsettled = [message for message in batch if not message.processed]
+        if unsettled:
+            await unsettled[-1].ack(multiple=True)
+
+    async def replay_dead_letters(self, limit: int | None = None, batch_size: int = 100) -> int:
+        if not self.connection:
+            await self.start()
+
+        dead_letter_queue = await self.channel.declare_queue(self.dead_letter_queue_name, durable=True)
+        # only the messages there now, so the ones failing again are not picked up twice
+        pending = dead_letter_queue.declaration_result.message_count
+        if limit is not None:
+            pending = min(pending, limit)
+        logger.info('Replaying %d messages from %s', pending, self.dead_letter_queue_name)
+
+        replayed = 0
+        while replayed < pending:
+            batch = []
+            while len(batch) < min(batch_size, pending - replayed):
+                message = await dead_letter_queue.get(fail=False)
+                if message is None:
+                    break
+                batch.append(message)
+
+            if not batch:
+                break
+
+            await self.process_batch(batch)
+            await self.ack_batch(batch)
+            replayed += len(batch)
+
+        logger.info('Replayed %d messages from %s', replayed, self.dead_letter_queue_name)
+        return replayed
+
+    async def process_batch(self, batch: list[AbstractIncomingMessage]):
+        groups: dict[str, list[tuple[AbstractIncomingMessage, dict | None]]] = {}
+        for message in batch:
+            self.check_hash_header(message)
+            groups.setdefault(self.get_routing_key(message), []).append((message, self.decode_body(message)))
 
-    async def process_message(self, message: AbstractIncomingMessage):
+        for routing_key, messages in groups.items():
+            handler = self.external_events_map.get(routing_key)
+            bodies = [body for _, body in messages]
+            if isinstance(handler, BaseBatchExternalEventHandler) and len(messages) > 1 and None not in bodies:
+                keys = []
+                claimed = []
+                for message, body in messages:
+                    key = self.get_message_key(message, body)
+                    if key is None or self.idempotency_store is None:
+                        claimed.append((message, body))
+                    elif await self.claim_message(message, key):
+                        keys.append(key)
+                        claimed.append((message, body))
+
+                if not claimed:
+                    continue
+
+                try:
+                    await handler.handle_batch(
+                        [handler.decode(body, self.get_schema_version(message)) for message, body in claimed]
+                    )
+                    for key in keys:
+                        await self.idempotency_store.complete(key)
+                    logger.debug('Processed batch of %d messages with routing key %s', len(claimed), routing_key)
+                    continue
+                except BaseException as e:
+                    for key in keys:
+                        await self.idempotency_store.release(key)
+                    if not isinstance(e, Exception):
+                        raise
+                    messages = claimed
+                    logger.warning(
+                        'Batch of %d messages with routing key %s failed, processing one by one: %s',
+                        len(messages),
+                        routing_key,
+                        str(e),
+                        exc_info=True,
+                    )
+
+            for message, body in messages:
+                await self.process_message(message, body=body)
+
+    def check_hash_header(self, message: AbstractIncomingMessage):
+        if self.hash_partition is None or (message.headers or {}).get(self.hash_header):
+            return
+
+        self.unpartitioned_messages += 1
+        logger.warning(
+            'Message %s with routing key %s has no %s header, so it is not partitioned by user',
+            message.message_id,
+            self.get_routing_key(message),
+            self.hash_header,
+        )
+
+    def get_lane(self, body: dict | None, lanes_count: int) -> int:
+        # messages of one user always share a lane, so they are handled in delivery order
+        key = body.get(self.partition_key) if isinstance(body, dict) else None
+        if key is None:
+            return next(self.unkeyed_lanes) % lanes_count
+        return zlib.crc32(str(key).encode()) % lanes_count
+
+    def get_worker_external_events_map(self) -> dict[str, BaseExternalEventHandler]:
+        # each worker needs its own message bus, since a unit of work holds one session at a time
+        if self.external_events_map_factory:
+            return self.external_events_map_factory()
+        return self.external_events_map
+
+    async def work(
+        self,
+        lane: asyncio.Queue[tuple[AbstractIncomingMessage, dict | None]],
+        external_events_map: dict[str, BaseExternalEventHandler],
+    ):
+        while True:
+            message, body = await lane.get()
+            try:
+                await self.settle_message(message, external_events_map, body)
+            finally:
+                lane.task_done()
+
+    async def settle_message(
+        self,
+        message: AbstractIncomingMessage,
+        external_events_map: dict[str, BaseExternalEventHandler] | None = None,
+        body: dict | None = None,
+    ):
+        # requeued if cancelled midway; a failed ack must not end the consuming loop
+        self.check_hash_header(message)
         try:
-            handler = self.external_events_map.get(message.routing_key)
-            await handler(orjson.loads(message.body)) if handler else (
-                logger.info('No handler found for message with routing key: %s', message.routing_key)
+            async with message.process(requeue=True, ignore_processed=True):
+                await self.process_message(message, external_events_map, body)
+        except Exception as e:
+            logger.exception(
+                'Failed to settle message(%(body)s)',
+                {'body': message.body},
+                exc_info=e,
             )
+
+    @staticmethod
+    def decode_body(message: AbstractIncomingMessage) -> dict | None:
+        try:
+            return orjson.loads(message.body)
+        except orjson.JSONDecodeError:
+            return None
+
+    @staticmethod
+    def get_routing_key(message: AbstractIncomingMessage) -> str:
+        # retried messages come back through the default exchange, so their topic travels in a header
+        return (message.headers or {}).get(ORIGINAL_ROUTING_KEY_HEADER, message.routing_key)
+
+    @staticmethod
+    def get_schema_version(message: AbstractIncomingMessage) -> int | None:
+        version = (message.headers or {}).get(SCHEMA_VERSION_HEADER)
+        return int(version) if version is not None else None
+
+    @staticmethod
+    def get_attempt(message: AbstractIncomingMessage) -> int:
+        return int((message.headers or {}).get(ATTEMPT_HEADER, 1))
+
+    def get_message_key(self, message: AbstractIncomingMessage, body: dict | None) -> str | None:
+        message_id = message.message_id or (body.get('event_id') if isinstance(body, dict) else None)
+        if not message_id:
+            return None
+        return f'{self.get_routing_key(message)}:{message_id}'
+
+    async def process_message(
+        self,
+        message: AbstractIncomingMessage,
+        external_events_map: dict[str, BaseExternalEventHandler] | None = None,
+        body: dict | None = None,
+    ):
+        if external_events_map is None:
+            external_events_map = self.external_events_map
+
+        key = None
+        if self.idempotency_store:
+            key = self.get_message_key(message, body if body is not None else self.decode_body(message))
+            if key and not await self.claim_message(message, key):
+                return
+
+        try:
+            routing_key = self.get_routing_key(message)
+            handler = external_events_map.get(routing_key)
+            if handler:
+                body = body if body is not None else orjson.loads(message.body)
+                await handler(handler.decode(body, self.get_schema_version(message)))
+            else:
+                logger.info('No handler found for message with routing key: %s', routing_key)
         except Exception as e:
+            if key:
+                await self.idempotency_store.release(key)
             logger.exception(
                 'Error processing message(%(body)s)',
                 {'body': message.body},
                 exc_info=e,
             )
+            await self.retry_message(message, e)
+            return
+        except BaseException:
+            # cancelled or interrupted before finishing, so a redelivery must not be taken for a duplicate
+            if key:
+                await self.idempotency_store.release(key)
+            raise
+
+        if key:
+            await self.idempotency_store.complete(key)
+
+    async def claim_message(self, message: AbstractIncomingMessage, key: str) -> bool:
+        try:
+            return await self.idempotency_store.claim(key)
+        except MessageInProgressException as e:
+            # not a failed attempt: the marker of a crashed consumer has expired by the time the message is back
+            logger.info(
+                'Message \'%s\' is still being processed elsewhere, checking it again in %dms',
+                key,
+                self.in_progress_delay_ms,
+            )
+            await self.park_message(message, self.in_progress_queue_name, e, self.get_attempt(message))
+            return False
+
+    async def retry_message(self, message: AbstractIncomingMessage, error: Exception):
+        attempt = self.get_attempt(message)
+        if attempt >= self.max_attempts or isinstance(error, orjson.JSONDecodeError):
+            queue_name = self.dead_letter_queue_name
+            logger.warning('Dead-lettering message %s after %d attempts', message.message_id, attempt)
+        else:
+            queue_name = self.get_retry_queue_name(attempt)
+            logger.info(
+                'Retrying message %s in %dms (attempt %d of %d)',
+                message.message_id,
+                self.get_retry_delay_ms(attempt),
+                attempt + 1,
+                self.max_attempts,
+            )
+        await self.park_message(message, queue_name, error, attempt + 1)
+
+    async def park_message(self, message: AbstractIncomingMessage, queue_name: str, error: Exception, attempt: int):
+        try:
+            await self.channel.default_exchange.publish(
+                Message(
+                    body=message.body,
+                    headers={
+                        **(message.headers or {}),
+                        ATTEMPT_HEADER: attempt,
+                        ORIGINAL_ROUTING_KEY_HEADER: self.get_routing_key(message),
+                        ERROR_HEADER: repr(error)[:255],
+                    },
+                    content_type=message.content_type,
+                    message_id=message.message_id,
+                    delivery_mode=DeliveryMode.PERSISTENT,
+                ),
+                routing_key=queue_name,
+            )
+        except Exception as e:
+            logger.critical('Failed to park message %s, requeueing it: %s', message.message_id, str(e), exc_info=True)
+            await message.nack(requeue=True)
@@ -0,0 +1,7 @@
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class BaseExternalEvent:
+    # body of a message published by another service, decoded into typed fields
+    ...
@@ -0,0 +1,23 @@
+from dataclasses import dataclass
+from uuid import UUID
+
+from application.external_events.events.base import BaseExternalEvent
+from domain.entities.users import UserCredentialsStatus
+
+
+@dataclass(slots=True)
+class UserCredentialsCreatedExternalEvent(BaseExternalEvent):
+    user_id: UUID
+    status: UserCredentialsStatus
+
+
+@dataclass(slots=True)
+class UserEmailUpdatedExternalEvent(BaseExternalEvent):
+    user_id: UUID
+    new_email: str
+
+
+@dataclass(slots=True)
+class UserPhoneNumberUpdatedExternalEvent(BaseExternalEvent):
+    user_id: UUID
+    new_phone_number: str
@@ -1,13 +1,36 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from typing import Any, ClassVar
 
+from application.external_events.events.base import BaseExternalEvent
+from infrastructure.converters.events import EventDecoder
 from service.message_bus import MessageBus
 
 
 @dataclass
 class BaseExternalEventHandler(ABC):
     bus: MessageBus
+    # handlers naming an event type are called with it, decoded once per message; others get the raw body
+    event_type: ClassVar[type[BaseExternalEvent] | None] = None
+    decoder: ClassVar[EventDecoder | None] = None
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.event_type is not None and (cls.decoder is None or cls.decoder.event_type is not cls.event_type):
+            cls.decoder = EventDecoder.build(cls.event_type)
+
+    def decode(self, body: Any, version: int | None = None) -> Any:
+        if self.decoder is None:
+            return body
+        return self.decoder.decode(body, version)
+
+    @abstractmethod
+    async def __call__(self, event: Any) -> None:
+        ...
+
+
+@dataclass
+class BaseBatchExternalEventHandler(BaseExternalEventHandler):
     @abstractmethod
-    async def __call__(self, body: dict) -> None:
+    async def handle_batch(self, events: list[Any]) -> None:
         ...
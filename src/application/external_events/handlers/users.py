@@ -1,56 +1,54 @@
 from dataclasses import dataclass
-from uuid import UUID
 
-from application.external_events.handlers.base import BaseExternalEventHandler
+from application.external_events.events.users import (
+    UserCredentialsCreatedExternalEvent,
+    UserEmailUpdatedExternalEvent,
+    UserPhoneNumberUpdatedExternalEvent,
+)
+from application.external_events.handlers.base import BaseExternalEventHandler, BaseBatchExternalEventHandler
 from domain.commands.users import UpdateUserCredentialsStatusCommand, UpdateUserEmailCommand, \
-    UpdateUserPhoneNumberCommand
-from domain.entities.users import UserCredentialsStatus
+    UpdateUserPhoneNumberCommand, UpdateUserCredentialsStatusManyCommand
 from domain.value_objects.users import EmailVO, PhoneNumberVO
-from service.handlers.event.users import UserRegistrationCompletedEvent
 
 
 @dataclass
-class UserCredentialsCreatedExternalEventHandler(BaseExternalEventHandler):
-    async def __call__(self, body: dict) -> None:
+class UserCredentialsCreatedExternalEventHandler(BaseBatchExternalEventHandler):
+    event_type = UserCredentialsCreatedExternalEvent
+
+    async def __call__(self, event: UserCredentialsCreatedExternalEvent) -> None:
         await self.bus.handle(
             UpdateUserCredentialsStatusCommand(
-                user_id=UUID(body['user_id']),
-                status=UserCredentialsStatus(body['status']),
-            )
-        )
-        user = await self.bus.uow.users.get(UUID(body['user_id']))
-        await self.bus.handle(
-            UserRegistrationCompletedEvent(
-                user_id=user.id,
-                created_at=user.created_at,
-                photo=user.photo,
-                email=user.email.as_generic() if user.email else None,
-                phone_number=user.phone_number.as_generic() if user.phone_number else None,
-                first_name=user.first_name.as_generic() if user.first_name else None,
-                last_name=user.last_name.as_generic() if user.last_name else None,
-                middle_name=user.middle_name.as_generic() if user.middle_name else None,
-                credentials_status=user.credentials_status,
+                user_id=event.user_id,
+                status=event.status,
             )
         )
 
+    async def handle_batch(self, events: list[UserCredentialsCreatedExternalEvent]) -> None:
+        statuses = {event.user_id: event.status for event in events}
+        await self.bus.handle(UpdateUserCredentialsStatusManyCommand(statuses=statuses))
+
 
 @dataclass
 class UserEmailUpdatedExternalEventHandler(BaseExternalEventHandler):
-    async def __call__(self, body: dict) -> None:
+    event_type = UserEmailUpdatedExternalEvent
+
+    async def __call__(self, event: UserEmailUpdatedExternalEvent) -> None:
         await self.bus.handle(
             UpdateUserEmailCommand(
-                user_id=UUID(body['user_id']),
-                new_email=EmailVO(body['new_email']),
+                user_id=event.user_id,
+                new_email=EmailVO(event.new_email),
             )
         )
 
 
 @dataclass
 class UserPhoneNumberUpdatedExternalEventHandler(BaseExternalEventHandler):
-    async def __call__(self, body: dict) -> None:
+    event_type = UserPhoneNumberUpdatedExternalEvent
+
+    async def __call__(self, event: UserPhoneNumberUpdatedExternalEvent) -> None:
         await self.bus.handle(
             UpdateUserPhoneNumberCommand(
-                user_id=UUID(body['user_id']),
-                new_phone_number=PhoneNumberVO(body['new_phone_number']),
+                user_id=event.user_id,
+                new_phone_number=PhoneNumberVO(event.new_phone_number),
             )
         )
@@ -0,0 +1,48 @@
+import argparse
+import asyncio
+import logging
+
+from application.external_events.consumers.base import BaseConsumer
+from application.external_events.consumers.rabbitmq import RabbitMQConsumer
+from infrastructure.producers.base import BaseProducer
+from infrastructure.producers.rabbitmq import RabbitMQProducer
+from settings.config import settings
+from settings.container import initialize_container
+
+
+logger = logging.getLogger(__name__)
+
+
+async def replay_dead_letters(limit: int | None, batch_size: int) -> int:
+    container = initialize_container()
+    # the running app owns the spool, so events published from here go straight to RabbitMQ
+    producer: BaseProducer = container.resolve(RabbitMQProducer)
+    container.register(BaseProducer, instance=producer)
+    consumer: BaseConsumer = container.resolve(BaseConsumer)
+
+    if not isinstance(consumer, RabbitMQConsumer):
+        raise TypeError(f'{consumer.__class__.__name__} has no dead-letter queue')
+
+    await producer.start()
+    try:
+        async with consumer:
+            return await consumer.replay_dead_letters(limit=limit, batch_size=batch_size)
+    finally:
+        await producer.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Drains the consumer\'s dead-letter queue back through the external event handlers.',
+    )
+    parser.add_argument('--limit', type=int, default=None, help='replay at most this many messages')
+    parser.add_argument('--batch-size', type=int, default=100, help='messages fetched and handled per batch')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+    replayed = asyncio.run(replay_dead_letters(args.limit, args.batch_size))
+    print(f'Replayed {replayed} messages')
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,6 @@ from dataclasses import dataclass, field
 from uuid import UUID, uuid4
 
 
-@dataclass
+@dataclass(slots=True)
 class BaseCommand(ABC):
     command_id: UUID = field(default_factory=uuid4, kw_only=True)
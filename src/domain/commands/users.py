@@ -6,17 +6,17 @@ from domain.entities.users import UserWithCredentialsEntity, UserCredentialsStat
 from domain.value_objects.users import NameVO, EmailVO, PhoneNumberVO
 
 
-@dataclass
+@dataclass(slots=True)
 class CreateUserCommand(BaseCommand):
     user_with_credentials: UserWithCredentialsEntity
 
 
-@dataclass
+@dataclass(slots=True)
 class DeleteUserCommand(BaseCommand):
     user_id: UUID
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateUserCommand(BaseCommand):
     user_id: UUID
     first_name: NameVO | None = None
@@ -24,25 +24,30 @@ class UpdateUserCommand(BaseCommand):
     middle_name: NameVO | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateUserEmailCommand(BaseCommand):
     user_id: UUID
     new_email: EmailVO
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateUserPhoneNumberCommand(BaseCommand):
     user_id: UUID
     new_phone_number: PhoneNumberVO
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateUserCredentialsStatusCommand(BaseCommand):
     user_id: UUID
     status: UserCredentialsStatus
 
 
-@dataclass
+@dataclass(slots=True)
+class UpdateUserCredentialsStatusManyCommand(BaseCommand):
+    statuses: dict[UUID, UserCredentialsStatus]
+
+
+@dataclass(slots=True)
 class UpdateUserPhotoCommand(BaseCommand):
     user_id: UUID
     photo: str
@@ -6,7 +6,7 @@ from uuid import uuid4, UUID
 from domain.events.base import BaseEvent
 
 
-@dataclass
+@dataclass(slots=True)
 class BaseEntity(ABC):
     id: UUID = field(
         default_factory=uuid4,
@@ -12,7 +12,7 @@ class UserCredentialsStatus(Enum):
     FAILED = 'failed'
 
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class UserEntity(BaseEntity):
     photo: str = field(default='', kw_only=True)
     email: EmailVO | None
@@ -27,7 +27,7 @@ class UserEntity(BaseEntity):
             raise InsufficientCredentialsInfoException
 
 
-@dataclass
+@dataclass(slots=True)
 class UserWithCredentialsEntity:
     user: UserEntity
     password: PasswordVO
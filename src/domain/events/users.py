@@ -2,12 +2,12 @@ from dataclasses import dataclass
 from datetime import datetime
 from uuid import UUID
 
-from domain.entities.users import UserCredentialsStatus
+from domain.entities.users import UserCredentialsStatus, UserEntity
 from domain.events.base import BaseEvent
 from domain.exceptions.users import InsufficientCredentialsInfoException
 
 
-@dataclass
+@dataclass(slots=True)
 class UserCreatedEvent(BaseEvent):
     user_id: UUID
     password: str
@@ -19,12 +19,12 @@ class UserCreatedEvent(BaseEvent):
             raise InsufficientCredentialsInfoException
 
 
-@dataclass
+@dataclass(slots=True)
 class UserDeletedEvent(BaseEvent):
     user_id: UUID
 
 
-@dataclass
+@dataclass(slots=True)
 class UserRegistrationCompletedEvent(BaseEvent):
     user_id: UUID
     photo: str
@@ -36,6 +36,20 @@ class UserRegistrationCompletedEvent(BaseEvent):
     middle_name: str | None
     credentials_status: UserCredentialsStatus
 
+    @classmethod
+    def from_user(cls, user: UserEntity) -> 'UserRegistrationCompletedEvent':
+        return cls(
+            user_id=user.id,
+            created_at=user.created_at,
+            photo=user.photo,
+            email=user.email.as_generic() if user.email else None,
+            phone_number=user.phone_number.as_generic() if user.phone_number else None,
+            first_name=user.first_name.as_generic() if user.first_name else None,
+            last_name=user.last_name.as_generic() if user.last_name else None,
+            middle_name=user.middle_name.as_generic() if user.middle_name else None,
+            credentials_status=user.credentials_status,
+        )
+
     def __post_init__(self):
         if not any([self.email, self.phone_number]):
             raise InsufficientCredentialsInfoException
@@ -1,19 +1,26 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import TypeVar, Any
+from typing import TypeVar, Any, Self
 
 from typing_extensions import Generic
 
 VT = TypeVar('VT', bound=Any)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class BaseVO(ABC, Generic[VT]):
     value: VT
 
     def __post_init__(self):
         self.validate()
 
+    @classmethod
+    def trusted(cls, value: VT) -> Self:
+        """Builds the value object without validation. Only for values that were validated before being stored."""
+        vo = object.__new__(cls)
+        object.__setattr__(vo, 'value', value)
+        return vo
+
     @abstractmethod
     def validate(self) -> bool:
         ...
@@ -27,7 +27,7 @@ from domain.value_objects.base import BaseVO
 
 # TODO: Move validation to a separate class
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class EmailVO(BaseVO):
     value: str
 
@@ -53,7 +53,7 @@ class EmailVO(BaseVO):
         return str(self.value)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PhoneNumberVO(BaseVO):
     value: str
 
@@ -82,7 +82,7 @@ class PhoneNumberVO(BaseVO):
         return str(self.value)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class NameVO(BaseVO):
     value: str
 
@@ -102,7 +102,7 @@ class NameVO(BaseVO):
         return str(self.value)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class PasswordVO(BaseVO):
     value: str
 
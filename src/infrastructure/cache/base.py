@@ -1,85 +1,273 @@
+import asyncio
+import copy
 import logging
 from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
 from uuid import UUID
 
-from domain.entities.users import UserEntity
+from domain.entities.users import UserEntity, UserCredentialsStatus
+from infrastructure.exception.users import UserNotFoundException
 
 logger = logging.getLogger(__name__)
 
+USER_NOT_FOUND = object()
 
+
+def copy_user(user: UserEntity) -> UserEntity:
+    user = copy.copy(user)
+    user.events = []
+    return user
+
+
+@dataclass
 class BaseUserRepositoryCacher(ABC):
+    inflight: dict[UUID, asyncio.Future] = field(default_factory=dict, init=False)
+    coalesced_loads: int = field(default=0, init=False)
+    negative_hits: int = field(default=0, init=False)
+    invalidations: int = field(default=0, init=False)
+    # only users being loaded are versioned, so an invalidation only spoils the loads of the users it touches
+    versions: dict[UUID, int] = field(default_factory=dict, init=False)
+    watchers: dict[UUID, int] = field(default_factory=dict, init=False)
+
+    async def start(self) -> None:
+        ...
+
+    async def stop(self) -> None:
+        ...
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'invalidations': self.invalidations,
+            'coalesced_loads': self.coalesced_loads,
+            'negative_hits': self.negative_hits,
+        }
+
+    def watch_invalidations(self, user_id: UUID) -> int:
+        self.watchers[user_id] = self.watchers.get(user_id, 0) + 1
+        return self.versions.setdefault(user_id, 0)
+
+    def unwatch_invalidations(self, user_id: UUID) -> None:
+        self.watchers[user_id] -= 1
+        if not self.watchers[user_id]:
+            del self.watchers[user_id]
+            del self.versions[user_id]
+
+    def invalidated_since(self, user_id: UUID, version: int) -> bool:
+        return self.versions[user_id] != version
+
+    def invalidate(self, user_ids: Iterable[UUID] | None) -> None:
+        self.invalidations += 1
+        for user_id in self.versions if user_ids is None else user_ids:
+            if user_id in self.versions:
+                self.versions[user_id] += 1
+
     @abstractmethod
-    async def get_from_cache(self, user_id: UUID) -> UserEntity | None:
+    async def get_from_cache(self, user_id: UUID) -> UserEntity | object | None:
         ...
 
     @abstractmethod
     async def add_to_cache(self, user: UserEntity) -> None:
         ...
 
+    @abstractmethod
+    async def add_not_found_to_cache(self, user_id: UUID) -> None:
+        ...
+
     @abstractmethod
     async def remove_from_cache(self, user_id: UUID) -> None:
         ...
 
+    @abstractmethod
+    async def remove_many_from_cache(self, user_ids: Iterable[UUID]) -> None:
+        ...
+
+    async def load(self, user_id: UUID, loader: Callable[[], Awaitable[UserEntity]]) -> UserEntity:
+        # a commit of this user landing while the loader runs makes its row stale, so it must not be cached
+        version = self.watch_invalidations(user_id)
+        try:
+            user = await loader()
+        except UserNotFoundException:
+            if self.invalidated_since(user_id, version):
+                logger.debug('User \'%s\' was invalidated while loading, not caching not found marker', user_id)
+                raise
+
+            logger.debug('Caching not found marker for user \'%s\'', user_id)
+            try:
+                await self.add_not_found_to_cache(user_id)
+            except Exception as e:
+                logger.exception('Failed to cache not found marker for user \'%s\': %s', user_id, str(e))
+            raise
+        finally:
+            invalidated = self.invalidated_since(user_id, version)
+            self.unwatch_invalidations(user_id)
+
+        if invalidated:
+            logger.debug('User \'%s\' was invalidated while loading, not caching it', user_id)
+            return user
+
+        logger.debug('Adding user \'%s\' to cache', user_id)
+        try:
+            await self.add_to_cache(user)
+            logger.debug('User \'%s\' successfully added to cache', user_id)
+        except Exception as e:
+            logger.exception('Failed to add user \'%s\' to cache: %s', user_id, str(e))
+        return user
+
+    async def load_single_flight(
+        self,
+        user_id: UUID,
+        loader: Callable[[], Awaitable[UserEntity]],
+    ) -> UserEntity:
+        inflight = self.inflight.get(user_id)
+        if inflight:
+            logger.debug('Waiting for in-flight load of user \'%s\'', user_id)
+            self.coalesced_loads += 1
+            return copy_user(await asyncio.shield(inflight))
+
+        inflight = asyncio.get_running_loop().create_future()
+        self.inflight[user_id] = inflight
+        try:
+            user = await self.load(user_id, loader)
+            inflight.set_result(copy_user(user))
+            return user
+        except asyncio.CancelledError:
+            inflight.cancel()
+            raise
+        except Exception as e:
+            inflight.set_exception(e)
+            inflight.exception()
+            raise
+        finally:
+            if self.inflight.get(user_id) is inflight:
+                del self.inflight[user_id]
+
     def __call__(self, cls):
+        add = cls.add
+        add_many = cls.add_many
         get = cls.get
         remove = cls.remove
         update_status = cls.update_status
+        update_status_many = cls.update_status_many
         update_photo = cls.update_photo
+        update_email = cls.update_email
+        update_phone_number = cls.update_phone_number
+        after_commit = cls.after_commit
+        after_rollback = cls.after_rollback
 
-        async def _get(cls_self, user_id: UUID) -> UserEntity | None:
+        async def _get(cls_self, user_id: UUID) -> UserEntity:
             logger.debug('Attempting to get user %s from cache', user_id)
             user = await self.get_from_cache(user_id)
+            if user is USER_NOT_FOUND:
+                logger.debug('User \'%s\' is cached as not found, skipping repo hit', user_id)
+                self.negative_hits += 1
+                raise UserNotFoundException(user_id=user_id)
+
             if user:
                 logger.debug('User \'%s\' are loaded in cache continue without repo hit', user_id)
                 cls_self.loaded_users.add(user)
                 return user
 
+            if user_id in cls_self.pending_cache_invalidations:
+                logger.debug('User \'%s\' has uncommitted changes, loading from repo without caching', user_id)
+                return await get(cls_self, user_id)
+
             logger.debug('User \'%s\' are not loaded in cache continue with repo hit', user_id)
-            user = await get(cls_self, user_id)
-            if user:
-                logger.debug('Adding user \'%s\' to cache', user_id)
-                try:
-                    await self.add_to_cache(user)
-                    logger.debug('User \'%s\' successfully added to cache', user_id)
-                except Exception as e:
-                    logger.exception('Failed to add user \'%s\' to cache: %s', user_id, str(e))
+            user = await self.load_single_flight(user_id, lambda: get(cls_self, user_id))
+            cls_self.loaded_users.add(user)
             return user
 
-        async def _remove(cls_self, user_id: UUID) -> None:
-            logger.debug('Removing user \'%s\'', user_id)
-            await remove(cls_self, user_id)
+        async def _add(cls_self, user: UserEntity) -> None:
+            await add(cls_self, user)
+            cls_self.pending_cache_invalidations.add(user.id)
 
-            logger.debug('Removing user \'%s\' from cache', user_id)
-            try:
-                await self.remove_from_cache(user_id)
-                logger.debug('User \'%s\' successfully removed from cache', user_id)
-            except Exception as e:
-                logger.critical('Failed to remove user \'%s\' from cache: %s', user_id, str(e), exc_info=True)
+        async def _add_many(cls_self, users: Iterable[UserEntity]) -> None:
+            users = list(users)
+            await add_many(cls_self, users)
+            cls_self.pending_cache_invalidations.update(user.id for user in users)
+
+        async def _remove(cls_self, user_id: UUID) -> UserEntity:
+            user = await remove(cls_self, user_id)
+            cls_self.pending_cache_invalidations.add(user_id)
+            return user
 
-        async def _update_status(cls_self, user_id: UUID, status: str) -> None:
-            logger.debug('Updating status for user \'%s\' to \'%s\'', user_id, status)
-            await update_status(cls_self, user_id, status)
+        async def _update_status(cls_self, user_id: UUID, status: UserCredentialsStatus) -> UserEntity:
+            user = await update_status(cls_self, user_id, status)
+            cls_self.pending_cache_invalidations.add(user_id)
+            return user
 
-            logger.debug('Removing user \'%s\' from cache after status update', user_id)
-            try:
-                await self.remove_from_cache(user_id)
-                logger.debug('User \'%s\' successfully removed from cache', user_id)
-            except Exception as e:
-                logger.critical('Failed to remove user \'%s\' from cache: %s', user_id, str(e), exc_info=True)
+        async def _update_status_many(
+            cls_self,
+            statuses: dict[UUID, UserCredentialsStatus],
+        ) -> list[UserEntity]:
+            users = await update_status_many(cls_self, statuses)
+            cls_self.pending_cache_invalidations.update(user.id for user in users)
+            return users
+
+        async def _update_photo(cls_self, user_id: UUID, photo: str) -> UserEntity:
+            user = await update_photo(cls_self, user_id, photo)
+            cls_self.pending_cache_invalidations.add(user_id)
+            return user
+
+        async def _update_email(cls_self, user_id: UUID, new_email: str) -> UserEntity:
+            user = await update_email(cls_self, user_id, new_email)
+            cls_self.pending_cache_invalidations.add(user_id)
+            return user
+
+        async def _update_phone_number(cls_self, user_id: UUID, new_phone_number: str) -> UserEntity:
+            user = await update_phone_number(cls_self, user_id, new_phone_number)
+            cls_self.pending_cache_invalidations.add(user_id)
+            return user
 
-        async def _update_photo(cls_self, user_id: UUID, photo: str) -> None:
-            logger.debug('Updating photo for user \'%s\' to \'%s\'', user_id, photo)
-            await update_photo(cls_self, user_id, photo)
+        async def _after_commit(cls_self) -> None:
+            await after_commit(cls_self)
+            if not cls_self.pending_cache_invalidations:
+                return
 
-            logger.debug('Removing user \'%s\' from cache after photo update', user_id)
+            user_ids = list(cls_self.pending_cache_invalidations)
+            cls_self.pending_cache_invalidations.clear()
+            self.invalidate(user_ids)
+            for user_id in user_ids:
+                self.inflight.pop(user_id, None)
+            logger.debug('Removing %d committed users from cache', len(user_ids))
             try:
-                await self.remove_from_cache(user_id)
-                logger.debug('User \'%s\' successfully removed from cache', user_id)
+                await self.remove_many_from_cache(user_ids)
+                logger.debug('%d users successfully removed from cache', len(user_ids))
             except Exception as e:
-                logger.critical('Failed to remove user \'%s\' from cache: %s', user_id, str(e), exc_info=True)
+                logger.critical('Failed to remove users %s from cache: %s', user_ids, str(e), exc_info=True)
+
+        async def _after_rollback(cls_self) -> None:
+            await after_rollback(cls_self)
+            if cls_self.pending_cache_invalidations:
+                logger.debug(
+                    'Dropping %d pending cache invalidations after rollback',
+                    len(cls_self.pending_cache_invalidations),
+                )
+                cls_self.pending_cache_invalidations.clear()
 
+        cls.add = _add
+        cls.add_many = _add_many
         cls.get = _get
         cls.remove = _remove
         cls.update_status = _update_status
+        cls.update_status_many = _update_status_many
         cls.update_photo = _update_photo
+        cls.update_email = _update_email
+        cls.update_phone_number = _update_phone_number
+        cls.after_commit = _after_commit
+        cls.after_rollback = _after_rollback
         return cls
+
+
+class BasePresignedURLCacher(ABC):
+    @abstractmethod
+    async def get_from_cache(self, key: str, content_type: str) -> str | None:
+        ...
+
+    @abstractmethod
+    async def add_to_cache(self, key: str, content_type: str, url: str, expires_in: int) -> None:
+        ...
+
+    @abstractmethod
+    async def remove_from_cache(self, key: str) -> None:
+        ...
@@ -1,64 +1,331 @@
+import asyncio
 import logging
-from dataclasses import dataclass
-from uuid import UUID
+import math
+import random
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from uuid import UUID, uuid4
 
+import orjson
 from redis.asyncio import Redis
 
 from domain.entities.users import UserEntity
-from infrastructure.cache.base import BaseUserRepositoryCacher
-from infrastructure.converters.users import convert_user_json_to_entity, convert_user_entity_to_json
+from infrastructure.cache.base import BaseUserRepositoryCacher, BasePresignedURLCacher, USER_NOT_FOUND, copy_user
+from infrastructure.cache.memory import TTLLRUCache
+from infrastructure.converters.users import (
+    convert_user_cache_to_entity,
+    convert_user_entity_to_bytes,
+    convert_user_entity_to_json,
+)
+from infrastructure.exception.users import UserNotFoundException
 from infrastructure.storages.cache import get_redis_client
 from settings.config import settings
 
 
 logger = logging.getLogger(__name__)
 
+NOT_FOUND_MARKER = b'\x00'
+USER_ENCODERS = {
+    'json': convert_user_entity_to_json,
+    'binary': convert_user_entity_to_bytes,
+}
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
 
 @dataclass
 class RedisUserRepositoryCacher(BaseUserRepositoryCacher):
-    redis: Redis = get_redis_client()
+    redis: Redis = field(default_factory=get_redis_client)
+    invalidation_channel: str = settings.USER_CACHE_INVALIDATION_CHANNEL
+    local: TTLLRUCache = field(
+        default_factory=lambda: TTLLRUCache(
+            max_entries=settings.USER_CACHE_LOCAL_MAX_ENTRIES,
+            ttl_seconds=settings.USER_CACHE_LOCAL_TTL_SECONDS,
+        )
+    )
+    encoding: str = settings.CACHE_USER_ENCODING
+    expiration_seconds: int = settings.CACHE_EXPIRATION_SECONDS
+    expiration_jitter: float = settings.CACHE_EXPIRATION_JITTER
+    not_found_expiration_seconds: int = settings.CACHE_NOT_FOUND_EXPIRATION_SECONDS
+    early_refresh_beta: float = settings.CACHE_EARLY_REFRESH_BETA
+    lock_enabled: bool = settings.CACHE_LOCK_ENABLED
+    lock_timeout_seconds: float = settings.CACHE_LOCK_TIMEOUT_SECONDS
+    lock_poll_interval_seconds: float = settings.CACHE_LOCK_POLL_INTERVAL_SECONDS
+    early_refreshes: int = field(default=0, init=False)
+    load_seconds: float = field(default=0.0, init=False)
+    listening_task: asyncio.Task | None = field(default=None, init=False)
+
+    async def start(self) -> None:
+        if not self.listening_task:
+            logger.info('Subscribing to user cache invalidations on \'%s\'', self.invalidation_channel)
+            self.listening_task = asyncio.create_task(self.listen_for_invalidations())
+
+    async def stop(self) -> None:
+        if self.listening_task:
+            logger.info('Unsubscribing from user cache invalidations')
+            self.listening_task.cancel()
+            self.listening_task = None
+        self.local.clear()
+
+    async def listen_for_invalidations(self) -> None:
+        while True:
+            try:
+                async with self.redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.invalidation_channel)
+                    self._invalidate_local(None)
+                    async for message in pubsub.listen():
+                        self._invalidate_local(orjson.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception('User cache invalidation listener failed, resubscribing: %s', str(e))
+                self._invalidate_local(None)
+                await asyncio.sleep(settings.USER_CACHE_LOCAL_TTL_SECONDS)
 
-    async def get_from_cache(self, user_id: UUID) -> UserEntity | None:
+    async def get_from_cache(self, user_id: UUID) -> UserEntity | object | None:
+        user = self.local.get(user_id)
+        if user is USER_NOT_FOUND:
+            logger.debug('User \'%s\' found in local cache as not found', user_id)
+            return USER_NOT_FOUND
+
+        if user:
+            logger.debug('User \'%s\' found in local cache', user_id)
+            return copy_user(user)
+
+        version = self.watch_invalidations(user_id)
         logger.debug('Retrieving user \'%s\' from Redis cache', user_id)
         try:
-            user = await self.redis.get(f'user:{user_id}')
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(f'user:{user_id}')
+                pipe.pttl(f'user:{user_id}')
+                user, ttl_ms = await pipe.execute()
+            if user == NOT_FOUND_MARKER:
+                logger.debug('User \'%s\' found in Redis cache as not found', user_id)
+                if not self.invalidated_since(user_id, version):
+                    self.local.set(user_id, USER_NOT_FOUND, ttl_seconds=ttl_ms / 1000)
+                return USER_NOT_FOUND
+
             if user:
+                if self._should_refresh_early(ttl_ms):
+                    logger.debug('User \'%s\' is close to expiration, refreshing early', user_id)
+                    self.early_refreshes += 1
+                    return None
+
                 logger.debug('User \'%s\' found in Redis cache', user_id)
-                return convert_user_json_to_entity(user)
+                user = convert_user_cache_to_entity(user)
+                if not self.invalidated_since(user_id, version):
+                    self.local.set(user_id, copy_user(user))
+                return user
             logger.debug('User \'%s\' not found in Redis cache', user_id)
             return None
         except Exception as e:
             logger.exception('Error retrieving user \'%s\' from Redis cache: %s', user_id, str(e))
             return None
+        finally:
+            self.unwatch_invalidations(user_id)
 
     async def add_to_cache(self, user: UserEntity) -> None:
         logger.debug('Adding user \'%s\' to Redis cache', user.id)
+        self.local.set(user.id, copy_user(user))
+        expiration_seconds = round(self.expiration_seconds * (1 - random.uniform(0, self.expiration_jitter)))
         try:
             await self.redis.set(
                 name=f'user:{user.id}',
-                value=convert_user_entity_to_json(user),
-                ex=settings.CACHE_EXPIRATION_SECONDS,
+                value=USER_ENCODERS[self.encoding](user),
+                ex=expiration_seconds,
             )
             logger.debug(
                 'User \'%s\' added to Redis cache with expiration %d seconds',
                 user.id,
-                settings.CACHE_EXPIRATION_SECONDS
+                expiration_seconds,
             )
         except Exception as e:
             logger.exception('Failed to add user \'%s\' to Redis cache: %s', user.id, str(e))
             raise
 
+    async def add_not_found_to_cache(self, user_id: UUID) -> None:
+        logger.debug('Adding not found marker for user \'%s\' to Redis cache', user_id)
+        self.local.set(user_id, USER_NOT_FOUND, ttl_seconds=self.not_found_expiration_seconds)
+        try:
+            await self.redis.set(
+                name=f'user:{user_id}',
+                value=NOT_FOUND_MARKER,
+                ex=self.not_found_expiration_seconds,
+                nx=True,
+            )
+        except Exception as e:
+            logger.exception('Failed to add not found marker for user \'%s\' to Redis cache: %s', user_id, str(e))
+            raise
+
     async def remove_from_cache(self, user_id: UUID) -> None:
-        logger.debug('Removing user \'%s\'from Redis cache', user_id)
+        await self.remove_many_from_cache([user_id])
+
+    async def remove_many_from_cache(self, user_ids: Iterable[UUID]) -> None:
+        user_ids = [str(user_id) for user_id in user_ids]
+        if not user_ids:
+            return
+
+        logger.debug('Removing %d users from Redis cache', len(user_ids))
+        self._invalidate_local(user_ids)
         try:
-            result = await self.redis.delete(f'user:{user_id}')
-            if result:
-                logger.debug('User \'%s\' removed from Redis cache', user_id)
-            else:
-                logger.debug('User \'%s\' was not in Redis cache', user_id)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.delete(*[f'user:{user_id}' for user_id in user_ids])
+                pipe.publish(self.invalidation_channel, orjson.dumps(user_ids))
+                removed, _ = await pipe.execute()
+            logger.debug('%d of %d users removed from Redis cache', removed, len(user_ids))
         except Exception as e:
-            logger.exception('Error removing user \'%s\' from Redis cache: %s', user_id, str(e))
+            logger.exception('Error removing %d users from Redis cache: %s', len(user_ids), str(e))
             raise
 
+    async def load(self, user_id: UUID, loader: Callable[[], Awaitable[UserEntity]]) -> UserEntity:
+        if not self.lock_enabled:
+            return await self._timed_load(user_id, loader)
+
+        lock_name = f'user-lock:{user_id}'
+        token = uuid4().hex
+        try:
+            acquired = await self.redis.set(lock_name, token, nx=True, px=int(self.lock_timeout_seconds * 1000))
+        except Exception as e:
+            logger.exception('Failed to acquire cache lock for user \'%s\': %s', user_id, str(e))
+            return await self._timed_load(user_id, loader)
+
+        if not acquired:
+            logger.debug('User \'%s\' is being loaded by another process, waiting for cache', user_id)
+            deadline = time.monotonic() + self.lock_timeout_seconds
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.lock_poll_interval_seconds)
+                user = await self.get_from_cache(user_id)
+                if user is USER_NOT_FOUND:
+                    raise UserNotFoundException(user_id=user_id)
+                if user:
+                    return user
+                # the holder finished without caching the user, e.g. after an invalidation
+                if not await self._lock_held(lock_name):
+                    logger.debug('Cache lock on user \'%s\' released without an entry, loading from repo', user_id)
+                    return await self._timed_load(user_id, loader)
+            logger.warning('Timed out waiting for cache lock on user \'%s\', loading from repo', user_id)
+            return await self._timed_load(user_id, loader)
+
+        try:
+            return await self._timed_load(user_id, loader)
+        finally:
+            try:
+                await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_name, token)
+            except Exception as e:
+                logger.exception('Failed to release cache lock for user \'%s\': %s', user_id, str(e))
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **self.local.stats(),
+            **super().stats(),
+            'early_refreshes': self.early_refreshes,
+        }
+
+    async def _timed_load(self, user_id: UUID, loader: Callable[[], Awaitable[UserEntity]]) -> UserEntity:
+        started = time.monotonic()
+        user = await super().load(user_id, loader)
+        self.load_seconds += (time.monotonic() - started - self.load_seconds) * 0.1
+        return user
+
+    async def _lock_held(self, lock_name: str) -> bool:
+        try:
+            return bool(await self.redis.exists(lock_name))
+        except Exception as e:
+            logger.exception('Failed to check cache lock \'%s\': %s', lock_name, str(e))
+            return False
+
+    def _should_refresh_early(self, ttl_ms: int) -> bool:
+        if not self.early_refresh_beta or ttl_ms < 0:
+            return False
+        return self.load_seconds * self.early_refresh_beta * -math.log(1 - random.random()) * 1000 >= ttl_ms
+
+    def _invalidate_local(self, user_ids: list[str] | None) -> None:
+        if user_ids is None:
+            self.invalidate(None)
+            self.local.clear()
+            return
+
+        user_ids = [UUID(user_id) for user_id in user_ids]
+        self.invalidate(user_ids)
+        for user_id in user_ids:
+            self.local.pop(user_id)
+
+
+@dataclass
+class RedisPresignedURLCacher(BasePresignedURLCacher):
+    redis: Redis = field(default_factory=get_redis_client)
+    safety_margin_seconds: int = settings.S3_PRESIGNED_URL_CACHE_SAFETY_MARGIN_SECONDS
+    local: TTLLRUCache = field(
+        default_factory=lambda: TTLLRUCache(
+            max_entries=settings.S3_PRESIGNED_URL_LOCAL_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.S3_PRESIGNED_URL_LOCAL_CACHE_TTL_SECONDS,
+        )
+    )
+
+    async def get_from_cache(self, key: str, content_type: str) -> str | None:
+        now = time.time()
+        urls = self.local.get(key)
+        if urls and content_type in urls:
+            url, serve_until = urls[content_type]
+            if serve_until > now:
+                logger.debug('Presigned URL for \'%s\' found in local cache', key)
+                return url
+
+        try:
+            cached = await self.redis.hget(f'presigned_url:{key}', content_type)
+        except Exception as e:
+            logger.exception('Error retrieving presigned URL for \'%s\' from Redis cache: %s', key, str(e))
+            return None
+
+        if not cached:
+            logger.debug('Presigned URL for \'%s\' not found in cache', key)
+            return None
+
+        url, serve_until = orjson.loads(cached)
+        if serve_until <= now:
+            logger.debug('Presigned URL for \'%s\' is too close to expiration', key)
+            return None
+
+        logger.debug('Presigned URL for \'%s\' found in Redis cache', key)
+        self._add_to_local_cache(key, content_type, url, serve_until, now)
+        return url
+
+    async def add_to_cache(self, key: str, content_type: str, url: str, expires_in: int) -> None:
+        ttl = expires_in - self.safety_margin_seconds
+        if ttl <= 0:
+            logger.debug('Presigned URL for \'%s\' expires within safety margin, not caching', key)
+            return
+
+        now = time.time()
+        serve_until = now + ttl
+        self._add_to_local_cache(key, content_type, url, serve_until, now)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.hset(f'presigned_url:{key}', content_type, orjson.dumps([url, serve_until]))
+                pipe.expire(f'presigned_url:{key}', ttl)
+                await pipe.execute()
+            logger.debug('Presigned URL for \'%s\' added to Redis cache for %d seconds', key, ttl)
+        except Exception as e:
+            logger.exception('Failed to add presigned URL for \'%s\' to Redis cache: %s', key, str(e))
+
+    async def remove_from_cache(self, key: str) -> None:
+        logger.debug('Removing presigned URLs for \'%s\' from cache', key)
+        self.local.pop(key)
+        try:
+            await self.redis.delete(f'presigned_url:{key}')
+        except Exception as e:
+            logger.exception('Error removing presigned URLs for \'%s\' from Redis cache: %s', key, str(e))
+            raise
+
+    def _add_to_local_cache(self, key: str, content_type: str, url: str, serve_until: float, now: float) -> None:
+        urls = self.local.get(key) or {}
+        urls[content_type] = (url, serve_until)
+        self.local.set(key, urls, ttl_seconds=serve_until - now)
+
 
 cache_repository = RedisUserRepositoryCacher()
@@ -0,0 +1,185 @@
+import types
+from collections.abc import Callable
+from dataclasses import dataclass, fields
+from datetime import datetime
+from enum import Enum
+from functools import cache
+from typing import Any, Union, get_args, get_origin, get_type_hints
+from uuid import UUID
+
+import orjson
+
+from domain.events.base import BaseEvent
+from settings.config import settings
+
+
+EVENT_TYPE_HEADER = 'x-event-type'
+SCHEMA_VERSION_HEADER = 'x-schema-version'
+
+
+@cache
+def get_event_field_names(event_type: type[BaseEvent]) -> tuple[str, ...]:
+    return tuple(event_field.name for event_field in fields(event_type))
+
+
+def convert_event_to_dict(event: BaseEvent) -> dict:
+    return {name: getattr(event, name) for name in get_event_field_names(type(event))}
+
+
+def get_field_type(annotation: Any) -> tuple[Any, bool]:
+    # the annotation without None, and whether None was allowed
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0], len(args) != len(get_args(annotation))
+    return annotation, False
+
+
+def is_enum_type(field_type: Any) -> bool:
+    return isinstance(field_type, type) and issubclass(field_type, Enum)
+
+
+def build_event_encoder(event_type: type, field_names: tuple[str, ...], compact: bool) -> Callable[[Any], dict | tuple]:
+    # compact encoders return the values alone, in field_names order
+    hints = get_type_hints(event_type)
+    expressions = []
+    for name in field_names:
+        field_type, optional = get_field_type(hints[name])
+        expression = f'event.{name}'
+        if is_enum_type(field_type):
+            expression = f'(None if event.{name} is None else event.{name}.value)' if optional else f'event.{name}.value'
+        expressions.append(expression if compact else f'{name!r}: {expression}')
+
+    if compact:
+        source = f'lambda event: ({", ".join(expressions)},)'
+    else:
+        source = f'lambda event: {{{", ".join(expressions)}}}'
+    # field names come from the dataclass definition, so they are plain identifiers
+    return eval(source, {})
+
+
+def get_field_decoder(field_type: Any) -> Callable[[Any], Any] | None:
+    if field_type is UUID or is_enum_type(field_type):
+        return field_type
+    if field_type is datetime:
+        return datetime.fromisoformat
+    return None
+
+
+def build_event_decoder(event_type: type, field_names: tuple[str, ...], compact: bool) -> Callable[[Any], Any]:
+    # named bodies are read by key, so keys a newer schema adds are ignored and optional fields may be missing
+    hints = get_type_hints(event_type)
+    namespace: dict[str, Any] = {'event_type': event_type}
+    arguments = []
+    for i, name in enumerate(field_names):
+        field_type, optional = get_field_type(hints[name])
+        value = f'body[{i}]' if compact else (f'body.get({name!r})' if optional else f'body[{name!r}]')
+        decoder = get_field_decoder(field_type)
+        if decoder is not None:
+            namespace[f'decode_{name}'] = decoder
+            if optional:
+                value = f'(None if (value := {value}) is None else decode_{name}(value))'
+            else:
+                value = f'decode_{name}({value})'
+        arguments.append(f'{name}={value}')
+
+    return eval(f'lambda body: event_type({", ".join(arguments)})', namespace)
+
+
+@dataclass(frozen=True, slots=True)
+class EventSerializer:
+    event_type: type[BaseEvent]
+    version: int
+    field_names: tuple[str, ...]
+    compact: bool
+    to_primitive: Callable[[BaseEvent], dict | tuple]
+
+    @classmethod
+    def build(
+        cls,
+        event_type: type[BaseEvent],
+        version: int = 1,
+        compact: bool = False,
+        field_names: tuple[str, ...] | None = None,
+    ) -> 'EventSerializer':
+        if field_names is None:
+            field_names = get_event_field_names(event_type)
+        return cls(
+            event_type=event_type,
+            version=version,
+            field_names=field_names,
+            compact=compact,
+            to_primitive=build_event_encoder(event_type, field_names, compact),
+        )
+
+    def encode(self, event: BaseEvent) -> bytes:
+        return orjson.dumps(self.to_primitive(event))
+
+
+@dataclass(frozen=True, slots=True)
+class EventDecoder:
+    event_type: type
+    version: int
+    field_names: tuple[str, ...]
+    from_named: Callable[[dict], Any]
+    from_compact: Callable[[list], Any]
+
+    @classmethod
+    def build(cls, event_type: type, version: int = 1, field_names: tuple[str, ...] | None = None) -> 'EventDecoder':
+        if field_names is None:
+            field_names = tuple(event_field.name for event_field in fields(event_type))
+        return cls(
+            event_type=event_type,
+            version=version,
+            field_names=field_names,
+            from_named=build_event_decoder(event_type, field_names, compact=False),
+            from_compact=build_event_decoder(event_type, field_names, compact=True),
+        )
+
+    def decode(self, body: dict | list, version: int | None = None) -> Any:
+        if isinstance(body, list):
+            # positions only mean something for the schema they were written with
+            if version is not None and version != self.version:
+                raise ValueError(
+                    f'Compact {self.event_type.__name__} body has schema version {version}, expected {self.version}'
+                )
+            return self.from_compact(body)
+        return self.from_named(body)
+
+
+event_serializers: dict[type[BaseEvent], EventSerializer] = {}
+
+
+def register_event_serializer(
+    event_type: type[BaseEvent],
+    version: int = 1,
+    compact: bool = settings.EVENT_SERIALIZATION_COMPACT,
+    field_names: tuple[str, ...] | None = None,
+) -> EventSerializer:
+    serializer = EventSerializer.build(event_type, version=version, compact=compact, field_names=field_names)
+    event_serializers[event_type] = serializer
+    return serializer
+
+
+def get_event_serializer(event_type: type[BaseEvent]) -> EventSerializer:
+    serializer = event_serializers.get(event_type)
+    if serializer is None:
+        # events nobody registered are published with every field, as version 1
+        serializer = register_event_serializer(event_type)
+    return serializer
+
+
+def convert_event_to_json(event: BaseEvent) -> bytes:
+    return get_event_serializer(type(event)).encode(event)
+
+
+def get_event_headers(event: BaseEvent) -> dict[str, str | int]:
+    serializer = get_event_serializer(type(event))
+    headers: dict[str, str | int] = {
+        EVENT_TYPE_HEADER: serializer.event_type.__name__,
+        SCHEMA_VERSION_HEADER: serializer.version,
+    }
+    # lets consumers partition by user
+    if user_id := getattr(event, 'user_id', None):
+        headers['user_id'] = str(user_id)
+    return headers
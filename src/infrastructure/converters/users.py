@@ -1,4 +1,5 @@
-from datetime import datetime
+import struct
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
 import orjson
@@ -20,16 +21,29 @@ def convert_user_entity_to_model(user: UserEntity) -> UserModel:
         middle_name=user.middle_name.as_generic() if user.middle_name else None,
     )
 
+def convert_user_entity_to_row(user: UserEntity) -> dict:
+    return {
+        'id': user.id,
+        'created_at': user.created_at,
+        'photo': user.photo,
+        'email': user.email.as_generic() if user.email else None,
+        'phone_number': user.phone_number.as_generic() if user.phone_number else None,
+        'first_name': user.first_name.as_generic() if user.first_name else None,
+        'last_name': user.last_name.as_generic() if user.last_name else None,
+        'middle_name': user.middle_name.as_generic() if user.middle_name else None,
+        'credentials_status': user.credentials_status,
+    }
+
 def convert_user_model_to_entity(user: UserModel) -> UserEntity:
     return UserEntity(
-        id=UUID(str(user.id)),
+        id=UUID(int=user.id.int),
         created_at=user.created_at,
         photo=user.photo,
-        email=EmailVO(user.email) if user.email else None,
-        phone_number=PhoneNumberVO(user.phone_number) if user.phone_number else None,
-        first_name=NameVO(user.first_name) if user.first_name else None,
-        last_name=NameVO(user.last_name) if user.last_name else None,
-        middle_name=NameVO(user.middle_name) if user.middle_name else None,
+        email=EmailVO.trusted(user.email) if user.email else None,
+        phone_number=PhoneNumberVO.trusted(user.phone_number) if user.phone_number else None,
+        first_name=NameVO.trusted(user.first_name) if user.first_name else None,
+        last_name=NameVO.trusted(user.last_name) if user.last_name else None,
+        middle_name=NameVO.trusted(user.middle_name) if user.middle_name else None,
         credentials_status=user.credentials_status,
     )
 
@@ -54,10 +68,73 @@ def convert_user_json_to_entity(user: bytes) -> UserEntity:
         id=UUID(user['id']),
         created_at=datetime.fromisoformat(user['created_at']),
         photo=user['photo'],
-        email=EmailVO(user['email']) if user['email'] else None,
-        phone_number=PhoneNumberVO(user['phone_number']) if user['phone_number'] else None,
-        first_name=NameVO(user['first_name']) if user['first_name'] else None,
-        last_name=NameVO(user['last_name']) if user['last_name'] else None,
-        middle_name=NameVO(user['middle_name']) if user['middle_name'] else None,
+        email=EmailVO.trusted(user['email']) if user['email'] else None,
+        phone_number=PhoneNumberVO.trusted(user['phone_number']) if user['phone_number'] else None,
+        first_name=NameVO.trusted(user['first_name']) if user['first_name'] else None,
+        last_name=NameVO.trusted(user['last_name']) if user['last_name'] else None,
+        middle_name=NameVO.trusted(user['middle_name']) if user['middle_name'] else None,
         credentials_status=UserCredentialsStatus(user['credentials_status']),
     )
+
+
+USER_BINARY_VERSION = 1
+USER_BINARY_HEADER = struct.Struct('<B16sqB6H')
+USER_BINARY_NONE = 0xFFFF
+USER_BINARY_STATUSES = tuple(UserCredentialsStatus)
+USER_BINARY_STATUS_CODES = {status: code for code, status in enumerate(USER_BINARY_STATUSES)}
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def convert_user_entity_to_bytes(user: UserEntity) -> bytes:
+    """Version 1 layout: version byte, 16-byte UUID, created_at as epoch microseconds, status code and
+    the UTF-8 byte lengths of photo, email, phone number, first, last and middle name (0xFFFF for None),
+    followed by the strings themselves."""
+    strings = (
+        user.photo,
+        user.email.as_generic() if user.email else None,
+        user.phone_number.as_generic() if user.phone_number else None,
+        user.first_name.as_generic() if user.first_name else None,
+        user.last_name.as_generic() if user.last_name else None,
+        user.middle_name.as_generic() if user.middle_name else None,
+    )
+    encoded = [string.encode() if string is not None else b'' for string in strings]
+    return USER_BINARY_HEADER.pack(
+        USER_BINARY_VERSION,
+        user.id.bytes,
+        (user.created_at - EPOCH) // MICROSECOND,
+        USER_BINARY_STATUS_CODES[user.credentials_status],
+        *(len(value) if string is not None else USER_BINARY_NONE for string, value in zip(strings, encoded)),
+    ) + b''.join(encoded)
+
+def convert_user_bytes_to_entity(user: bytes) -> UserEntity:
+    version, user_id, created_at, status, *lengths = USER_BINARY_HEADER.unpack_from(user)
+    if version != USER_BINARY_VERSION:
+        raise ValueError(f'Unsupported user binary format version: {version}')
+
+    offset = USER_BINARY_HEADER.size
+    strings = []
+    for length in lengths:
+        if length == USER_BINARY_NONE:
+            strings.append(None)
+            continue
+        strings.append(user[offset:offset + length].decode())
+        offset += length
+
+    photo, email, phone_number, first_name, last_name, middle_name = strings
+    return UserEntity(
+        id=UUID(bytes=user_id),
+        created_at=EPOCH + created_at * MICROSECOND,
+        photo=photo,
+        email=EmailVO.trusted(email) if email else None,
+        phone_number=PhoneNumberVO.trusted(phone_number) if phone_number else None,
+        first_name=NameVO.trusted(first_name) if first_name else None,
+        last_name=NameVO.trusted(last_name) if last_name else None,
+        middle_name=NameVO.trusted(middle_name) if middle_name else None,
+        credentials_status=USER_BINARY_STATUSES[status],
+    )
+
+def convert_user_cache_to_entity(user: bytes) -> UserEntity:
+    if user[:1] == b'{':
+        return convert_user_json_to_entity(user)
+    return convert_user_bytes_to_entity(user)
@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+from infrastructure.exception.base import InfrastructureException
+
+
+@dataclass(frozen=True, eq=False)
+class MessageInProgressException(InfrastructureException):
+    key: str
+
+    @property
+    def message(self) -> str:
+        return f'Message <{self.key}> is still being processed.'
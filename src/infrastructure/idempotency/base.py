@@ -0,0 +1,29 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+
+@dataclass
+class BaseIdempotencyStore(ABC):
+    duplicates: int = field(default=0, init=False)
+
+    async def start(self) -> None:
+        ...
+
+    async def stop(self) -> None:
+        ...
+
+    @abstractmethod
+    async def claim(self, key: str) -> bool:
+        # False when already processed; raises MessageInProgressException while another delivery is being handled
+        ...
+
+    @abstractmethod
+    async def complete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def release(self, key: str) -> None:
+        ...
+
+    def stats(self) -> dict[str, int]:
+        return {'duplicates': self.duplicates}
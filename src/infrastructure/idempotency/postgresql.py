@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from contextlib import suppress
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from infrastructure.idempotency.base import BaseIdempotencyStore
+from infrastructure.models.messages import ProcessedMessageModel
+from infrastructure.storages.database import session_factory as default_session_factory
+from settings.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+pending_message_keys: ContextVar[list[str] | None] = ContextVar('pending_message_keys', default=None)
+
+
+async def record_pending_message_keys(session: AsyncSession) -> None:
+    # written in the caller's transaction, so the keys commit or roll back with its changes
+    keys = pending_message_keys.get()
+    if not keys:
+        return
+
+    await session.execute(insert(ProcessedMessageModel), [{'message_id': key} for key in keys])
+    keys.clear()
+
+
+@dataclass
+class SQLAlchemyIdempotencyStore(BaseIdempotencyStore):
+    session_factory: async_sessionmaker = field(default=default_session_factory)
+    expiration_seconds: int = settings.IDEMPOTENCY_EXPIRATION_SECONDS
+    purge_interval_seconds: float = settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS
+    purging_task: asyncio.Task | None = field(default=None, init=False)
+
+    async def start(self) -> None:
+        if not self.purging_task:
+            logger.info('Purging processed messages older than %ds', self.expiration_seconds)
+            self.purging_task = asyncio.create_task(self.run_purge())
+
+    async def stop(self) -> None:
+        if self.purging_task:
+            self.purging_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.purging_task
+            self.purging_task = None
+
+    async def run_purge(self) -> None:
+        while True:
+            await self.purge_expired()
+            await asyncio.sleep(self.purge_interval_seconds)
+
+    async def purge_expired(self) -> None:
+        try:
+            async with self.session_factory() as session, session.begin():
+                result = await session.execute(
+                    delete(ProcessedMessageModel)
+                    .where(ProcessedMessageModel.processed_at < func.now() - timedelta(seconds=self.expiration_seconds))
+                )
+            logger.debug('Purged %d processed messages', result.rowcount)
+        except Exception as e:
+            logger.warning('Failed to purge processed messages: %s', str(e))
+
+    async def claim(self, key: str) -> bool:
+        try:
+            async with self.session_factory() as session:
+                processed = await session.scalar(
+                    select(ProcessedMessageModel.message_id).where(ProcessedMessageModel.message_id == key)
+                )
+        except Exception as e:
+            logger.critical('Failed to check message \'%s\', processing it anyway: %s', key, str(e), exc_info=True)
+            return True
+
+        if processed:
+            self.duplicates += 1
+            logger.info('Skipping duplicate message \'%s\'', key)
+            return False
+
+        keys = pending_message_keys.get()
+        if keys is None:
+            keys = []
+            pending_message_keys.set(keys)
+        keys.append(key)
+        return True
+
+    async def complete(self, key: str) -> None:
+        keys = pending_message_keys.get()
+        if not keys or key not in keys:
+            return
+
+        # the handler committed nothing, so the key was not recorded with its changes
+        keys.remove(key)
+        try:
+            async with self.session_factory() as session:
+                await session.execute(
+                    pg_insert(ProcessedMessageModel).values(message_id=key).on_conflict_do_nothing()
+                )
+                await session.commit()
+        except Exception as e:
+            logger.critical('Failed to record message \'%s\' as processed: %s', key, str(e), exc_info=True)
+
+    async def release(self, key: str) -> None:
+        keys = pending_message_keys.get()
+        if keys and key in keys:
+            keys.remove(key)
@@ -0,0 +1,52 @@
+import logging
+from dataclasses import dataclass, field
+
+from redis.asyncio import Redis
+
+from infrastructure.exception.messages import MessageInProgressException
+from infrastructure.idempotency.base import BaseIdempotencyStore
+from infrastructure.storages.cache import get_redis_client
+from settings.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+IN_PROGRESS = b'in-progress'
+PROCESSED = b'processed'
+
+
+@dataclass
+class RedisIdempotencyStore(BaseIdempotencyStore):
+    redis: Redis = field(default_factory=get_redis_client)
+    expiration_seconds: int = settings.IDEMPOTENCY_EXPIRATION_SECONDS
+    in_progress_seconds: int = settings.IDEMPOTENCY_IN_PROGRESS_SECONDS
+
+    async def claim(self, key: str) -> bool:
+        name = f'processed_message:{key}'
+        # only a short-lived marker until handled, so a consumer that crashed midway does not block the redelivery
+        try:
+            if await self.redis.set(name, IN_PROGRESS, nx=True, ex=self.in_progress_seconds):
+                return True
+            state = await self.redis.get(name)
+        except Exception as e:
+            logger.critical('Failed to claim message \'%s\', processing it anyway: %s', key, str(e), exc_info=True)
+            return True
+
+        if state != PROCESSED:
+            raise MessageInProgressException(key=key)
+
+        self.duplicates += 1
+        logger.info('Skipping duplicate message \'%s\'', key)
+        return False
+
+    async def complete(self, key: str) -> None:
+        try:
+            await self.redis.set(f'processed_message:{key}', PROCESSED, ex=self.expiration_seconds)
+        except Exception as e:
+            logger.critical('Failed to record message \'%s\' as processed: %s', key, str(e), exc_info=True)
+
+    async def release(self, key: str) -> None:
+        try:
+            await self.redis.delete(f'processed_message:{key}')
+        except Exception as e:
+            logger.critical('Failed to release message \'%s\': %s', key, str(e), exc_info=True)
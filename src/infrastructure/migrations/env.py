@@ -5,6 +5,8 @@ from sqlalchemy import pool
 
 from alembic import context
 
+from infrastructure.models.messages import ProcessedMessageModel
+from infrastructure.models.outbox import OutboxMessageModel
 from infrastructure.models.users import UserModel
 from infrastructure.storages.database import Base
 
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from infrastructure.storages.database import Base
+
+
+class ProcessedMessageModel(Base):
+    __tablename__ = 'processed_messages'
+
+    message_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    processed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        # rows past the idempotency window are purged by processed_at
+        Index('ix_processed_messages_processed_at', 'processed_at'),
+    )
@@ -0,0 +1,24 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import UUID, DateTime, Index, LargeBinary, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from infrastructure.storages.database import Base
+
+
+class OutboxMessageModel(Base):
+    __tablename__ = 'outbox'
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID, primary_key=True)
+    topic: Mapped[str] = mapped_column(String(255), nullable=False)
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    headers: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # the relay only ever scans unsent rows, so the index stays as small as the backlog
+        Index('ix_outbox_unsent', 'created_at', postgresql_where=sent_at.is_(None)),
+    )
@@ -0,0 +1,30 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+
+@dataclass
+class BaseOutboxRelay(ABC):
+    relayed: int = field(default=0, init=False)
+    failed: int = field(default=0, init=False)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    @abstractmethod
+    async def start(self):
+        ...
+
+    @abstractmethod
+    async def stop(self):
+        ...
+
+    def wake(self) -> None:
+        # called after a commit wrote to the outbox, so the relay need not wait for its next poll
+        ...
+
+    def stats(self) -> dict[str, int]:
+        return {'relayed': self.relayed, 'failed': self.failed}
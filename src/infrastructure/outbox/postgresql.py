@@ -0,0 +1,149 @@
+import asyncio
+import logging
+from collections.abc import Iterable, Mapping
+from contextlib import suppress
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from domain.entities.users import UserEntity
+from domain.events.base import BaseEvent
+from infrastructure.converters.events import convert_event_to_json, get_event_headers
+from infrastructure.models.outbox import OutboxMessageModel
+from infrastructure.outbox.base import BaseOutboxRelay
+from infrastructure.producers.base import BaseProducer
+from settings.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+async def record_outbox_events(
+    session: AsyncSession,
+    users: Iterable[UserEntity],
+    topics: Mapping[type[BaseEvent], str],
+) -> int:
+    # the moved events are taken off the entities so the bus does not publish them again; events without a topic
+    # stay for the in-process handlers
+    rows = []
+    for user in users:
+        kept = []
+        for event in user.events:
+            topic = topics.get(type(event))
+            if topic is None:
+                kept.append(event)
+                continue
+
+            rows.append({
+                'id': event.event_id,
+                'topic': topic,
+                'payload': convert_event_to_json(event),
+                'headers': get_event_headers(event),
+            })
+        user.events = kept
+
+    if rows:
+        await session.execute(insert(OutboxMessageModel), rows)
+    return len(rows)
+
+
+@dataclass
+class SQLAlchemyOutboxRelay(BaseOutboxRelay):
+    session_factory: async_sessionmaker
+    producer: BaseProducer
+    batch_size: int = settings.USER_SERVICE_OUTBOX_BATCH_SIZE
+    poll_interval_seconds: float = settings.USER_SERVICE_OUTBOX_POLL_INTERVAL_SECONDS
+    retention_seconds: int = settings.USER_SERVICE_OUTBOX_RETENTION_SECONDS
+    task: asyncio.Task | None = field(default=None, init=False)
+    written: asyncio.Event = field(default_factory=asyncio.Event, init=False)
+
+    async def start(self):
+        logger.info('Starting outbox relay')
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        logger.info('Stopping outbox relay')
+        if self.task is None:
+            return
+
+        # unsent rows stay in the table and are picked up by the next relay to start
+        self.task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self.task
+        self.task = None
+
+    def wake(self) -> None:
+        self.written.set()
+
+    async def run(self):
+        while True:
+            try:
+                relayed = await self.relay_batch()
+            except Exception as e:
+                logger.exception('Failed to relay outbox batch: %s', str(e))
+                relayed = 0
+
+            if relayed < self.batch_size:
+                if not relayed:
+                    await self.purge_sent()
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(self.written.wait(), self.poll_interval_seconds)
+                self.written.clear()
+
+    async def relay_batch(self) -> int:
+        # the rows stay locked until marked and other relays skip them, so instances can share the table
+        async with self.session_factory() as session, session.begin():
+            rows = (await session.scalars(
+                select(OutboxMessageModel)
+                .where(OutboxMessageModel.sent_at.is_(None))
+                .order_by(OutboxMessageModel.created_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not rows:
+                return 0
+
+            # published together so the broker confirms are awaited as one round trip rather than one per row
+            results = await asyncio.gather(
+                *(
+                    self.producer.publish_message(
+                        body=row.payload,
+                        topic=row.topic,
+                        message_id=str(row.id),
+                        headers=row.headers,
+                    )
+                    for row in rows
+                ),
+                return_exceptions=True,
+            )
+
+            sent_ids = []
+            for row, result in zip(rows, results):
+                if isinstance(result, Exception):
+                    self.failed += 1
+                    logger.error('Failed to relay outbox message \'%s\' to topic \'%s\': %s', row.id, row.topic, result)
+                else:
+                    sent_ids.append(row.id)
+
+            if sent_ids:
+                await session.execute(
+                    update(OutboxMessageModel)
+                    .where(OutboxMessageModel.id.in_(sent_ids))
+                    .values(sent_at=func.now())
+                )
+
+        self.relayed += len(sent_ids)
+        logger.debug('Relayed %d of %d outbox messages', len(sent_ids), len(rows))
+        return len(sent_ids)
+
+    async def purge_sent(self) -> None:
+        try:
+            async with self.session_factory() as session, session.begin():
+                await session.execute(
+                    delete(OutboxMessageModel)
+                    .where(OutboxMessageModel.sent_at < func.now() - timedelta(seconds=self.retention_seconds))
+                )
+        except Exception as e:
+            logger.warning('Failed to purge sent outbox messages: %s', str(e))
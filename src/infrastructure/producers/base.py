@@ -11,6 +11,9 @@ class BaseProducer(ABC):
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.stop()
 
+    def stats(self) -> dict[str, int]:
+        return {}
+
     @abstractmethod
     async def start(self):
         ...
@@ -22,3 +25,7 @@ class BaseProducer(ABC):
     @abstractmethod
     async def publish(self, event: BaseEvent, topic: str):
         ...
+
+    @abstractmethod
+    async def publish_message(self, body: bytes, topic: str, message_id: str, headers: dict[str, str | int] | None = None):
+        ...
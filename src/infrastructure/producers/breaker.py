@@ -0,0 +1,46 @@
+import logging
+import time
+from dataclasses import dataclass, field
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CircuitBreaker:
+    failure_threshold: int
+    reset_timeout_seconds: float
+    failures: int = field(default=0, init=False)
+    opened_at: float | None = field(default=None, init=False)
+    trips: int = field(default=0, init=False)
+
+    @property
+    def closed(self) -> bool:
+        return self.opened_at is None
+
+    @property
+    def state(self) -> str:
+        if self.closed:
+            return 'closed'
+        return 'half-open' if self.probe_due() else 'open'
+
+    def probe_due(self) -> bool:
+        # once open for reset_timeout_seconds, a single probe call decides whether to close it
+        return self.opened_at is not None and time.monotonic() - self.opened_at >= self.reset_timeout_seconds
+
+    def record_success(self) -> None:
+        if not self.closed:
+            logger.info('Circuit closed after %d failures', self.failures)
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if not self.closed or self.failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self) -> None:
+        if self.closed:
+            self.trips += 1
+            logger.warning('Circuit opened for %.1fs after %d failures', self.reset_timeout_seconds, self.failures)
+        self.opened_at = time.monotonic()
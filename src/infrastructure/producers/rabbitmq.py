@@ -1,8 +1,9 @@
+import asyncio
 import logging
-from dataclasses import dataclass
+from contextlib import suppress
+from dataclasses import dataclass, field
 
 import aio_pika
-import orjson
 from aio_pika.abc import (
     AbstractRobustConnection,
     AbstractRobustChannel,
@@ -11,12 +12,21 @@ from aio_pika.abc import (
 )
 
 from domain.events.base import BaseEvent
+from infrastructure.converters.events import convert_event_to_json, get_event_headers
 from infrastructure.producers.base import BaseProducer
+from settings.config import settings
 
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class PendingMessage:
+    message: aio_pika.Message
+    routing_key: str
+    confirmed: asyncio.Future
+
+
 @dataclass
 class RabbitMQProducer(BaseProducer):
     host: str
@@ -25,10 +35,19 @@ class RabbitMQProducer(BaseProducer):
     password: str
     virtual_host: str
     exchange_name: str
+    channel_pool_size: int = settings.RABBITMQ_PRODUCER_CHANNEL_POOL_SIZE
+    batch_size: int = settings.RABBITMQ_PRODUCER_BATCH_SIZE
+    batch_window_ms: float = settings.RABBITMQ_PRODUCER_BATCH_WINDOW_MS
     connection: AbstractRobustConnection | None = None
-    channel: AbstractRobustChannel | None = None
-    exchange: AbstractExchange | None = None
-
+    channels: list[AbstractRobustChannel] = field(default_factory=list)
+    exchanges: asyncio.Queue[AbstractExchange] = field(default_factory=asyncio.Queue, init=False)
+    pending: list[PendingMessage] = field(default_factory=list, init=False)
+    batch_ready: asyncio.Event = field(default_factory=asyncio.Event, init=False)
+    batcher: asyncio.Task | None = field(default=None, init=False)
+    batch_tasks: set[asyncio.Task] = field(default_factory=set, init=False)
+    start_lock: asyncio.Lock = field(default_factory=asyncio.Lock, init=False)
+    batches: int = field(default=0, init=False)
+    published: int = field(default=0, init=False)
 
     async def start(self):
         logger.info(
@@ -46,49 +65,74 @@ class RabbitMQProducer(BaseProducer):
             )
             logger.debug('RabbitMQ connection established')
 
-            self.channel = await self.connection.channel()
-            logger.debug('RabbitMQ channel created')
-
-            self.exchange = await self.channel.declare_exchange(
-                self.exchange_name,
-                ExchangeType.TOPIC,
-                durable=True,
-            )
+            for _ in range(self.channel_pool_size):
+                channel = await self.connection.channel(publisher_confirms=True)
+                self.channels.append(channel)
+                self.exchanges.put_nowait(
+                    await channel.declare_exchange(
+                        self.exchange_name,
+                        ExchangeType.TOPIC,
+                        durable=True,
+                    )
+                )
+            logger.debug('RabbitMQ channel pool of %d created', self.channel_pool_size)
+
+            self.batcher = asyncio.create_task(self.run_batches())
             logger.info('Connected to RabbitMQ exchange \'%s\'', self.exchange_name)
-        except Exception as e:
+        except BaseException as e:
             logger.critical('Failed to connect to RabbitMQ: %s', str(e), exc_info=True)
+            # a later start must not find half a pool
+            self.channels.clear()
+            self.exchanges = asyncio.Queue()
+            if self.connection:
+                with suppress(Exception):
+                    await self.connection.close()
+                self.connection = None
             raise
 
     async def stop(self):
         logger.info('Closing RabbitMQ connections')
         try:
-            if hasattr(self, 'channel') and self.channel:
+            if self.batcher:
+                self.batcher.cancel()
+                with suppress(asyncio.CancelledError):
+                    await self.batcher
+                self.batcher = None
+
+            # messages already handed to the producer are still published before the channels close
+            while self.pending:
+                await self.publish_batch(await self.exchanges.get(), self.take_batch())
+            if self.batch_tasks:
+                await asyncio.gather(*self.batch_tasks, return_exceptions=True)
+
+            for channel in self.channels:
                 logger.debug('Closing RabbitMQ channel')
-                await self.channel.close()
+                await channel.close()
+            self.channels.clear()
+            self.exchanges = asyncio.Queue()
 
-            if hasattr(self, 'connection') and self.connection:
+            if self.connection:
                 logger.debug('Closing RabbitMQ connection')
                 await self.connection.close()
+                self.connection = None
 
             logger.info('RabbitMQ connections closed successfully')
         except Exception as e:
             logger.critical('Error closing RabbitMQ connections: %s', str(e), exc_info=True)
             raise
 
+    def stats(self) -> dict[str, int]:
+        return {'batches': self.batches, 'published': self.published, 'pending': len(self.pending)}
+
     async def publish(self, event: BaseEvent, topic: str):
         logger.debug('Publishing %s event to topic \'%s\'', event.__class__.__name__, topic)
 
-        if not hasattr(self, 'connection') or not self.connection or not hasattr(self, 'exchange') or not self.exchange:
-            logger.debug('RabbitMQ connection not established, starting connection')
-            await self.start()
-
         try:
-            await self.exchange.publish(
-                aio_pika.Message(
-                    body=orjson.dumps(event.__dict__),
-                    content_type='application/json',
-                ),
-                routing_key=topic,
+            await self.publish_message(
+                body=convert_event_to_json(event),
+                topic=topic,
+                message_id=str(event.event_id),
+                headers=get_event_headers(event),
             )
             logger.info(
                 'Published %s event to topic \'%s\'',
@@ -103,3 +147,68 @@ class RabbitMQProducer(BaseProducer):
                 str(e)
             )
             raise
+
+    async def publish_message(self, body: bytes, topic: str, message_id: str, headers: dict[str, str | int] | None = None):
+        if self.batcher is None:
+            async with self.start_lock:
+                if self.batcher is None:
+                    logger.debug('RabbitMQ connection not established, starting connection')
+                    await self.start()
+
+        pending = PendingMessage(
+            message=aio_pika.Message(
+                body=body,
+                content_type='application/json',
+                message_id=message_id,
+                headers=headers,
+            ),
+            routing_key=topic,
+            confirmed=asyncio.get_running_loop().create_future(),
+        )
+        self.pending.append(pending)
+        self.batch_ready.set()
+        await pending.confirmed
+
+    def take_batch(self) -> list[PendingMessage]:
+        batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+        if not self.pending:
+            self.batch_ready.clear()
+        return batch
+
+    async def run_batches(self):
+        while True:
+            await self.batch_ready.wait()
+            if len(self.pending) < self.batch_size:
+                # lets the concurrent callers of this window join the batch, sent together on a free channel
+                await asyncio.sleep(self.batch_window_ms / 1000)
+
+            exchange = await self.exchanges.get()
+            task = asyncio.create_task(self.publish_batch(exchange, self.take_batch()))
+            self.batch_tasks.add(task)
+            task.add_done_callback(self.batch_tasks.discard)
+
+    async def publish_batch(self, exchange: AbstractExchange, batch: list[PendingMessage]):
+        # the whole batch is written before any confirm is awaited; the channel goes back once all confirms are in
+        try:
+            await asyncio.gather(*(self.publish_pending(exchange, pending) for pending in batch))
+        except BaseException:
+            # the confirms will not be awaited any more, so the callers must not be left waiting on them
+            for pending in batch:
+                pending.confirmed.cancel()
+            raise
+        finally:
+            self.exchanges.put_nowait(exchange)
+
+        self.batches += 1
+
+    async def publish_pending(self, exchange: AbstractExchange, pending: PendingMessage):
+        try:
+            await exchange.publish(pending.message, routing_key=pending.routing_key)
+        except Exception as e:
+            if not pending.confirmed.done():
+                pending.confirmed.set_exception(e)
+            return
+
+        self.published += 1
+        if not pending.confirmed.done():
+            pending.confirmed.set_result(None)
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+import struct
+from contextlib import suppress
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO
+
+import orjson
+
+from domain.events.base import BaseEvent
+from infrastructure.converters.events import convert_event_to_json, get_event_headers
+from infrastructure.producers.base import BaseProducer
+from infrastructure.producers.breaker import CircuitBreaker
+from settings.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# every record is a big-endian uint32 length followed by that many bytes of orjson
+RECORD_LENGTH = struct.Struct('>I')
+
+
+@dataclass(slots=True)
+class SpooledMessage:
+    body: bytes
+    topic: str
+    message_id: str
+    headers: dict[str, str | int] | None = None
+
+
+def encode_spool_record(message: SpooledMessage) -> bytes:
+    record = orjson.dumps({
+        'topic': message.topic,
+        'message_id': message.message_id,
+        'headers': message.headers,
+        # embedded as is, the body is already serialized JSON
+        'body': orjson.Fragment(message.body),
+    })
+    return RECORD_LENGTH.pack(len(record)) + record
+
+
+def decode_spool_records(data: bytes) -> list[SpooledMessage]:
+    messages = []
+    offset = 0
+    while offset + RECORD_LENGTH.size <= len(data):
+        (length,) = RECORD_LENGTH.unpack_from(data, offset)
+        start = offset + RECORD_LENGTH.size
+        if start + length > len(data):
+            # cut short by a crash mid-write
+            break
+
+        record = orjson.loads(data[start:start + length])
+        messages.append(
+            SpooledMessage(
+                body=orjson.dumps(record['body']),
+                topic=record['topic'],
+                message_id=record['message_id'],
+                headers=record['headers'],
+            )
+        )
+        offset = start + length
+
+    if offset != len(data):
+        logger.warning('Ignoring %d bytes of a truncated spool record', len(data) - offset)
+    return messages
+
+
+@dataclass
+class EventSpool:
+    path: Path
+    fsync: bool = False
+    file: BinaryIO | None = field(default=None, init=False)
+
+    @property
+    def replaying_path(self) -> Path:
+        return self.path.with_name(f'{self.path.name}.replaying')
+
+    def append(self, message: SpooledMessage) -> None:
+        if self.file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = open(self.path, 'ab')
+
+        self.file.write(encode_spool_record(message))
+        # flushing survives a process crash, fsync also a host crash but at a much lower append rate
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def rotate(self) -> bool:
+        # a replay file left by an interrupted replay goes first
+        if self.replaying_path.exists():
+            return True
+        if not self.path.exists():
+            return False
+
+        # appends during the replay start a new file
+        self.close()
+        os.replace(self.path, self.replaying_path)
+        return True
+
+    def read(self) -> list[SpooledMessage]:
+        return decode_spool_records(self.replaying_path.read_bytes())
+
+    def keep(self, messages: list[SpooledMessage]) -> None:
+        if not messages:
+            self.replaying_path.unlink(missing_ok=True)
+            return
+
+        rewritten = self.replaying_path.with_name(f'{self.replaying_path.name}.tmp')
+        rewritten.write_bytes(b''.join(encode_spool_record(message) for message in messages))
+        os.replace(rewritten, self.replaying_path)
+
+
+@dataclass
+class SpoolingProducer(BaseProducer):
+    producer: BaseProducer
+    spool: EventSpool
+    breaker: CircuitBreaker
+    publish_timeout_seconds: float = settings.RABBITMQ_PRODUCER_PUBLISH_TIMEOUT_SECONDS
+    replay_interval_seconds: float = settings.RABBITMQ_PRODUCER_SPOOL_REPLAY_INTERVAL_SECONDS
+    replay_batch_size: int = settings.RABBITMQ_PRODUCER_SPOOL_REPLAY_BATCH_SIZE
+    replayer: asyncio.Task | None = field(default=None, init=False)
+    spooled: int = field(default=0, init=False)
+    replayed: int = field(default=0, init=False)
+
+    async def start(self):
+        try:
+            await asyncio.wait_for(self.producer.start(), self.publish_timeout_seconds)
+        except Exception as e:
+            # the app starts anyway; events are spooled until the replayer gets through
+            logger.error('Producer unavailable, spooling events: %s', str(e))
+            self.breaker.trip()
+
+        self.replayer = asyncio.create_task(self.run_replay())
+
+    async def stop(self):
+        if self.replayer:
+            self.replayer.cancel()
+            with suppress(asyncio.CancelledError):
+                await self.replayer
+            self.replayer = None
+
+        try:
+            await self.producer.stop()
+        finally:
+            self.spool.close()
+
+    def stats(self) -> dict[str, int | str]:
+        return {
+            **self.producer.stats(),
+            'breaker': self.breaker.state,
+            'breaker_trips': self.breaker.trips,
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+        }
+
+    async def publish(self, event: BaseEvent, topic: str):
+        await self.publish_message(
+            body=convert_event_to_json(event),
+            topic=topic,
+            message_id=str(event.event_id),
+            headers=get_event_headers(event),
+        )
+
+    async def publish_message(self, body: bytes, topic: str, message_id: str, headers: dict[str, str | int] | None = None):
+        message = SpooledMessage(body=body, topic=topic, message_id=message_id, headers=headers)
+        if self.breaker.closed:
+            try:
+                await self.publish_spooled(message)
+                self.breaker.record_success()
+                return
+            except Exception as e:
+                # a timed out publish may still have reached the broker; consumers dedupe the replayed copy
+                self.breaker.record_failure()
+                logger.warning('Failed to publish message \'%s\' to topic \'%s\', spooling it: %s', message_id, topic, e)
+
+        self.spool.append(message)
+        self.spooled += 1
+
+    async def publish_spooled(self, message: SpooledMessage):
+        await asyncio.wait_for(
+            self.producer.publish_message(
+                body=message.body,
+                topic=message.topic,
+                message_id=message.message_id,
+                headers=message.headers,
+            ),
+            self.publish_timeout_seconds,
+        )
+
+    async def run_replay(self):
+        while True:
+            await asyncio.sleep(self.replay_interval_seconds)
+            if not (self.breaker.closed or self.breaker.probe_due()):
+                continue
+
+            try:
+                await self.replay()
+            except Exception as e:
+                logger.exception('Failed to replay spooled messages: %s', str(e))
+
+    async def replay(self) -> int:
+        # while the breaker is open, the first batch is the probe that closes it
+        replayed = 0
+        while self.spool.rotate():
+            messages = await asyncio.to_thread(self.spool.read)
+            logger.info('Replaying %d spooled messages', len(messages))
+            while messages:
+                batch, messages = messages[:self.replay_batch_size], messages[self.replay_batch_size:]
+                results = await asyncio.gather(
+                    *(self.publish_spooled(message) for message in batch),
+                    return_exceptions=True,
+                )
+                failed = [message for message, result in zip(batch, results) if isinstance(result, Exception)]
+                replayed += len(batch) - len(failed)
+                self.replayed += len(batch) - len(failed)
+                if failed:
+                    self.breaker.trip()
+                    await asyncio.to_thread(self.spool.keep, failed + messages)
+                    logger.warning('Spool replay stopped, %d messages left', len(failed) + len(messages))
+                    return replayed
+
+            await asyncio.to_thread(self.spool.keep, [])
+            self.breaker.record_success()
+
+        return replayed
@@ -1,9 +1,12 @@
 import logging
 from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 from uuid import UUID
 
 from domain.entities.users import UserEntity, UserCredentialsStatus
+from domain.events.base import BaseEvent
 
 
 logger = logging.getLogger(__name__)
@@ -12,6 +15,8 @@ logger = logging.getLogger(__name__)
 @dataclass
 class BaseUserRepository(ABC):
     loaded_users: set[UserEntity] = field(default_factory=set, kw_only=True)
+    pending_cache_invalidations: set[UUID] = field(default_factory=set, kw_only=True)
+    users_with_events: deque[UserEntity] = field(default_factory=deque, kw_only=True)
 
     @abstractmethod
     async def add(
@@ -27,6 +32,20 @@ class BaseUserRepository(ABC):
     ) -> UserEntity:
         ...
 
+    @abstractmethod
+    async def add_many(
+        self,
+        users: Iterable[UserEntity],
+    ) -> None:
+        ...
+
+    @abstractmethod
+    async def get_many(
+        self,
+        user_ids: Iterable[UUID],
+    ) -> list[UserEntity]:
+        ...
+
     @abstractmethod
     async def update_status(
         self,
@@ -35,6 +54,13 @@ class BaseUserRepository(ABC):
     ) -> UserEntity:
         ...
 
+    @abstractmethod
+    async def update_status_many(
+        self,
+        statuses: dict[UUID, UserCredentialsStatus],
+    ) -> list[UserEntity]:
+        ...
+
     @abstractmethod
     async def update_photo(
         self,
@@ -66,13 +92,32 @@ class BaseUserRepository(ABC):
     ) -> UserEntity:
         ...
 
+    def register_events(
+        self,
+        user: UserEntity,
+        events: Iterable[BaseEvent],
+    ) -> None:
+        """Attaches events to the user and indexes it, so collecting events never scans every loaded user."""
+        if not user.events:
+            self.users_with_events.append(user)
+        user.events.extend(events)
+
+    async def after_commit(self) -> None:
+        ...
+
+    async def after_rollback(self) -> None:
+        ...
+
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         logger.debug('Initializing repository subclass: %s', cls.__name__)
 
         add = cls.add
+        add_many = cls.add_many
         get = cls.get
+        get_many = cls.get_many
         update_status = cls.update_status
+        update_status_many = cls.update_status_many
         update_photo = cls.update_photo
         update_email = cls.update_email
         update_phone_number = cls.update_phone_number
@@ -87,6 +132,16 @@ class BaseUserRepository(ABC):
             self.loaded_users.add(user)
             logger.debug('User \'%s\' added to loaded_users set', user.id)
 
+        async def _add_many(
+            self,
+            users: Iterable[UserEntity],
+        ) -> None:
+            users = list(users)
+            logger.debug('Adding %d users to repo', len(users))
+            await add_many(self, users)
+            self.loaded_users.update(users)
+            logger.debug('%d users added to loaded_users set', len(users))
+
         async def _get(
             self,
             user_id: UUID,
@@ -97,6 +152,17 @@ class BaseUserRepository(ABC):
             logger.debug('User \'%s\' added to loaded_users set', user.id)
             return user
 
+        async def _get_many(
+            self,
+            user_ids: Iterable[UUID],
+        ) -> list[UserEntity]:
+            user_ids = list(user_ids)
+            logger.debug('Getting %d users from repo', len(user_ids))
+            users = await get_many(self, user_ids)
+            self.loaded_users.update(users)
+            logger.debug('%d users added to loaded_users set', len(users))
+            return users
+
         async def _update_status(
             self,
             user_id: UUID,
@@ -108,6 +174,16 @@ class BaseUserRepository(ABC):
             logger.debug('User \'%s\' added to loaded_users set', user.id)
             return user
 
+        async def _update_status_many(
+            self,
+            statuses: dict[UUID, UserCredentialsStatus],
+        ) -> list[UserEntity]:
+            logger.debug('Updating status for %d users', len(statuses))
+            users = await update_status_many(self, statuses)
+            self.loaded_users.update(users)
+            logger.debug('%d users added to loaded_users set', len(users))
+            return users
+
         async def _update_email(
             self,
             user_id: UUID,
@@ -152,8 +228,11 @@ class BaseUserRepository(ABC):
             return user
 
         cls.add = _add
+        cls.add_many = _add_many
         cls.get = _get
+        cls.get_many = _get_many
         cls.update_status = _update_status
+        cls.update_status_many = _update_status_many
         cls.update_photo = _update_photo
         cls.update_email = _update_email
         cls.update_phone_number = _update_phone_number
@@ -1,12 +1,19 @@
 import logging
 from dataclasses import dataclass
+from collections.abc import Iterable
 from uuid import UUID
 
+from sqlalchemy import any_, bindparam, column, delete, insert, select, update, values
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from domain.entities.users import UserEntity, UserCredentialsStatus
 from infrastructure.cache import cache_repository
-from infrastructure.converters.users import convert_user_entity_to_model, convert_user_model_to_entity
+from infrastructure.converters.users import (
+    convert_user_entity_to_model,
+    convert_user_entity_to_row,
+    convert_user_model_to_entity,
+)
 from infrastructure.exception.users import UserNotFoundException
 from infrastructure.models.users import UserModel
 from infrastructure.repositories.users.base import BaseUserRepository
@@ -14,8 +21,10 @@ from infrastructure.repositories.users.base import BaseUserRepository
 
 logger = logging.getLogger(__name__)
 
+USER_COLUMNS = tuple(UserModel.__table__.columns)
 
-# @cache_repository
+
+@cache_repository
 @dataclass
 class SQLAlchemyUserRepository(BaseUserRepository):
     session: AsyncSession
@@ -31,6 +40,20 @@ class SQLAlchemyUserRepository(BaseUserRepository):
             raise
 
 
+    async def add_many(self, users: Iterable[UserEntity]) -> None:
+        rows = [convert_user_entity_to_row(user) for user in users]
+        if not rows:
+            return
+
+        logger.debug('Adding %d users to DB', len(rows))
+        try:
+            await self.session.execute(insert(UserModel).values(rows))
+            logger.info('%d users added to DB', len(rows))
+        except Exception as e:
+            logger.exception('Error adding %d users to DB: %s', len(rows), str(e))
+            raise
+
+
     async def get(
         self,
         user_id: UUID,
@@ -51,6 +74,28 @@ class SQLAlchemyUserRepository(BaseUserRepository):
             raise
 
 
+    async def get_many(
+        self,
+        user_ids: Iterable[UUID],
+    ) -> list[UserEntity]:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return []
+
+        logger.debug('Getting %d users from DB', len(user_ids))
+        try:
+            result = await self.session.execute(
+                select(*USER_COLUMNS)
+                .where(UserModel.id == any_(bindparam('user_ids', user_ids, type_=ARRAY(UserModel.id.type))))
+            )
+            users = [convert_user_model_to_entity(user) for user in result]
+            logger.debug('%d of %d users found in DB', len(users), len(user_ids))
+            return users
+        except Exception as e:
+            logger.exception('Error retrieving %d users from DB: %s', len(user_ids), str(e))
+            raise
+
+
     async def update_status(
         self,
         user_id: UUID,
@@ -58,12 +103,11 @@ class SQLAlchemyUserRepository(BaseUserRepository):
     ) -> UserEntity:
         logger.debug('Updating status for user \'%s\' to %s', user_id, status)
         try:
-            user = await self.session.get(UserModel, user_id)
+            user = await self._update(user_id, credentials_status=status)
             if not user:
                 logger.debug('User \'%s\' not found in DB for status update', user_id)
                 raise UserNotFoundException(user_id=user_id)
 
-            user.credentials_status = status
             logger.debug('Status for user \'%s\' updated to %s', user_id, status)
             return convert_user_model_to_entity(user)
         except Exception as e:
@@ -71,6 +115,34 @@ class SQLAlchemyUserRepository(BaseUserRepository):
             raise
 
 
+    async def update_status_many(
+        self,
+        statuses: dict[UUID, UserCredentialsStatus],
+    ) -> list[UserEntity]:
+        if not statuses:
+            return []
+
+        logger.debug('Updating status for %d users', len(statuses))
+        try:
+            new_statuses = values(
+                column('id', UserModel.id.type),
+                column('credentials_status', UserModel.credentials_status.type),
+                name='new_statuses',
+            ).data(list(statuses.items()))
+            result = await self.session.execute(
+                update(UserModel)
+                .where(UserModel.id == new_statuses.c.id)
+                .values(credentials_status=new_statuses.c.credentials_status)
+                .returning(*USER_COLUMNS)
+            )
+            users = [convert_user_model_to_entity(user) for user in result]
+            logger.debug('Status updated for %d of %d users', len(users), len(statuses))
+            return users
+        except Exception as e:
+            logger.exception('Error updating status for %d users: %s', len(statuses), str(e))
+            raise
+
+
     async def update_photo(
         self,
         user_id: UUID,
@@ -78,13 +150,12 @@ class SQLAlchemyUserRepository(BaseUserRepository):
     ) -> UserEntity:
         logger.debug('Updating photo for user \'%s\' to %s', user_id, photo)
         try:
-            user = await self.session.get(UserModel, user_id)
+            user = await self._update(user_id, photo=photo)
 
             if not user:
-                logger.debug('User \'%s\' not found in DB for status update', user_id)
+                logger.debug('User \'%s\' not found in DB for photo update', user_id)
                 raise UserNotFoundException(user_id=user_id)
 
-            user.photo = photo
             logger.debug('Photo for user \'%s\' updated to %s', user_id, photo)
             return convert_user_model_to_entity(user)
         except Exception as e:
@@ -99,13 +170,12 @@ class SQLAlchemyUserRepository(BaseUserRepository):
     ) -> UserEntity:
         logger.debug('Updating email for user \'%s\' to %s', user_id, new_email)
         try:
-            user = await self.session.get(UserModel, user_id)
+            user = await self._update(user_id, email=new_email)
 
             if not user:
                 logger.debug('User \'%s\' not found in DB for email update', user_id)
                 raise UserNotFoundException(user_id=user_id)
 
-            user.email = new_email
             logger.debug('Email for user \'%s\' updated to %s', user_id, new_email)
             return convert_user_model_to_entity(user)
         except Exception as e:
@@ -120,13 +190,12 @@ class SQLAlchemyUserRepository(BaseUserRepository):
     ) -> UserEntity:
         logger.debug('Updating phone number for user \'%s\' to %s', user_id, new_phone_number)
         try:
-            user = await self.session.get(UserModel, user_id)
+            user = await self._update(user_id, phone_number=new_phone_number)
 
             if not user:
                 logger.debug('User \'%s\' not found in DB for phone number update', user_id)
                 raise UserNotFoundException(user_id=user_id)
 
-            user.phone_number = new_phone_number
             logger.debug('Phone number for user \'%s\' updated to %s', user_id, new_phone_number)
             return convert_user_model_to_entity(user)
         except Exception as e:
@@ -140,15 +209,29 @@ class SQLAlchemyUserRepository(BaseUserRepository):
     ) -> UserEntity:
         logger.debug('Removing user \'%s\' from DB', user_id)
         try:
-            user = await self.session.get(UserModel, user_id)
+            result = await self.session.execute(
+                delete(UserModel)
+                .where(UserModel.id == user_id)
+                .returning(*USER_COLUMNS)
+            )
+            user = result.one_or_none()
 
             if not user:
-                logger.debug('User \'%s\' not found in DB for status update', user_id)
+                logger.debug('User \'%s\' not found in DB for removal', user_id)
                 raise UserNotFoundException(user_id=user_id)
 
-            await self.session.delete(user)
             logger.info('User \'%s\' removed from DB session', user_id)
             return convert_user_model_to_entity(user)
         except Exception as e:
             logger.exception('Error removing user \'%s\' from DB: %s', user_id, str(e))
             raise
+
+
+    async def _update(self, user_id: UUID, **values):
+        result = await self.session.execute(
+            update(UserModel)
+            .where(UserModel.id == user_id)
+            .values(**values)
+            .returning(*USER_COLUMNS)
+        )
+        return result.one_or_none()
@@ -1,6 +1,10 @@
+import asyncio
 import logging
-from dataclasses import dataclass
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
 
+from aiobotocore.client import AioBaseClient
+from aiobotocore.config import AioConfig
 from aiobotocore.session import AioSession, get_session
 
 from infrastructure.storages.s3.base import BaseS3Client
@@ -15,6 +19,49 @@ class AWSS3Client(BaseS3Client):
     aws_access_key_id: str
     aws_region_name: str
     session: AioSession
+    max_pool_connections: int = settings.S3_MAX_POOL_CONNECTIONS
+    client: AioBaseClient | None = None
+    exit_stack: AsyncExitStack = field(default_factory=AsyncExitStack)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    async def start(self):
+        async with self.lock:
+            if self.client:
+                return
+
+            logger.info(
+                'Opening S3 client for %s with connection pool size %d',
+                self.endpoint_url,
+                self.max_pool_connections,
+            )
+            try:
+                self.client = await self.exit_stack.enter_async_context(
+                    self.session.create_client(
+                        's3',
+                        region_name=self.aws_region_name,
+                        aws_access_key_id=self.aws_access_key_id,
+                        aws_secret_access_key=self.secret_access_key,
+                        endpoint_url=self.endpoint_url,
+                        config=AioConfig(
+                            max_pool_connections=self.max_pool_connections,
+                            signature_version='s3v4',
+                        ),
+                    )
+                )
+                logger.debug('S3 client opened')
+            except Exception as e:
+                logger.critical('Failed to open S3 client: %s', str(e), exc_info=True)
+                raise
+
+    async def stop(self):
+        logger.info('Closing S3 client')
+        try:
+            await self.exit_stack.aclose()
+            self.client = None
+            logger.info('S3 client closed successfully')
+        except Exception as e:
+            logger.critical('Error closing S3 client: %s', str(e), exc_info=True)
+            raise
 
     async def generate_presigned_upload_post(
             self,
@@ -23,30 +70,28 @@ class AWSS3Client(BaseS3Client):
             expires_in: int = settings.S3_PRESIGNED_EXPIRATION_SECONDS,
     ) -> dict:
         logger.debug('Generating presigned upload POST for key: %s', key)
-        async with self.session.create_client(
-                's3',
-                region_name=self.aws_region_name,
-                aws_access_key_id=self.aws_access_key_id,
-                aws_secret_access_key=self.secret_access_key,
-                endpoint_url=self.endpoint_url,
-        ) as client:
-            try:
-                response = await client.generate_presigned_post(
-                    Bucket=self.bucket_name,
-                    Key=key,
-                    Fields={
-                        'Content-Type': content_type,
-                    },
-                    Conditions=[
-                        {'Content-Type': content_type}
-                    ],
-                    ExpiresIn=expires_in
-                )
-                logger.debug('Generated presigned upload POST for key: %s', key)
-                return response
-            except Exception as e:
-                logger.exception('Failed to generate presigned upload POST for key %s: %s', key, str(e))
-                raise
+
+        if not self.client:
+            logger.debug('S3 client not opened, opening client')
+            await self.start()
+
+        try:
+            response = await self.client.generate_presigned_post(
+                Bucket=self.bucket_name,
+                Key=key,
+                Fields={
+                    'Content-Type': content_type,
+                },
+                Conditions=[
+                    {'Content-Type': content_type}
+                ],
+                ExpiresIn=expires_in
+            )
+            logger.debug('Generated presigned upload POST for key: %s', key)
+            return response
+        except Exception as e:
+            logger.exception('Failed to generate presigned upload POST for key %s: %s', key, str(e))
+            raise
 
     async def generate_presigned_download_url(
             self,
@@ -55,25 +100,23 @@ class AWSS3Client(BaseS3Client):
             expires_in: int = settings.S3_PRESIGNED_EXPIRATION_SECONDS,
     ) -> str:
         logger.debug('Generating presigned download URL for key: %s', key)
-        async with self.session.create_client(
-                's3',
-                region_name=self.aws_region_name,
-                aws_access_key_id=self.aws_access_key_id,
-                aws_secret_access_key=self.secret_access_key,
-                endpoint_url=self.endpoint_url,
-        ) as client:
-            try:
-                url = await client.generate_presigned_url(
-                    'get_object',
-                    Params={
-                        'Bucket': self.bucket_name,
-                        'Key': key,
-                        'ResponseContentType': content_type,
-                    },
-                    ExpiresIn=expires_in
-                )
-                logger.debug('Generated presigned download URL for key: %s', key)
-                return url
-            except Exception as e:
-                logger.exception('Failed to generate presigned download URL for key %s: %s', key, str(e))
-                raise
+
+        if not self.client:
+            logger.debug('S3 client not opened, opening client')
+            await self.start()
+
+        try:
+            url = await self.client.generate_presigned_url(
+                'get_object',
+                Params={
+                    'Bucket': self.bucket_name,
+                    'Key': key,
+                    'ResponseContentType': content_type,
+                },
+                ExpiresIn=expires_in
+            )
+            logger.debug('Generated presigned download URL for key: %s', key)
+            return url
+        except Exception as e:
+            logger.exception('Failed to generate presigned download URL for key %s: %s', key, str(e))
+            raise
@@ -1,9 +1,14 @@
+import logging
 from abc import ABC,abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
+from infrastructure.cache.base import BasePresignedURLCacher
 from settings.config import settings
 
 
+logger = logging.getLogger(__name__)
+
+
 # TODO: Make a repo from it?
 
 
@@ -12,6 +17,22 @@ class BaseS3Client(ABC):
     secret_access_key: str
     endpoint_url: str
     bucket_name: str
+    presigned_url_cacher: BasePresignedURLCacher | None = field(default=None, kw_only=True)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    @abstractmethod
+    async def start(self):
+        ...
+
+    @abstractmethod
+    async def stop(self):
+        ...
 
     @abstractmethod
     async def generate_presigned_upload_post(
@@ -30,3 +51,29 @@ class BaseS3Client(ABC):
             expires_in: int = settings.S3_PRESIGNED_EXPIRATION_SECONDS,
     ) -> str:
         ...
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        logger.debug('Initializing S3 client subclass: %s', cls.__name__)
+
+        generate_presigned_download_url = cls.generate_presigned_download_url
+
+        async def _generate_presigned_download_url(
+                self,
+                key: str,
+                content_type: str,
+                expires_in: int = settings.S3_PRESIGNED_EXPIRATION_SECONDS,
+        ) -> str:
+            if not self.presigned_url_cacher:
+                return await generate_presigned_download_url(self, key, content_type, expires_in)
+
+            url = await self.presigned_url_cacher.get_from_cache(key, content_type)
+            if url:
+                logger.debug('Reusing cached presigned download URL for key: %s', key)
+                return url
+
+            url = await generate_presigned_download_url(self, key, content_type, expires_in)
+            await self.presigned_url_cacher.add_to_cache(key, content_type, url, expires_in)
+            return url
+
+        cls.generate_presigned_download_url = _generate_presigned_download_url
@@ -0,0 +1,201 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from urllib.parse import quote, urlsplit
+
+from infrastructure.storages.s3.base import BaseS3Client
+from settings.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = 'AWS4-HMAC-SHA256'
+SERVICE = 's3'
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+SIGV4_TIMESTAMP = '%Y%m%dT%H%M%SZ'
+ISO8601 = '%Y-%m-%dT%H:%M:%SZ'
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+@lru_cache(maxsize=32)
+def derive_signing_key(secret_access_key: str, date_stamp: str, region: str, service: str) -> bytes:
+    key = hmac.digest(f'AWS4{secret_access_key}'.encode(), date_stamp.encode(), 'sha256')
+    key = hmac.digest(key, region.encode(), 'sha256')
+    key = hmac.digest(key, service.encode(), 'sha256')
+    return hmac.digest(key, b'aws4_request', 'sha256')
+
+
+def percent_encode(value: str) -> str:
+    return quote(value, safe='-_.~')
+
+
+@dataclass
+class SigV4Presigner:
+    """Computes S3 presigned GET urls and POST policies without botocore.
+
+    Output matches botocore's path-style presigning for a client created with an explicit endpoint_url.
+    """
+    access_key_id: str
+    secret_access_key: str
+    region_name: str
+    endpoint_url: str
+    bucket_name: str
+    host: str = field(init=False)
+    origin: str = field(init=False)
+    bucket_url: str = field(init=False)
+    bucket_path: str = field(init=False)
+
+    def __post_init__(self):
+        url_parts = urlsplit(self.endpoint_url)
+        self.host = url_parts.hostname
+        if url_parts.port and url_parts.port != DEFAULT_PORTS.get(url_parts.scheme):
+            self.host = f'{self.host}:{url_parts.port}'
+        self.origin = f'{url_parts.scheme}://{url_parts.netloc}'
+        self.bucket_path = f'{url_parts.path.rstrip('/')}/{quote(self.bucket_name, safe='/~')}'
+        self.bucket_url = f'{self.origin}{self.bucket_path}'
+
+    def _scope(self, date_stamp: str) -> str:
+        return f'{date_stamp}/{self.region_name}/{SERVICE}/aws4_request'
+
+    def _sign(self, date_stamp: str, string_to_sign: str) -> str:
+        signing_key = derive_signing_key(self.secret_access_key, date_stamp, self.region_name, SERVICE)
+        return hmac.new(signing_key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    def generate_presigned_url(
+            self,
+            key: str,
+            params: dict[str, str],
+            expires_in: int,
+            now: datetime | None = None,
+    ) -> str:
+        now = now or datetime.now(timezone.utc)
+        timestamp = now.strftime(SIGV4_TIMESTAMP)
+        date_stamp = timestamp[:8]
+        credential = f'{self.access_key_id}/{self._scope(date_stamp)}'
+        path = f'{self.bucket_path}/{quote(key, safe='/~')}'
+
+        query = {
+            **params,
+            'X-Amz-Algorithm': ALGORITHM,
+            'X-Amz-Credential': credential,
+            'X-Amz-Date': timestamp,
+            'X-Amz-Expires': str(expires_in),
+            'X-Amz-SignedHeaders': 'host',
+        }
+        encoded_query = [(percent_encode(k), percent_encode(v)) for k, v in query.items()]
+        canonical_query = '&'.join(f'{k}={v}' for k, v in sorted(encoded_query))
+        canonical_request = f'GET\n{path}\n{canonical_query}\nhost:{self.host}\n\nhost\n{UNSIGNED_PAYLOAD}'
+        string_to_sign = (
+            f'{ALGORITHM}\n{timestamp}\n{self._scope(date_stamp)}\n'
+            f'{hashlib.sha256(canonical_request.encode()).hexdigest()}'
+        )
+        signature = self._sign(date_stamp, string_to_sign)
+
+        query_string = '&'.join(f'{k}={v}' for k, v in encoded_query)
+        return f'{self.origin}{path}?{query_string}&X-Amz-Signature={signature}'
+
+    def generate_presigned_post(
+            self,
+            key: str,
+            fields: dict[str, str],
+            conditions: list,
+            expires_in: int,
+            now: datetime | None = None,
+    ) -> dict:
+        now = now or datetime.now(timezone.utc)
+        timestamp = now.strftime(SIGV4_TIMESTAMP)
+        date_stamp = timestamp[:8]
+        credential = f'{self.access_key_id}/{self._scope(date_stamp)}'
+
+        if key.endswith('${filename}'):
+            key_condition = ['starts-with', '$key', key[:-len('${filename}')]]
+        else:
+            key_condition = {'key': key}
+
+        policy = {
+            'expiration': (now + timedelta(seconds=expires_in)).strftime(ISO8601),
+            'conditions': [
+                *conditions,
+                {'bucket': self.bucket_name},
+                key_condition,
+                {'x-amz-algorithm': ALGORITHM},
+                {'x-amz-credential': credential},
+                {'x-amz-date': timestamp},
+            ],
+        }
+        encoded_policy = base64.b64encode(json.dumps(policy).encode()).decode()
+
+        return {
+            'url': self.bucket_url,
+            'fields': {
+                **fields,
+                'key': key,
+                'x-amz-algorithm': ALGORITHM,
+                'x-amz-credential': credential,
+                'x-amz-date': timestamp,
+                'policy': encoded_policy,
+                'x-amz-signature': self._sign(date_stamp, encoded_policy),
+            },
+        }
+
+
+@dataclass
+class SigV4S3Client(BaseS3Client):
+    aws_access_key_id: str
+    aws_region_name: str
+    presigner: SigV4Presigner = field(init=False)
+
+    def __post_init__(self):
+        self.presigner = SigV4Presigner(
+            access_key_id=self.aws_access_key_id,
+            secret_access_key=self.secret_access_key,
+            region_name=self.aws_region_name,
+            endpoint_url=self.endpoint_url,
+            bucket_name=self.bucket_name,
+        )
+
+    async def start(self):
+        ...
+
+    async def stop(self):
+        ...
+
+    async def generate_presigned_upload_post(
+            self,
+            key: str,
+            content_type: str,
+            expires_in: int = settings.S3_PRESIGNED_EXPIRATION_SECONDS,
+    ) -> dict:
+        logger.debug('Generating presigned upload POST for key: %s', key)
+        try:
+            return self.presigner.generate_presigned_post(
+                key=key,
+                fields={'Content-Type': content_type},
+                conditions=[{'Content-Type': content_type}],
+                expires_in=expires_in,
+            )
+        except Exception as e:
+            logger.exception('Failed to generate presigned upload POST for key %s: %s', key, str(e))
+            raise
+
+    async def generate_presigned_download_url(
+            self,
+            key: str,
+            content_type: str,
+            expires_in: int = settings.S3_PRESIGNED_EXPIRATION_SECONDS,
+    ) -> str:
+        logger.debug('Generating presigned download URL for key: %s', key)
+        try:
+            return self.presigner.generate_presigned_url(
+                key=key,
+                params={'response-content-type': content_type},
+                expires_in=expires_in,
+            )
+        except Exception as e:
+            logger.exception('Failed to generate presigned download URL for key %s: %s', key, str(e))
+            raise
@@ -2,10 +2,11 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass
 
 from domain.commands.base import BaseCommand
+from service.units_of_work.users.base import BaseUserUnitOfWork
 
 
 @dataclass
 class BaseCommandHandler(ABC):
     @abstractmethod
-    async def __call__(self, command: BaseCommand) -> None:
+    async def __call__(self, command: BaseCommand, uow: BaseUserUnitOfWork) -> None:
         ...
@@ -4,10 +4,13 @@ from dataclasses import dataclass
 from domain.commands.users import (
     CreateUserCommand,
     UpdateUserCredentialsStatusCommand,
+    UpdateUserCredentialsStatusManyCommand,
     UpdateUserPhotoCommand,
     DeleteUserCommand, UpdateUserEmailCommand, UpdateUserPhoneNumberCommand,
 )
-from domain.events.users import UserCreatedEvent, UserDeletedEvent
+from domain.events.users import UserCreatedEvent, UserDeletedEvent, UserRegistrationCompletedEvent
+from infrastructure.cache.base import BasePresignedURLCacher
+from infrastructure.exception.users import UserNotFoundException
 from service.handlers.command.base import BaseCommandHandler
 from service.units_of_work.users.base import BaseUserUnitOfWork
 
@@ -17,14 +20,11 @@ logger = logging.getLogger(__name__)
 
 @dataclass
 class CreateUserCommandHandler(BaseCommandHandler):
-    uow: BaseUserUnitOfWork
-
-    async def __call__(self, command: CreateUserCommand) -> None:
+    async def __call__(self, command: CreateUserCommand, uow: BaseUserUnitOfWork) -> None:
         logger.info('Creating new user with ID: \'%s\'', command.user_with_credentials.user.id)
-        async with self.uow:
+        async with uow:
             try:
-                await self.uow.users.add(command.user_with_credentials.user)
-                await self.uow.commit()
+                await uow.users.add(command.user_with_credentials.user)
                 produced_events = [
                     UserCreatedEvent(
                         user_id=command.user_with_credentials.user.id,
@@ -33,7 +33,8 @@ class CreateUserCommandHandler(BaseCommandHandler):
                         password=command.user_with_credentials.password.as_generic(),
                     ),
                 ]
-                command.user_with_credentials.user.events.extend(produced_events)
+                uow.users.register_events(command.user_with_credentials.user, produced_events)
+                await uow.commit()
                 logger.info('User created successfully with ID: \'%s\'', command.user_with_credentials.user.id)
             except Exception as e:
                 logger.exception('Failed to create user: %s', str(e))
@@ -42,18 +43,16 @@ class CreateUserCommandHandler(BaseCommandHandler):
 
 @dataclass
 class DeleteUserCommandHandler(BaseCommandHandler):
-    uow: BaseUserUnitOfWork
-
-    async def __call__(self, command: DeleteUserCommand) -> None:
+    async def __call__(self, command: DeleteUserCommand, uow: BaseUserUnitOfWork) -> None:
         logger.info('Deleting user with ID: \'%s\'', command.user_id)
-        async with self.uow:
+        async with uow:
             try:
-                user = await self.uow.users.remove(user_id=command.user_id)
-                await self.uow.commit()
+                user = await uow.users.remove(user_id=command.user_id)
                 produced_events = [
                     UserDeletedEvent(user_id=command.user_id),
                 ]
-                user.events.extend(produced_events)
+                uow.users.register_events(user, produced_events)
+                await uow.commit()
                 logger.info('User deleted successfully with ID: \'%s\'', command.user_id)
             except Exception as e:
                 logger.exception('Failed to delete user: %s', str(e))
@@ -62,46 +61,76 @@ class DeleteUserCommandHandler(BaseCommandHandler):
 
 @dataclass
 class UpdateUserCredentialsStatusCommandHandler(BaseCommandHandler):
-    uow: BaseUserUnitOfWork
-
-    async def __call__(self, command: UpdateUserCredentialsStatusCommand) -> None:
+    async def __call__(self, command: UpdateUserCredentialsStatusCommand, uow: BaseUserUnitOfWork) -> None:
         logger.info('Updating credentials status for user ID: \'%s\' to %s', command.user_id, command.status)
-        async with self.uow:
+        async with uow:
             try:
-                await self.uow.users.update_status(user_id=command.user_id, status=command.status)
-                await self.uow.commit()
+                user = await uow.users.update_status(user_id=command.user_id, status=command.status)
+                uow.users.register_events(user, [UserRegistrationCompletedEvent.from_user(user)])
+                await uow.commit()
                 logger.info('Credentials status updated successfully for user ID: \'%s\' ', command.user_id)
             except Exception as e:
                 logger.exception('Failed to update credentials status: %s', str(e))
                 raise
 
 
+@dataclass
+class UpdateUserCredentialsStatusManyCommandHandler(BaseCommandHandler):
+    async def __call__(self, command: UpdateUserCredentialsStatusManyCommand, uow: BaseUserUnitOfWork) -> None:
+        logger.info('Updating credentials status for %d users', len(command.statuses))
+        async with uow:
+            try:
+                users = await uow.users.update_status_many(statuses=command.statuses)
+                if len(users) != len(command.statuses):
+                    # update_status_many skips unknown ids; failing here sends a consumer batch down the
+                    # per-message path, where each unknown user is retried on its own
+                    missing = command.statuses.keys() - {user.id for user in users}
+                    raise UserNotFoundException(user_id=next(iter(missing)))
+
+                for user in users:
+                    uow.users.register_events(user, [UserRegistrationCompletedEvent.from_user(user)])
+                await uow.commit()
+                logger.info('Credentials status updated successfully for %d users', len(users))
+            except Exception as e:
+                logger.exception('Failed to update credentials status for %d users: %s', len(command.statuses), str(e))
+                raise
+
+
 @dataclass
 class UpdateUserPhotoCommandHandler(BaseCommandHandler):
-    uow: BaseUserUnitOfWork
+    presigned_url_cacher: BasePresignedURLCacher | None = None
 
-    async def __call__(self, command: UpdateUserPhotoCommand) -> None:
+    async def __call__(self, command: UpdateUserPhotoCommand, uow: BaseUserUnitOfWork) -> None:
         logger.info('Updating user photo for user ID: \'%s\' to %s', command.user_id, command.photo)
-        async with self.uow:
+        async with uow:
             try:
-                await self.uow.users.update_photo(user_id=command.user_id, photo=command.photo)
-                await self.uow.commit()
+                user = await uow.users.update_photo(user_id=command.user_id, photo=command.photo)
+                await uow.commit()
                 logger.info('Photo updated successfully for user ID: \'%s\'', command.user_id)
             except Exception as e:
                 logger.exception('Failed to update photo: %s', str(e))
                 raise
 
+        if self.presigned_url_cacher:
+            try:
+                await self.presigned_url_cacher.remove_from_cache(user.photo)
+            except Exception as e:
+                logger.critical(
+                    'Failed to invalidate presigned URLs for user ID: \'%s\': %s',
+                    command.user_id,
+                    str(e),
+                    exc_info=True,
+                )
+
 
 @dataclass
 class UpdateUserEmailCommandHandler(BaseCommandHandler):
-    uow: BaseUserUnitOfWork
-
-    async def __call__(self, command: UpdateUserEmailCommand) -> None:
+    async def __call__(self, command: UpdateUserEmailCommand, uow: BaseUserUnitOfWork) -> None:
         logger.info('Updating email for user ID: \'%s\' to %s', command.user_id, command.new_email.as_generic())
-        async with self.uow:
+        async with uow:
             try:
-                await self.uow.users.update_email(user_id=command.user_id, new_email=command.new_email.as_generic())
-                await self.uow.commit()
+                await uow.users.update_email(user_id=command.user_id, new_email=command.new_email.as_generic())
+                await uow.commit()
                 logger.info('Email updated successfully for user ID: \'%s\'', command.user_id)
             except Exception as e:
                 logger.exception('Failed to update email: %s', str(e))
@@ -110,14 +139,12 @@ class UpdateUserEmailCommandHandler(BaseCommandHandler):
 
 @dataclass
 class UpdateUserPhoneNumberCommandHandler(BaseCommandHandler):
-    uow: BaseUserUnitOfWork
-
-    async def __call__(self, command: UpdateUserPhoneNumberCommand) -> None:
+    async def __call__(self, command: UpdateUserPhoneNumberCommand, uow: BaseUserUnitOfWork) -> None:
         logger.info('Updating phone number for user ID: \'%s\' to %s', command.user_id, command.new_phone_number.as_generic())
-        async with self.uow:
+        async with uow:
             try:
-                await self.uow.users.update_phone_number(user_id=command.user_id, new_phone_number=command.new_phone_number.as_generic())
-                await self.uow.commit()
+                await uow.users.update_phone_number(user_id=command.user_id, new_phone_number=command.new_phone_number.as_generic())
+                await uow.commit()
                 logger.info('Phone number updated successfully for user ID: \'%s\'', command.user_id)
             except Exception as e:
                 logger.exception('Failed to update phone number: %s', str(e))
@@ -1,4 +1,8 @@
+import asyncio
 import logging
+import time
+from collections import deque
+from collections.abc import Callable, Mapping, Sequence
 from dataclasses import dataclass, field
 from typing import Union
 
@@ -8,28 +12,173 @@ from service.exceptions.users import MessageBusException, WrongMessageBusMessage
 from service.handlers.command.base import BaseCommandHandler
 from service.handlers.event.base import BaseEventHandler
 from service.units_of_work.users.base import BaseUserUnitOfWork
+from settings.config import settings
 
 
 logger = logging.getLogger(__name__)
 
 Message = Union[BaseEvent, BaseCommand]
+CommandsMap = Mapping[type[BaseCommand], BaseCommandHandler]
+EventsMap = Mapping[type[BaseEvent], Sequence[BaseEventHandler]]
+
+
+@dataclass
+class HandlerTiming:
+    calls: int = 0
+    failures: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.calls if self.calls else 0.0
+
+    def record(self, seconds: float, failed: bool = False) -> None:
+        self.calls += 1
+        self.failures += failed
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+
+@dataclass
+class HandlerTimings:
+    """Per-handler timings, shared by the short-lived buses so they outlive a single request."""
+    timings: dict[str, HandlerTiming] = field(default_factory=dict)
+
+    def __getitem__(self, handler_name: str) -> HandlerTiming:
+        return self.timings[handler_name]
+
+    def record(self, handler_name: str, seconds: float, failed: bool = False) -> None:
+        timing = self.timings.get(handler_name)
+        if timing is None:
+            timing = self.timings[handler_name] = HandlerTiming()
+        timing.record(seconds, failed)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        return {
+            handler_name: {
+                'calls': timing.calls,
+                'failures': timing.failures,
+                'mean_ms': timing.mean_seconds * 1000,
+                'max_ms': timing.max_seconds * 1000,
+            }
+            for handler_name, timing in self.timings.items()
+        }
+
+
+@dataclass
+class EventDispatcher:
+    bus_factory: Callable[[], 'MessageBus']
+    workers_count: int = settings.MESSAGE_BUS_DISPATCH_WORKERS
+    queue_size: int = settings.MESSAGE_BUS_DISPATCH_QUEUE_SIZE
+    shutdown_timeout_seconds: float = settings.MESSAGE_BUS_DISPATCH_SHUTDOWN_TIMEOUT_SECONDS
+    queues: list[asyncio.Queue[tuple[BaseEvent, float]]] = field(default_factory=list, init=False)
+    workers: list[asyncio.Task] = field(default_factory=list, init=False)
+    lag: HandlerTiming = field(default_factory=HandlerTiming, init=False)
+    blocked: int = field(default=0, init=False)
+
+    async def start(self):
+        logger.info('Starting %d event dispatch workers', self.workers_count)
+        lane_size = max(1, self.queue_size // self.workers_count)
+        self.queues = [asyncio.Queue(maxsize=lane_size) for _ in range(self.workers_count)]
+        self.workers = [asyncio.create_task(self.work(queue)) for queue in self.queues]
+
+    async def stop(self):
+        if not self.workers:
+            return
+
+        logger.info('Draining %d queued events', self.queued)
+        workers, self.workers = self.workers, []
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self.queues)),
+                self.shutdown_timeout_seconds,
+            )
+        except TimeoutError:
+            logger.error(
+                'Event dispatch queue not drained within %.1fs, dropping %d events',
+                self.shutdown_timeout_seconds,
+                self.queued,
+            )
+
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    @property
+    def queued(self) -> int:
+        return sum(queue.qsize() for queue in self.queues)
+
+    async def dispatch(self, event: BaseEvent):
+        if not self.workers:
+            # stopped, so the caller handles the event itself
+            await self.bus_factory().handle(event)
+            return
+
+        # events of one user always go to the same worker and keep their order
+        key = getattr(event, 'user_id', None)
+        if key is None:
+            key = event.event_id
+        queue = self.queues[hash(key) % len(self.queues)]
+        if queue.full():
+            # the caller waits for a free slot rather than letting the queue grow without bound
+            self.blocked += 1
+            logger.warning('Event dispatch queue is full, waiting to queue %s', event.__class__.__name__)
+        await queue.put((event, time.perf_counter()))
+
+    async def work(self, queue: asyncio.Queue[tuple[BaseEvent, float]]):
+        while True:
+            event, queued_at = await queue.get()
+            lag = time.perf_counter() - queued_at
+            try:
+                await self.bus_factory().handle(event)
+                self.lag.record(lag)
+            except Exception as e:
+                self.lag.record(lag, failed=True)
+                logger.exception('Failed to dispatch event %s: %s', event.__class__.__name__, str(e))
+            finally:
+                queue.task_done()
+
+    def stats(self) -> dict[str, float]:
+        return {
+            'queued': self.queued,
+            'blocked': self.blocked,
+            'dispatched': self.lag.calls,
+            'failures': self.lag.failures,
+            'lag_mean_ms': self.lag.mean_seconds * 1000,
+            'lag_max_ms': self.lag.max_seconds * 1000,
+        }
 
 
 @dataclass
 class MessageBus:
     uow: BaseUserUnitOfWork
-    commands_map: dict[type[BaseCommand], BaseCommandHandler] = field(
+    commands_map: CommandsMap = field(
         default_factory=dict,
         kw_only=True,
     )
-    events_map: dict[type[BaseEvent], list[BaseEventHandler]] = field(
+    events_map: EventsMap = field(
         default_factory=dict,
         kw_only=True,
     )
-    queue: list[Message] = field(
-        default_factory=list,
+    queue: deque[Message] = field(
+        default_factory=deque,
         kw_only=True
     )
+    concurrent_event_handlers: bool = field(
+        default=settings.MESSAGE_BUS_CONCURRENT_EVENT_HANDLERS,
+        kw_only=True,
+    )
+    max_concurrent_event_handlers: int = field(
+        default=settings.MESSAGE_BUS_MAX_CONCURRENT_EVENT_HANDLERS,
+        kw_only=True,
+    )
+    handler_timings: HandlerTimings = field(default_factory=HandlerTimings, kw_only=True)
+    dispatcher: EventDispatcher | None = field(default=None, kw_only=True)
+    event_handlers_semaphore: asyncio.Semaphore = field(init=False)
+
+    def __post_init__(self):
+        self.event_handlers_semaphore = asyncio.Semaphore(self.max_concurrent_event_handlers)
 
     async def handle(self, message: Message):
         logger.info('Processing message: %s', message.__class__.__name__)
@@ -37,11 +186,14 @@ class MessageBus:
 
         try:
             while self.queue:
-                message = self.queue.pop(0)
+                message = self.queue.popleft()
                 if isinstance(message, BaseCommand):
                     await self._handle_command(message)
                 elif isinstance(message, BaseEvent):
-                    await self._handle_event(message)
+                    if self.dispatcher is not None:
+                        await self.dispatcher.dispatch(message)
+                    else:
+                        await self._handle_event(message)
                 else:
                     logger.error('Unrecognized message type: %r', message)
                     raise WrongMessageBusMessageType(message.__class__.__name__)
@@ -64,7 +216,7 @@ class MessageBus:
                 handler.__class__.__name__,
                 command.__class__.__name__
             )
-            await handler(command)
+            await handler(command, self.uow)
             self.queue.extend(self.uow.collect_new_event())
         except HandlerNotFoundException:
             raise
@@ -84,20 +236,42 @@ class MessageBus:
             logger.error('No handlers registered for event: %s', event.__class__.__name__)
             return
 
-        for handler in handlers:
-            try:
-                logger.debug(
-                    'Using handler %s for event %s',
-                    handler.__class__.__name__,
-                    event.__class__.__name__
-                )
-                await handler(event)
-                self.queue.extend(self.uow.collect_new_event())
-            except Exception as e:
-                logger.exception(
-                    'Handler %s failed for event %s',
-                    handler.__class__.__name__,
-                    event.__class__.__name__,
-                    exc_info=e,
-                )
+        if self.concurrent_event_handlers and len(handlers) > 1:
+            await asyncio.gather(*(self._run_event_handler_concurrently(handler, event) for handler in handlers))
+        else:
+            for handler in handlers:
+                await self._run_event_handler(handler, event)
         logger.info('Event handling completed: %s', event.__class__.__name__)
+
+    async def _run_event_handler_concurrently(self, handler: BaseEventHandler, event: BaseEvent):
+        async with self.event_handlers_semaphore:
+            await self._run_event_handler(handler, event)
+
+    async def _run_event_handler(self, handler: BaseEventHandler, event: BaseEvent):
+        logger.debug(
+            'Using handler %s for event %s',
+            handler.__class__.__name__,
+            event.__class__.__name__
+        )
+        started = time.perf_counter()
+        failed = False
+        try:
+            await handler(event)
+            self.queue.extend(self.uow.collect_new_event())
+        except Exception as e:
+            failed = True
+            logger.exception(
+                'Handler %s failed for event %s',
+                handler.__class__.__name__,
+                event.__class__.__name__,
+                exc_info=e,
+            )
+        finally:
+            elapsed = time.perf_counter() - started
+            self.handler_timings.record(handler.__class__.__name__, elapsed, failed)
+            logger.debug(
+                'Handler %s took %.3fms for event %s',
+                handler.__class__.__name__,
+                elapsed * 1000,
+                event.__class__.__name__,
+            )
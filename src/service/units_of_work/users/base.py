@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections import deque
 
 from infrastructure.repositories.users.base import BaseUserRepository
 
@@ -13,9 +14,11 @@ class BaseUserUnitOfWork(ABC):
         await self.rollback()
 
     def collect_new_event(self):
-        for user in self.users.loaded_users:
-            while user.events:
-                yield user.events.pop(0)
+        users_with_events, self.users.users_with_events = self.users.users_with_events, deque()
+        for user in users_with_events:
+            # swapped out rather than popped, so an entity does not carry an empty deque (760 bytes vs 56 for a list)
+            events, user.events = user.events, []
+            yield from events
 
     @abstractmethod
     async def commit(self):
@@ -1,8 +1,12 @@
 import logging
+from collections.abc import Callable, Mapping
 from dataclasses import dataclass
 
 from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from domain.events.base import BaseEvent
+from infrastructure.idempotency.postgresql import record_pending_message_keys
+from infrastructure.outbox.postgresql import record_outbox_events
 from infrastructure.repositories.users.postgresql import SQLAlchemyUserRepository
 from service.exceptions.users import TransactionException
 from service.units_of_work.users.base import BaseUserUnitOfWork
@@ -14,6 +18,8 @@ logger = logging.getLogger(__name__)
 @dataclass
 class SQLAlchemyUserUnitOfWork(BaseUserUnitOfWork):
     session_factory: async_sessionmaker
+    outbox_topics: Mapping[type[BaseEvent], str] | None = None
+    on_outbox_written: Callable[[], None] | None = None
 
     async def __aenter__(self):
         logger.debug('Opening database session')
@@ -31,6 +37,10 @@ class SQLAlchemyUserUnitOfWork(BaseUserUnitOfWork):
     async def commit(self):
         logger.debug('Committing transaction')
         try:
+            await record_pending_message_keys(self.session)
+            outboxed = 0
+            if self.outbox_topics:
+                outboxed = await record_outbox_events(self.session, self.users.users_with_events, self.outbox_topics)
             await self.session.commit()
             logger.debug('Transaction committed successfully')
         except Exception as e:
@@ -38,6 +48,10 @@ class SQLAlchemyUserUnitOfWork(BaseUserUnitOfWork):
             await self.rollback()
             raise TransactionException() from e
 
+        if outboxed and self.on_outbox_written:
+            self.on_outbox_written()
+        await self.users.after_commit()
+
     async def rollback(self):
         logger.debug('Rolling back transaction')
         try:
@@ -46,3 +60,5 @@ class SQLAlchemyUserUnitOfWork(BaseUserUnitOfWork):
         except Exception as e:
             logger.exception('Transaction rollback failed: %s', str(e))
             raise
+        finally:
+            await self.users.after_rollback()
@@ -1,5 +1,6 @@
 import logging
 from pathlib import Path
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -13,6 +14,7 @@ class Settings(BaseSettings):
     USER_SERVICE_API_PORT: int
     USER_SERVICE_API_PREFIX: str = '/api/v1'
     USER_SERVICE_API_DOCS_URL: str = '/api/docs'
+    USER_SERVICE_API_STATS_ENABLED: bool = False
     USER_SERVICE_DEBUG: bool = True
     USER_SERVICE_MEDIA_PATH: str = 'user-service'
     USER_SERVICE_DEFAULT_USER_PHOTO: str = 'default_php.svg.png'
@@ -25,6 +27,16 @@ class Settings(BaseSettings):
     REDIS_PORT: int
 
     CACHE_EXPIRATION_SECONDS: int = 60 * 60 * 24
+    CACHE_USER_ENCODING: Literal['json', 'binary'] = 'binary'
+    CACHE_EXPIRATION_JITTER: float = 0.1
+    CACHE_NOT_FOUND_EXPIRATION_SECONDS: int = 30
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+    CACHE_LOCK_ENABLED: bool = False
+    CACHE_LOCK_TIMEOUT_SECONDS: float = 2.0
+    CACHE_LOCK_POLL_INTERVAL_SECONDS: float = 0.05
+    USER_CACHE_LOCAL_MAX_ENTRIES: int = 10_000
+    USER_CACHE_LOCAL_TTL_SECONDS: int = 5
+    USER_CACHE_INVALIDATION_CHANNEL: str = 'user-service:user-cache-invalidation'
 
     POSTGRES_HOST: str
     POSTGRES_PORT: int
@@ -37,10 +49,59 @@ class Settings(BaseSettings):
     RABBITMQ_PASSWORD: str
     RABBITMQ_VHOST: str
     RABBITMQ_PORT: int
+    RABBITMQ_PRODUCER_CHANNEL_POOL_SIZE: int = 4
+    RABBITMQ_PRODUCER_BATCH_SIZE: int = 100
+    RABBITMQ_PRODUCER_BATCH_WINDOW_MS: float = 1.0
+    RABBITMQ_PRODUCER_PUBLISH_TIMEOUT_SECONDS: float = 2
+    # events that cannot be published are appended to a local spool and replayed once the broker is back
+    RABBITMQ_PRODUCER_SPOOL_ENABLED: bool = True
+    RABBITMQ_PRODUCER_SPOOL_PATH: Path = BASE_PATH / 'spool/events.spool'
+    RABBITMQ_PRODUCER_SPOOL_FSYNC: bool = False
+    RABBITMQ_PRODUCER_SPOOL_REPLAY_INTERVAL_SECONDS: float = 1
+    RABBITMQ_PRODUCER_SPOOL_REPLAY_BATCH_SIZE: int = 500
+    RABBITMQ_PRODUCER_BREAKER_FAILURE_THRESHOLD: int = 3
+    RABBITMQ_PRODUCER_BREAKER_RESET_SECONDS: float = 5
 
     NANOSERVICES_EXCH_NAME: str
     USER_SERVICE_QUEUE_NAME: str = 'user_service_queue'
     USER_SERVICE_CONSUMING_TOPICS: list[str] = ['user.#']
+    USER_SERVICE_CONSUMER_PREFETCH_COUNT: int = 32
+    USER_SERVICE_CONSUMER_WORKERS: int = 1
+    USER_SERVICE_CONSUMER_SHUTDOWN_TIMEOUT_SECONDS: float = 10
+    USER_SERVICE_CONSUMER_BATCH_SIZE: int = 1
+    USER_SERVICE_CONSUMER_BATCH_TIMEOUT_MS: int = 50
+    # a message waiting in a delay queue no longer holds back the later messages of its user, so a retried
+    # update may land after a newer one; set USER_SERVICE_CONSUMER_MAX_ATTEMPTS to 1 where per-user order matters more
+    USER_SERVICE_CONSUMER_MAX_ATTEMPTS: int = 5
+    USER_SERVICE_CONSUMER_RETRY_BASE_DELAY_MS: int = 1000
+    USER_SERVICE_CONSUMER_IDEMPOTENCY_STORE: Literal['none', 'redis', 'postgres'] = 'redis'
+    IDEMPOTENCY_EXPIRATION_SECONDS: int = 60 * 60 * 24
+    IDEMPOTENCY_IN_PROGRESS_SECONDS: int = 60 * 5
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: float = 60 * 60
+    USER_SERVICE_CONSUMER_PARTITION_KEY: str = 'user_id'
+    # with a hash partition set, every consumed message must carry USER_SERVICE_CONSUMER_HASH_HEADER: the
+    # consistent-hash exchange hashes messages without it onto one partition. Upstream publishers (the auth
+    # service for user.credentials.created, user.email.updated and user.phone_number.updated) have to set it
+    # to the user id; messages missing it are logged and counted in the consumer stats
+    USER_SERVICE_CONSUMER_HASH_PARTITION: int | None = None
+    USER_SERVICE_CONSUMER_HASH_HEADER: str = 'user_id'
+
+    # events are written to the outbox table in the command's transaction and published by a background relay
+    USER_SERVICE_OUTBOX_ENABLED: bool = True
+    USER_SERVICE_OUTBOX_BATCH_SIZE: int = 100
+    USER_SERVICE_OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    USER_SERVICE_OUTBOX_RETENTION_SECONDS: int = 60 * 60 * 24
+
+    # publishes event bodies as JSON arrays in schema field order instead of objects; consumers need the schema
+    EVENT_SERIALIZATION_COMPACT: bool = False
+
+    MESSAGE_BUS_CONCURRENT_EVENT_HANDLERS: bool = False
+    MESSAGE_BUS_MAX_CONCURRENT_EVENT_HANDLERS: int = 8
+    # hands committed events to background workers instead of handling them before the response is sent
+    MESSAGE_BUS_ASYNC_DISPATCH: bool = False
+    MESSAGE_BUS_DISPATCH_WORKERS: int = 4
+    MESSAGE_BUS_DISPATCH_QUEUE_SIZE: int = 1000
+    MESSAGE_BUS_DISPATCH_SHUTDOWN_TIMEOUT_SECONDS: float = 10
 
     LOG_LEVEL: int = logging.WARNING  # one of logging.getLevelNamesMapping().values()
     LOG_FORMAT: str = '[%(asctime)s.%(msecs)03d] %(module)10s:%(lineno)-3d %(levelname)s - %(message)s'
@@ -49,6 +110,11 @@ class Settings(BaseSettings):
     S3_ENDPOINT_URL: str
     S3_BUCKET_NAME: str
     S3_PRESIGNED_EXPIRATION_SECONDS: int = 60 * 60
+    S3_MAX_POOL_CONNECTIONS: int = 10
+    S3_LOCAL_PRESIGNING: bool = True
+    S3_PRESIGNED_URL_CACHE_SAFETY_MARGIN_SECONDS: int = 60 * 5
+    S3_PRESIGNED_URL_LOCAL_CACHE_MAX_ENTRIES: int = 1024
+    S3_PRESIGNED_URL_LOCAL_CACHE_TTL_SECONDS: int = 60
 
     AWS_S3_ACCESS_KEY_ID: str
     AWS_S3_REGION_NAME: str
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from types import MappingProxyType
 
 from aiobotocore.session import AioSession, get_session
 from punq import Container, Scope
@@ -17,6 +18,7 @@ from domain.commands.base import BaseCommand
 from domain.commands.users import (
     CreateUserCommand,
     UpdateUserCredentialsStatusCommand,
+    UpdateUserCredentialsStatusManyCommand,
     UpdateUserPhotoCommand,
     DeleteUserCommand,
     UpdateUserEmailCommand,
@@ -28,18 +30,30 @@ from domain.events.users import (
     UserRegistrationCompletedEvent,
     UserDeletedEvent
 )
+from infrastructure.cache.base import BasePresignedURLCacher, BaseUserRepositoryCacher
+from infrastructure.cache.redis import RedisPresignedURLCacher, cache_repository
+from infrastructure.converters.events import register_event_serializer
+from infrastructure.idempotency.base import BaseIdempotencyStore
+from infrastructure.idempotency.postgresql import SQLAlchemyIdempotencyStore
+from infrastructure.idempotency.redis import RedisIdempotencyStore
+from infrastructure.outbox.base import BaseOutboxRelay
+from infrastructure.outbox.postgresql import SQLAlchemyOutboxRelay
 from infrastructure.storages.cache import redis_pool as default_redis_pool
 from infrastructure.storages.database import session_factory as default_session_factory
 from infrastructure.producers.base import BaseProducer
+from infrastructure.producers.breaker import CircuitBreaker
 from infrastructure.producers.rabbitmq import RabbitMQProducer
+from infrastructure.producers.spool import EventSpool, SpoolingProducer
 from infrastructure.repositories.users.base import BaseUserRepository
 from infrastructure.repositories.users.postgresql import SQLAlchemyUserRepository
 from infrastructure.storages.s3.aws import AWSS3Client
 from infrastructure.storages.s3.base import BaseS3Client
+from infrastructure.storages.s3.sigv4 import SigV4S3Client
 from service.handlers.command.base import BaseCommandHandler
 from service.handlers.command.users import (
     CreateUserCommandHandler,
     UpdateUserCredentialsStatusCommandHandler,
+    UpdateUserCredentialsStatusManyCommandHandler,
     UpdateUserPhotoCommandHandler,
     DeleteUserCommandHandler,
     UpdateUserEmailCommandHandler,
@@ -51,24 +65,28 @@ from service.handlers.event.users import (
     UserRegistrationCompletedEventHandler,
     UserDeletedEventHandler
 )
-from service.message_bus import MessageBus
+from service.message_bus import CommandsMap, EventDispatcher, EventsMap, HandlerTimings, MessageBus
 from service.units_of_work.users.base import BaseUserUnitOfWork
 from service.units_of_work.users.postgresql import SQLAlchemyUserUnitOfWork
 from settings.config import Settings, settings
 
 
-def get_commands_map(uow: BaseUserUnitOfWork) -> dict[type[BaseCommand], BaseCommandHandler]:
-    create_user_handler = CreateUserCommandHandler(uow=uow)
-    delete_user_handler = DeleteUserCommandHandler(uow=uow)
-    update_user_creds_status_handler = UpdateUserCredentialsStatusCommandHandler(uow=uow)
-    update_user_photo_handler = UpdateUserPhotoCommandHandler(uow=uow)
-    update_user_email_handler = UpdateUserEmailCommandHandler(uow=uow)
-    update_user_phone_number_handler = UpdateUserPhoneNumberCommandHandler(uow=uow)
+def get_commands_map(
+    presigned_url_cacher: BasePresignedURLCacher | None = None,
+) -> dict[type[BaseCommand], BaseCommandHandler]:
+    create_user_handler = CreateUserCommandHandler()
+    delete_user_handler = DeleteUserCommandHandler()
+    update_user_creds_status_handler = UpdateUserCredentialsStatusCommandHandler()
+    update_user_creds_status_many_handler = UpdateUserCredentialsStatusManyCommandHandler()
+    update_user_photo_handler = UpdateUserPhotoCommandHandler(presigned_url_cacher=presigned_url_cacher)
+    update_user_email_handler = UpdateUserEmailCommandHandler()
+    update_user_phone_number_handler = UpdateUserPhoneNumberCommandHandler()
 
     commands_map = {
         CreateUserCommand: create_user_handler,
         DeleteUserCommand: delete_user_handler,
         UpdateUserCredentialsStatusCommand: update_user_creds_status_handler,
+        UpdateUserCredentialsStatusManyCommand: update_user_creds_status_many_handler,
         UpdateUserPhotoCommand: update_user_photo_handler,
         UpdateUserEmailCommand: update_user_email_handler,
         UpdateUserPhoneNumberCommand: update_user_phone_number_handler,
@@ -76,18 +94,34 @@ def get_commands_map(uow: BaseUserUnitOfWork) -> dict[type[BaseCommand], BaseCom
     return commands_map
 
 
+def get_event_topics() -> dict[type[BaseEvent], str]:
+    return {
+        UserCreatedEvent: 'user.created',
+        UserDeletedEvent: 'user.deleted',
+        UserRegistrationCompletedEvent: 'user.registration.completed',
+    }
+
+
+def register_event_serializers() -> None:
+    # bump an event's version whenever its published fields change
+    register_event_serializer(UserCreatedEvent, version=1)
+    register_event_serializer(UserDeletedEvent, version=1)
+    register_event_serializer(UserRegistrationCompletedEvent, version=1)
+
+
 def get_events_map(producer: BaseProducer) -> dict[type[BaseEvent], list[BaseEventHandler]]:
+    topics = get_event_topics()
     user_created_handler = UserCreatedEventHandler(
         producer=producer,
-        topic='user.created',
+        topic=topics[UserCreatedEvent],
     )
     user_deleted_handler = UserDeletedEventHandler(
         producer=producer,
-        topic='user.deleted',
+        topic=topics[UserDeletedEvent],
     )
     user_registration_handler = UserRegistrationCompletedEventHandler(
         producer=producer,
-        topic='user.registration.completed',
+        topic=topics[UserRegistrationCompletedEvent],
     )
 
     events_map = {
@@ -113,10 +147,23 @@ def get_external_events_map(bus: MessageBus) -> dict[str, BaseExternalEventHandl
 
 def _initialize_container() -> Container:
     container = Container()
+    register_event_serializers()
 
     def initialize_s3_client(
         session: AioSession = None,
     ) -> BaseS3Client:
+        presigned_url_cacher = container.resolve(BasePresignedURLCacher)
+
+        if settings.S3_LOCAL_PRESIGNING:
+            return SigV4S3Client(
+                secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+                endpoint_url=settings.S3_ENDPOINT_URL,
+                bucket_name=settings.S3_BUCKET_NAME,
+                aws_access_key_id=settings.AWS_S3_ACCESS_KEY_ID,
+                aws_region_name=settings.AWS_S3_REGION_NAME,
+                presigned_url_cacher=presigned_url_cacher,
+            )
+
         if session is None:
             session = get_session()
 
@@ -127,6 +174,8 @@ def _initialize_container() -> Container:
             aws_access_key_id=settings.AWS_S3_ACCESS_KEY_ID,
             aws_region_name=settings.AWS_S3_REGION_NAME,
             session=session,
+            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+            presigned_url_cacher=presigned_url_cacher,
         )
 
 
@@ -139,6 +188,15 @@ def _initialize_container() -> Container:
         return Redis(connection_pool=redis_pool)
 
 
+    def initialize_presigned_url_cacher(
+        redis: Redis = None,
+    ) -> BasePresignedURLCacher:
+        if redis is None:
+            redis = container.resolve(Redis)
+
+        return RedisPresignedURLCacher(redis=redis)
+
+
     def initialize_user_sqlalchemy_repo(
         session_factory: async_sessionmaker = None,
     ) -> BaseUserRepository:
@@ -154,28 +212,60 @@ def _initialize_container() -> Container:
         if session_factory is None:
             session_factory = default_session_factory
 
-        return SQLAlchemyUserUnitOfWork(session_factory=session_factory)
+        if not settings.USER_SERVICE_OUTBOX_ENABLED:
+            return SQLAlchemyUserUnitOfWork(session_factory=session_factory)
+
+        return SQLAlchemyUserUnitOfWork(
+            session_factory=session_factory,
+            outbox_topics=get_event_topics(),
+            on_outbox_written=container.resolve(BaseOutboxRelay).wake,
+        )
+
+
+    def initialize_commands_map() -> CommandsMap:
+        return MappingProxyType(
+            get_commands_map(presigned_url_cacher=container.resolve(BasePresignedURLCacher))
+        )
+
+
+    def initialize_events_map(
+        producer: BaseProducer = None,
+    ) -> EventsMap:
+        if producer is None:
+            producer = container.resolve(BaseProducer)
+
+        events_map = get_events_map(producer=producer)
+        return MappingProxyType({event: tuple(handlers) for event, handlers in events_map.items()})
 
 
     def initialize_message_bus(
         uow: BaseUserUnitOfWork = None,
-        producer: BaseProducer = None,
     ) -> MessageBus:
         if uow is None:
             uow = container.resolve(BaseUserUnitOfWork)
 
-        if producer is None:
-            producer = container.resolve(BaseProducer)
-
-        bus = MessageBus(
+        return MessageBus(
             uow=uow,
-            commands_map=get_commands_map(uow=uow),
-            events_map=get_events_map(producer=producer),
+            commands_map=container.resolve(CommandsMap),
+            events_map=container.resolve(EventsMap),
+            handler_timings=container.resolve(HandlerTimings),
+            dispatcher=container.resolve(EventDispatcher) if settings.MESSAGE_BUS_ASYNC_DISPATCH else None,
         )
-        return bus
 
 
-    def initialize_producer() -> BaseProducer:
+    def initialize_event_dispatcher() -> EventDispatcher:
+        # the workers' buses handle the events themselves, rather than queueing them again
+        return EventDispatcher(
+            bus_factory=lambda: MessageBus(
+                uow=container.resolve(BaseUserUnitOfWork),
+                commands_map=container.resolve(CommandsMap),
+                events_map=container.resolve(EventsMap),
+                handler_timings=container.resolve(HandlerTimings),
+            ),
+        )
+
+
+    def initialize_rabbitmq_producer() -> RabbitMQProducer:
         return RabbitMQProducer(
             host=settings.RABBITMQ_HOST,
             port=settings.RABBITMQ_PORT,
@@ -186,6 +276,43 @@ def _initialize_container() -> Container:
         )
 
 
+    def initialize_producer() -> BaseProducer:
+        producer = container.resolve(RabbitMQProducer)
+        if not settings.RABBITMQ_PRODUCER_SPOOL_ENABLED:
+            return producer
+
+        return SpoolingProducer(
+            producer=producer,
+            spool=EventSpool(path=settings.RABBITMQ_PRODUCER_SPOOL_PATH, fsync=settings.RABBITMQ_PRODUCER_SPOOL_FSYNC),
+            breaker=CircuitBreaker(
+                failure_threshold=settings.RABBITMQ_PRODUCER_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout_seconds=settings.RABBITMQ_PRODUCER_BREAKER_RESET_SECONDS,
+            ),
+        )
+
+
+    def initialize_outbox_relay(
+        session_factory: async_sessionmaker = None,
+    ) -> BaseOutboxRelay:
+        if session_factory is None:
+            session_factory = default_session_factory
+
+        # not the spooling producer: an unconfirmed row has to stay unsent in the outbox, not move to a local file
+        return SQLAlchemyOutboxRelay(
+            session_factory=session_factory,
+            producer=container.resolve(RabbitMQProducer),
+        )
+
+
+    def initialize_idempotency_store() -> BaseIdempotencyStore | None:
+        match settings.USER_SERVICE_CONSUMER_IDEMPOTENCY_STORE:
+            case 'redis':
+                return RedisIdempotencyStore(redis=container.resolve(Redis))
+            case 'postgres':
+                return SQLAlchemyIdempotencyStore(session_factory=default_session_factory)
+        return None
+
+
     def initialize_consumer(
         bus: MessageBus = None,
     ) -> BaseConsumer:
@@ -202,17 +329,30 @@ def _initialize_container() -> Container:
             queue_name=settings.USER_SERVICE_QUEUE_NAME,
             exchange_name=settings.NANOSERVICES_EXCH_NAME,
             consuming_topics=settings.USER_SERVICE_CONSUMING_TOPICS,
+            prefetch_count=settings.USER_SERVICE_CONSUMER_PREFETCH_COUNT,
+            workers=settings.USER_SERVICE_CONSUMER_WORKERS,
+            hash_partition=settings.USER_SERVICE_CONSUMER_HASH_PARTITION,
+            external_events_map_factory=lambda: get_external_events_map(container.resolve(MessageBus)),
+            idempotency_store=initialize_idempotency_store(),
         )
 
 
     container.register(Settings, instance=settings, scope=Scope.singleton)
     container.register(BaseS3Client, factory=initialize_s3_client, scope=Scope.singleton)
     container.register(Redis, factory=initialize_redis_client, scope=Scope.singleton)
+    container.register(BasePresignedURLCacher, factory=initialize_presigned_url_cacher, scope=Scope.singleton)
+    container.register(BaseUserRepositoryCacher, instance=cache_repository, scope=Scope.singleton)
     container.register(BaseUserRepository, factory=initialize_user_sqlalchemy_repo)
     container.register(BaseUserUnitOfWork, factory=initialize_user_sqlalchemy_uow)
+    container.register(CommandsMap, factory=initialize_commands_map, scope=Scope.singleton)
+    container.register(EventsMap, factory=initialize_events_map, scope=Scope.singleton)
+    container.register(HandlerTimings, instance=HandlerTimings(), scope=Scope.singleton)
+    container.register(EventDispatcher, factory=initialize_event_dispatcher, scope=Scope.singleton)
     container.register(MessageBus, factory=initialize_message_bus)
+    container.register(RabbitMQProducer, factory=initialize_rabbitmq_producer, scope=Scope.singleton)
     container.register(BaseProducer, factory=initialize_producer, scope=Scope.singleton)
     container.register(BaseConsumer, factory=initialize_consumer, scope=Scope.singleton)
+    container.register(BaseOutboxRelay, factory=initialize_outbox_relay, scope=Scope.singleton)
 
     return container
 
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from uuid import uuid4
+
+import orjson
+import pytest
+
+from application.external_events.consumers.rabbitmq import RabbitMQConsumer
+from application.external_events.handlers.base import BaseExternalEventHandler
+from domain.entities.users import UserCredentialsStatus
+from infrastructure.repositories.users.postgresql import SQLAlchemyUserRepository
+from service.message_bus import MessageBus
+from service.units_of_work.users.postgresql import SQLAlchemyUserUnitOfWork
+from settings.container import get_commands_map, get_events_map, get_external_events_map
+from tests.conftest import make_random_user_entity
+from tests.fakes import FakeIncomingMessage, FakeProducer, FakeRabbitMQQueue
+
+
+logger = logging.getLogger(__name__)
+
+MESSAGES_COUNT = 500
+ROUND_TRIP_SECONDS = 0.002
+
+
+@dataclass
+class RoundTripExternalEventHandler(BaseExternalEventHandler):
+    """Stands in for a handler that spends one database round trip per message."""
+
+    async def __call__(self, body: dict) -> None:
+        await asyncio.sleep(ROUND_TRIP_SECONDS)
+
+
+async def measure_drain_rate(workers: int, users_count: int | None = None) -> float:
+    consumer = RabbitMQConsumer(
+        host='localhost',
+        port=5672,
+        login='guest',
+        password='guest',
+        virtual_host='/',
+        exchange_name='exchange',
+        queue_name='queue',
+        connection=object(),
+        queue=FakeRabbitMQQueue(),
+        workers=workers,
+        external_events_map_factory=lambda: {'user.test': RoundTripExternalEventHandler(bus=None)},
+        external_events_map={'user.test': RoundTripExternalEventHandler(bus=None)},
+    )
+    user_ids = [str(uuid4()) for _ in range(users_count or MESSAGES_COUNT)]
+    messages = [
+        FakeIncomingMessage('user.test', orjson.dumps({'user_id': user_ids[n % len(user_ids)]}))
+        for n in range(MESSAGES_COUNT)
+    ]
+    for message in messages:
+        consumer.queue.put(message)
+
+    started = time.perf_counter()
+    consuming_task = asyncio.create_task(consumer.consume())
+    while not all(message.acked for message in messages):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+
+    consuming_task.cancel()
+    await asyncio.gather(consuming_task, return_exceptions=True)
+
+    rate = MESSAGES_COUNT / elapsed
+    logger.info(
+        'consumer with %d lanes, %d users: drained %d messages at %.0f messages/s',
+        workers,
+        len(user_ids),
+        MESSAGES_COUNT,
+        rate,
+    )
+    return rate
+
+
+@pytest.fixture
+def quiet_consumer_loggers():
+    names = ['service.message_bus', 'application.external_events.consumers.rabbitmq']
+    levels = {name: logging.getLogger(name).level for name in names}
+    for name in names:
+        logging.getLogger(name).setLevel(logging.WARNING)
+    yield
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+@pytest.mark.asyncio
+class TestConsumerBenchmark:
+    async def test_drain_rate(self):
+        sequential = await measure_drain_rate(workers=1)
+        concurrent = await measure_drain_rate(workers=8)
+
+        assert concurrent > sequential * 4
+
+
+    @pytest.mark.parametrize('users_count', [4, 64])
+    async def test_drain_rate_by_lane_count(self, users_count):
+        rates = {lanes: await measure_drain_rate(workers=lanes, users_count=users_count) for lanes in [1, 2, 4, 8, 16]}
+
+        # per-user ordering caps the parallelism at the number of distinct users
+        assert rates[16] < rates[1] * (users_count + 1)
+        if users_count > 16:
+            assert rates[16] > rates[4] > rates[1]
+
+
+    @pytest.mark.parametrize('batch_size', [1, 100])
+    async def test_credentials_created_drain_rate(self, postgres_session_factory, quiet_consumer_loggers, batch_size):
+        users = [make_random_user_entity() for _ in range(MESSAGES_COUNT)]
+        async with postgres_session_factory() as session:
+            await SQLAlchemyUserRepository(session=session).add_many(users)
+            await session.commit()
+
+        uow = SQLAlchemyUserUnitOfWork(session_factory=postgres_session_factory)
+        bus = MessageBus(uow=uow, commands_map=get_commands_map(), events_map=get_events_map(producer=FakeProducer()))
+        consumer = RabbitMQConsumer(
+            host='localhost',
+            port=5672,
+            login='guest',
+            password='guest',
+            virtual_host='/',
+            exchange_name='exchange',
+            queue_name='queue',
+            connection=object(),
+            queue=FakeRabbitMQQueue(),
+            batch_size=batch_size,
+            external_events_map=get_external_events_map(bus),
+        )
+        messages = [
+            FakeIncomingMessage(
+                'user.credentials.created',
+                orjson.dumps({'user_id': str(user.id), 'status': UserCredentialsStatus.SUCCESS.value}),
+            )
+            for user in users
+        ]
+        for message in messages:
+            consumer.queue.put(message)
+
+        started = time.perf_counter()
+        consuming_task = asyncio.create_task(consumer.consume())
+        while not all(message.acked for message in messages):
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - started
+
+        consuming_task.cancel()
+        await asyncio.gather(consuming_task, return_exceptions=True)
+        FakeProducer.broker.queue.clear()
+
+        logger.info(
+            'credentials created with batch size %d: drained %d messages at %.0f messages/s',
+            batch_size,
+            MESSAGES_COUNT,
+            MESSAGES_COUNT / elapsed,
+        )
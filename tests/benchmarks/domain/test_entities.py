@@ -0,0 +1,87 @@
+import logging
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+
+from domain.entities.users import UserEntity, UserCredentialsStatus
+from domain.value_objects.users import EmailVO, NameVO
+from tests.benchmarks.utils import measure
+
+
+logger = logging.getLogger(__name__)
+
+ENTITIES_COUNT = 100_000
+
+
+@dataclass(frozen=True)
+class UnslottedNameVO:
+    value: str
+
+
+@dataclass(eq=False)
+class UnslottedUserEntity:
+    """Replica of the user entity layout before slots, used as the baseline."""
+    id: UUID = field(default_factory=uuid4, kw_only=True)
+    events: list = field(default_factory=list, kw_only=True)
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc), kw_only=True)
+    photo: str = field(default='', kw_only=True)
+    email: UnslottedNameVO | None
+    phone_number: UnslottedNameVO | None
+    first_name: UnslottedNameVO | None
+    last_name: UnslottedNameVO | None
+    middle_name: UnslottedNameVO | None
+    credentials_status: UserCredentialsStatus = field(default=UserCredentialsStatus.PENDING, kw_only=True)
+
+    def __post_init__(self):
+        if not any([self.email, self.phone_number]):
+            raise ValueError
+
+
+def build_slotted_user() -> UserEntity:
+    return UserEntity(
+        email=EmailVO.trusted('user@example.com'),
+        phone_number=None,
+        first_name=NameVO.trusted('John'),
+        last_name=NameVO.trusted('Doe'),
+        middle_name=None,
+    )
+
+
+def build_unslotted_user() -> UnslottedUserEntity:
+    return UnslottedUserEntity(
+        email=UnslottedNameVO('user@example.com'),
+        phone_number=None,
+        first_name=UnslottedNameVO('John'),
+        last_name=UnslottedNameVO('Doe'),
+        middle_name=None,
+    )
+
+
+def measure_bytes_per_entity(name: str, build) -> float:
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        entities = [build() for _ in range(ENTITIES_COUNT)]
+        allocated = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+
+    bytes_per_entity = allocated / len(entities)
+    logger.info('%s: %.0f bytes per entity over %d entities', name, bytes_per_entity, len(entities))
+    return bytes_per_entity
+
+
+class TestUserEntityBenchmark:
+    def test_memory_per_entity(self):
+        unslotted = measure_bytes_per_entity('user entity, __dict__', build_unslotted_user)
+        slotted = measure_bytes_per_entity('user entity, slots', build_slotted_user)
+
+        assert slotted < unslotted
+
+
+    def test_construction_throughput(self):
+        unslotted = measure('user entity construction, __dict__', build_unslotted_user, iterations=50000)
+        slotted = measure('user entity construction, slots', build_slotted_user, iterations=50000)
+
+        assert slotted.ops_per_second > unslotted.ops_per_second * 0.9
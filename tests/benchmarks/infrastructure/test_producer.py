@@ -0,0 +1,59 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from infrastructure.producers.rabbitmq import RabbitMQProducer
+from tests.config import test_settings
+
+
+logger = logging.getLogger(__name__)
+
+EVENTS_COUNT = 5000
+CONCURRENT_PUBLISHERS = 100
+
+
+async def measure_publish_rate(channel_pool_size: int, batch_size: int, batch_window_ms: float) -> float:
+    producer = RabbitMQProducer(
+        host=test_settings.TESTS_RABBITMQ_HOST,
+        port=test_settings.TESTS_RABBITMQ_PORT,
+        login=test_settings.TESTS_RABBITMQ_USER,
+        password=test_settings.TESTS_RABBITMQ_PASSWORD,
+        virtual_host=test_settings.TESTS_RABBITMQ_VHOST,
+        exchange_name=test_settings.TESTS_NANOSERVICES_EXCH_NAME,
+        channel_pool_size=channel_pool_size,
+        batch_size=batch_size,
+        batch_window_ms=batch_window_ms,
+    )
+    await producer.start()
+    body = b'{"user_id": "5f0c6a4e-6a57-4c1b-9e55-7d0d3c9f2b11"}'
+
+    async def publisher(offset: int):
+        for i in range(offset, EVENTS_COUNT, CONCURRENT_PUBLISHERS):
+            await producer.publish_message(body, 'benchmark.user.created', str(i))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(publisher(offset) for offset in range(CONCURRENT_PUBLISHERS)))
+    elapsed = time.perf_counter() - started
+    await producer.stop()
+
+    rate = EVENTS_COUNT / elapsed
+    logger.info(
+        'producer with %d channels, batch size %d, window %.1fms: %d confirmed events at %.0f events/s',
+        channel_pool_size,
+        batch_size,
+        batch_window_ms,
+        EVENTS_COUNT,
+        rate,
+    )
+    return rate
+
+
+@pytest.mark.asyncio
+class TestProducerBenchmark:
+    async def test_publish_rate_under_concurrent_load(self):
+        unbatched = await measure_publish_rate(channel_pool_size=1, batch_size=1, batch_window_ms=0)
+        batched = await measure_publish_rate(channel_pool_size=4, batch_size=100, batch_window_ms=1)
+
+        assert batched > unbatched * 2
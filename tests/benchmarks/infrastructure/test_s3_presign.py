@@ -0,0 +1,92 @@
+import logging
+
+import pytest
+from aiobotocore.session import get_session
+
+from infrastructure.storages.s3.aws import AWSS3Client
+from infrastructure.storages.s3.sigv4 import SigV4S3Client
+from settings.config import settings
+from tests.benchmarks.utils import measure_async
+
+
+logger = logging.getLogger(__name__)
+
+KEY = f'{settings.USER_SERVICE_MEDIA_PATH}/user-photos/benchmark/profile-photo.jpg'
+CONTENT_TYPE = 'image/png'
+
+
+@pytest.mark.asyncio
+class TestS3PresignBenchmark:
+    async def test_presigned_download_url_per_call_vs_persistent_client(self):
+        session = get_session()
+
+        async def per_call_client():
+            async with session.create_client(
+                's3',
+                region_name=settings.AWS_S3_REGION_NAME,
+                aws_access_key_id=settings.AWS_S3_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+                endpoint_url=settings.S3_ENDPOINT_URL,
+            ) as client:
+                await client.generate_presigned_url(
+                    'get_object',
+                    Params={
+                        'Bucket': settings.S3_BUCKET_NAME,
+                        'Key': KEY,
+                        'ResponseContentType': CONTENT_TYPE,
+                    },
+                    ExpiresIn=settings.S3_PRESIGNED_EXPIRATION_SECONDS,
+                )
+
+        async with AWSS3Client(
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            bucket_name=settings.S3_BUCKET_NAME,
+            aws_access_key_id=settings.AWS_S3_ACCESS_KEY_ID,
+            aws_region_name=settings.AWS_S3_REGION_NAME,
+            session=session,
+        ) as s3_client:
+            async def persistent_client():
+                await s3_client.generate_presigned_download_url(key=KEY, content_type=CONTENT_TYPE)
+
+            before = await measure_async('presigned download url, client per call', per_call_client, iterations=200)
+            after = await measure_async('presigned download url, persistent client', persistent_client, iterations=200)
+
+        assert after.p99_us < before.p99_us
+
+
+    async def test_presigned_upload_post_persistent_client(self):
+        async with AWSS3Client(
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            bucket_name=settings.S3_BUCKET_NAME,
+            aws_access_key_id=settings.AWS_S3_ACCESS_KEY_ID,
+            aws_region_name=settings.AWS_S3_REGION_NAME,
+            session=get_session(),
+        ) as s3_client:
+            async def persistent_client():
+                await s3_client.generate_presigned_upload_post(key=KEY, content_type=CONTENT_TYPE)
+
+            await measure_async('presigned upload post, persistent client', persistent_client, iterations=200)
+
+
+    async def test_local_sigv4_presigning(self):
+        s3_client = SigV4S3Client(
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            bucket_name=settings.S3_BUCKET_NAME,
+            aws_access_key_id=settings.AWS_S3_ACCESS_KEY_ID,
+            aws_region_name=settings.AWS_S3_REGION_NAME,
+        )
+
+        async def download_url():
+            await s3_client.generate_presigned_download_url(key=KEY, content_type=CONTENT_TYPE)
+
+        async def upload_post():
+            await s3_client.generate_presigned_upload_post(key=KEY, content_type=CONTENT_TYPE)
+
+        download = await measure_async('presigned download url, local sigv4', download_url, iterations=10000)
+        upload = await measure_async('presigned upload post, local sigv4', upload_post, iterations=10000)
+
+        assert download.p50_us < 100
+        assert upload.p50_us < 100
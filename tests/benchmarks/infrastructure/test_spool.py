@@ -0,0 +1,48 @@
+import logging
+
+import orjson
+import pytest
+
+from infrastructure.producers.spool import EventSpool, SpooledMessage, decode_spool_records
+from tests.benchmarks.utils import measure
+
+
+logger = logging.getLogger(__name__)
+
+MESSAGE = SpooledMessage(
+    body=orjson.dumps({
+        'event_id': '0b4f6c8e-1f0a-4c3e-9d55-3c2b1a0f9e87',
+        'user_id': '5f0c6a4e-6a57-4c1b-9e55-7d0d3c9f2b11',
+        'email': 'user@example.com',
+        'phone_number': '+12025550123',
+    }),
+    topic='user.created',
+    message_id='0b4f6c8e-1f0a-4c3e-9d55-3c2b1a0f9e87',
+    headers={'user_id': '5f0c6a4e-6a57-4c1b-9e55-7d0d3c9f2b11'},
+)
+
+
+class TestSpoolBenchmark:
+    @pytest.mark.parametrize('fsync', [False, True])
+    def test_append_throughput(self, tmp_path, fsync):
+        spool = EventSpool(path=tmp_path / 'events.spool', fsync=fsync)
+        iterations = 1000 if fsync else 20000
+
+        result = measure(f'spool append, fsync={fsync}', lambda: spool.append(MESSAGE), iterations=iterations)
+        spool.close()
+
+        assert len(decode_spool_records(spool.path.read_bytes())) == iterations + 10
+        if not fsync:
+            # an outage turns every publish into an append, so it has to keep up with peak publish rates
+            assert result.ops_per_second > 20000
+
+
+    def test_read_throughput(self, tmp_path):
+        spool = EventSpool(path=tmp_path / 'events.spool')
+        for _ in range(10000):
+            spool.append(MESSAGE)
+        spool.close()
+        data = spool.path.read_bytes()
+
+        result = measure('spool decode, 10000 records', lambda: decode_spool_records(data), iterations=20)
+        logger.info('%.0f records/s', 10000 * result.ops_per_second)
@@ -0,0 +1,36 @@
+import logging
+
+import pytest
+
+from infrastructure.cache import cache_repository
+from infrastructure.converters.users import convert_user_model_to_entity
+from infrastructure.models.users import UserModel
+from infrastructure.repositories.users.postgresql import SQLAlchemyUserRepository
+from tests.benchmarks.utils import measure_async
+
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.mark.asyncio
+class TestUserCacheBenchmark:
+    async def test_get_user_cached_vs_uncached(self, random_user_entity, postgres_session_factory):
+        async with postgres_session_factory() as session:
+            await SQLAlchemyUserRepository(session=session).add(random_user_entity)
+            await session.commit()
+
+        async def uncached_get():
+            async with postgres_session_factory() as session:
+                convert_user_model_to_entity(await session.get(UserModel, random_user_entity.id))
+
+        async def cached_get():
+            async with postgres_session_factory() as session:
+                await SQLAlchemyUserRepository(session=session).get(random_user_entity.id)
+
+        try:
+            uncached = await measure_async('get user, postgres', uncached_get, iterations=500)
+            cached = await measure_async('get user, redis read-through cache', cached_get, iterations=500)
+        finally:
+            await cache_repository.remove_from_cache(random_user_entity.id)
+
+        assert cached.p50_us < uncached.p50_us
@@ -0,0 +1,51 @@
+import logging
+
+import pytest
+
+from infrastructure.converters.users import (
+    convert_user_cache_to_entity,
+    convert_user_entity_to_bytes,
+    convert_user_entity_to_json,
+)
+from infrastructure.storages.cache import get_redis_client
+from tests.benchmarks.utils import measure
+
+
+logger = logging.getLogger(__name__)
+
+ENCODERS = {
+    'json': convert_user_entity_to_json,
+    'binary': convert_user_entity_to_bytes,
+}
+
+
+class TestUserCacheEncodingBenchmark:
+    def test_encode_decode_throughput(self, random_user_entity):
+        results = {}
+        for name, encoder in ENCODERS.items():
+            encoded = encoder(random_user_entity)
+            logger.info('%s: %d bytes per user', name, len(encoded))
+            results[name] = (
+                measure(f'encode user, {name}', lambda: encoder(random_user_entity), iterations=20000),
+                measure(f'decode user, {name}', lambda: convert_user_cache_to_entity(encoded), iterations=20000),
+            )
+
+        assert len(convert_user_entity_to_bytes(random_user_entity)) < len(convert_user_entity_to_json(random_user_entity))
+        assert results['binary'][1].p50_us <= results['json'][1].p50_us * 1.25
+
+
+    @pytest.mark.asyncio
+    async def test_redis_memory_per_user(self, random_user_entity):
+        redis = get_redis_client()
+        usage = {}
+        try:
+            for name, encoder in ENCODERS.items():
+                key = f'benchmark:user:{name}:{random_user_entity.id}'
+                await redis.set(key, encoder(random_user_entity))
+                usage[name] = await redis.memory_usage(key, samples=0)
+                await redis.delete(key)
+                logger.info('%s: %d bytes of Redis memory per user', name, usage[name])
+        finally:
+            await redis.aclose()
+
+        assert usage['binary'] < usage['json']
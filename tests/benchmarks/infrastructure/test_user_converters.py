@@ -0,0 +1,61 @@
+import logging
+from uuid import UUID
+
+from domain.entities.users import UserEntity
+from domain.value_objects.users import EmailVO, NameVO, PhoneNumberVO
+from infrastructure.converters.users import (
+    convert_user_bytes_to_entity,
+    convert_user_entity_to_bytes,
+    convert_user_entity_to_model,
+    convert_user_model_to_entity,
+)
+from tests.benchmarks.utils import measure
+
+
+logger = logging.getLogger(__name__)
+
+
+def convert_user_model_to_validated_entity(user) -> UserEntity:
+    return UserEntity(
+        id=UUID(str(user.id)),
+        created_at=user.created_at,
+        photo=user.photo,
+        email=EmailVO(user.email) if user.email else None,
+        phone_number=PhoneNumberVO(user.phone_number) if user.phone_number else None,
+        first_name=NameVO(user.first_name) if user.first_name else None,
+        last_name=NameVO(user.last_name) if user.last_name else None,
+        middle_name=NameVO(user.middle_name) if user.middle_name else None,
+        credentials_status=user.credentials_status,
+    )
+
+
+class TestUserConvertersBenchmark:
+    def test_value_object_validated_vs_trusted(self):
+        validated = measure('email value object, validated', lambda: EmailVO('user@example.com'), iterations=50000)
+        trusted = measure('email value object, trusted', lambda: EmailVO.trusted('user@example.com'), iterations=50000)
+
+        assert trusted.mean_us < validated.mean_us
+
+
+    def test_model_to_entity_validated_vs_trusted(self, random_user_entity):
+        model = convert_user_entity_to_model(random_user_entity)
+        model.credentials_status = random_user_entity.credentials_status
+
+        validated = measure(
+            'model to entity, validated value objects',
+            lambda: convert_user_model_to_validated_entity(model),
+            iterations=20000,
+        )
+        trusted = measure(
+            'model to entity, trusted value objects',
+            lambda: convert_user_model_to_entity(model),
+            iterations=20000,
+        )
+
+        assert trusted.mean_us < validated.mean_us
+
+
+    def test_cache_to_entity_trusted(self, random_user_entity):
+        encoded = convert_user_entity_to_bytes(random_user_entity)
+
+        measure('binary cache to entity, trusted value objects', lambda: convert_user_bytes_to_entity(encoded), iterations=20000)
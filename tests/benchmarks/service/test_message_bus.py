@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+
+import pytest
+
+from domain.commands.base import BaseCommand
+from domain.events.users import UserDeletedEvent
+from service.handlers.command.base import BaseCommandHandler
+from service.handlers.event.base import BaseEventHandler
+from service.message_bus import EventDispatcher, MessageBus
+from tests.benchmarks.utils import measure, measure_async
+from tests.conftest import make_random_user_entity
+from tests.fakes import FakeUserUnitOfWork
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FanOutCommand(BaseCommand):
+    events_count: int
+
+
+class FanOutCommandHandler(BaseCommandHandler):
+    async def __call__(self, command: FanOutCommand, uow: FakeUserUnitOfWork) -> None:
+        user = make_random_user_entity()
+        uow.users.register_events(user, [UserDeletedEvent(user_id=user.id) for _ in range(command.events_count)])
+
+
+class NoOpEventHandler(BaseEventHandler):
+    async def __call__(self, event: UserDeletedEvent) -> None:
+        ...
+
+
+class BrokerRoundTripEventHandler(BaseEventHandler):
+    """Stands in for a publish that waits on one broker confirm."""
+
+    async def __call__(self, event: UserDeletedEvent) -> None:
+        await asyncio.sleep(0.002)
+
+
+def collect_new_event_by_scanning(uow: FakeUserUnitOfWork):
+    """The previous collection strategy: scan every loaded user and pop from the list head."""
+    for user in uow.users.loaded_users:
+        events = list(user.events)
+        while events:
+            yield events.pop(0)
+
+
+@pytest.fixture
+def quiet_message_bus_logger():
+    bus_logger = logging.getLogger('service.message_bus')
+    level = bus_logger.level
+    bus_logger.setLevel(logging.WARNING)
+    yield
+    bus_logger.setLevel(level)
+
+
+@pytest.mark.asyncio
+class TestMessageBusBenchmark:
+    @pytest.mark.usefixtures('quiet_message_bus_logger')
+    @pytest.mark.parametrize('events_count', [1000, 5000, 20000])
+    async def test_command_fan_out(self, events_count):
+        uow = FakeUserUnitOfWork()
+        bus = MessageBus(
+            uow=uow,
+            commands_map={FanOutCommand: FanOutCommandHandler()},
+            events_map={UserDeletedEvent: [NoOpEventHandler(producer=None, topic=None)]},
+        )
+
+        result = await measure_async(
+            f'message bus, command fanning out to {events_count} events',
+            lambda: bus.handle(FanOutCommand(events_count=events_count)),
+            iterations=5,
+            warmup=1,
+        )
+        logger.info('%.2fus per event', result.mean_us / events_count)
+
+
+    async def test_collect_new_event_with_many_loaded_users(self):
+        uow = FakeUserUnitOfWork()
+        users = [make_random_user_entity() for _ in range(20000)]
+        await uow.users.add_many(users)
+
+        def collect_indexed():
+            uow.users.register_events(users[0], [UserDeletedEvent(user_id=users[0].id)])
+            return list(uow.collect_new_event())
+
+        def collect_scanning():
+            users[0].events.append(UserDeletedEvent(user_id=users[0].id))
+            events = list(collect_new_event_by_scanning(uow))
+            users[0].events.clear()
+            return events
+
+        scanning = measure('collect events, scanning 20000 loaded users', collect_scanning, iterations=200)
+        indexed = measure('collect events, dirty users index', collect_indexed, iterations=200)
+
+        assert indexed.mean_us < scanning.mean_us
+
+
+    @pytest.mark.usefixtures('quiet_message_bus_logger')
+    async def test_command_latency_with_async_dispatch(self):
+        def make_bus(dispatcher: EventDispatcher | None = None) -> MessageBus:
+            return MessageBus(
+                uow=FakeUserUnitOfWork(),
+                commands_map={FanOutCommand: FanOutCommandHandler()},
+                events_map={UserDeletedEvent: [BrokerRoundTripEventHandler(producer=None, topic=None)]},
+                dispatcher=dispatcher,
+            )
+
+        inline = await measure_async(
+            'command raising one event, handled inline',
+            lambda: make_bus().handle(FanOutCommand(events_count=1)),
+            iterations=200,
+        )
+
+        dispatcher = EventDispatcher(bus_factory=make_bus, workers_count=8, queue_size=1000)
+        await dispatcher.start()
+        dispatched = await measure_async(
+            'command raising one event, dispatched to workers',
+            lambda: make_bus(dispatcher).handle(FanOutCommand(events_count=1)),
+            iterations=200,
+        )
+        await dispatcher.stop()
+        logger.info('dispatch lag: %s', dispatcher.stats())
+
+        assert dispatched.p99_us < inline.p99_us
+
@@ -0,0 +1,35 @@
+import logging
+
+from infrastructure.cache.base import BasePresignedURLCacher
+from infrastructure.producers.base import BaseProducer
+from service.message_bus import MessageBus
+from service.units_of_work.users.base import BaseUserUnitOfWork
+from settings.container import get_commands_map, get_events_map, initialize_container
+from tests.benchmarks.utils import measure
+
+
+logger = logging.getLogger(__name__)
+
+
+class TestContainerBenchmark:
+    def test_resolve_message_bus(self):
+        container = initialize_container()
+
+        def build_message_bus_graph():
+            """The previous per-resolve construction: every handler and both maps rebuilt for each request."""
+            return MessageBus(
+                uow=container.resolve(BaseUserUnitOfWork),
+                commands_map=get_commands_map(presigned_url_cacher=container.resolve(BasePresignedURLCacher)),
+                events_map=get_events_map(producer=container.resolve(BaseProducer)),
+            )
+
+        container.register('legacy_message_bus', factory=build_message_bus_graph)
+
+        rebuilt = measure(
+            'message bus, handler graph rebuilt per resolve',
+            lambda: container.resolve('legacy_message_bus'),
+            iterations=20000,
+        )
+        shared = measure('message bus, shared dispatch tables', lambda: container.resolve(MessageBus), iterations=20000)
+
+        assert shared.mean_us < rebuilt.mean_us
@@ -0,0 +1,82 @@
+import logging
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    timings: list[float]
+
+    @property
+    def mean_us(self) -> float:
+        return statistics.fmean(self.timings) * 1_000_000
+
+    @property
+    def p50_us(self) -> float:
+        return statistics.median(self.timings) * 1_000_000
+
+    @property
+    def p99_us(self) -> float:
+        return statistics.quantiles(self.timings, n=100)[98] * 1_000_000
+
+    @property
+    def ops_per_second(self) -> float:
+        return self.iterations / sum(self.timings)
+
+    def log(self) -> None:
+        logger.info(
+            '%s: %d iterations, mean %.1fus, p50 %.1fus, p99 %.1fus, %.0f ops/s',
+            self.name,
+            self.iterations,
+            self.mean_us,
+            self.p50_us,
+            self.p99_us,
+            self.ops_per_second,
+        )
+
+
+async def measure_async(
+    name: str,
+    func: Callable[[], Awaitable],
+    iterations: int = 1000,
+    warmup: int = 10,
+) -> BenchmarkResult:
+    for _ in range(warmup):
+        await func()
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - started)
+
+    result = BenchmarkResult(name=name, iterations=iterations, timings=timings)
+    result.log()
+    return result
+
+
+def measure(
+    name: str,
+    func: Callable[[], object],
+    iterations: int = 1000,
+    warmup: int = 10,
+) -> BenchmarkResult:
+    for _ in range(warmup):
+        func()
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+
+    result = BenchmarkResult(name=name, iterations=iterations, timings=timings)
+    result.log()
+    return result
@@ -1,15 +1,25 @@
 import asyncio
 import logging
+from collections.abc import Iterable
+from contextlib import asynccontextmanager
 from dataclasses import field, dataclass
+from types import SimpleNamespace
 from uuid import UUID
 
+import orjson
+
 from application.external_events.consumers.base import BaseConsumer
 from application.external_events.handlers.base import BaseExternalEventHandler
 from domain.entities.users import UserEntity, UserCredentialsStatus
 from domain.commands.base import BaseCommand
 from domain.events.base import BaseEvent
 from domain.value_objects.users import EmailVO, PhoneNumberVO
+from infrastructure.cache.base import BasePresignedURLCacher, BaseUserRepositoryCacher, USER_NOT_FOUND
+from infrastructure.converters.events import convert_event_to_dict
+from infrastructure.converters.users import convert_user_entity_to_json, convert_user_json_to_entity
+from infrastructure.exception.messages import MessageInProgressException
 from infrastructure.exception.users import UserNotFoundException
+from infrastructure.idempotency.base import BaseIdempotencyStore
 from infrastructure.producers.base import BaseProducer
 from infrastructure.repositories.users.base import BaseUserRepository
 from service.units_of_work.users.base import BaseUserUnitOfWork
@@ -40,6 +50,15 @@ class FakeUserRepository(BaseUserRepository):
         self.users_list.append(user)
 
 
+    async def add_many(
+        self,
+        users: Iterable[UserEntity],
+    ) -> None:
+        users = list(users)
+        logger.info('Adding %d users', len(users))
+        self.users_list.extend(users)
+
+
     async def get(
         self,
         user_id: UUID,
@@ -53,6 +72,15 @@ class FakeUserRepository(BaseUserRepository):
         raise UserNotFoundException(user_id)
 
 
+    async def get_many(
+        self,
+        user_ids: Iterable[UUID],
+    ) -> list[UserEntity]:
+        user_ids = set(user_ids)
+        logger.info('Fetching %d users', len(user_ids))
+        return [user for user in self.users_list if user.id in user_ids]
+
+
     async def update_status(
         self,
         user_id: UUID,
@@ -68,6 +96,19 @@ class FakeUserRepository(BaseUserRepository):
         raise UserNotFoundException(user_id)
 
 
+    async def update_status_many(
+        self,
+        statuses: dict[UUID, UserCredentialsStatus],
+    ) -> list[UserEntity]:
+        logger.info('Updating status for %d users', len(statuses))
+        updated = []
+        for user in self.users_list:
+            if user.id in statuses:
+                user.credentials_status = statuses[user.id]
+                updated.append(user)
+        return updated
+
+
     async def update_photo(
         self,
         user_id: UUID,
@@ -126,6 +167,38 @@ class FakeUserRepository(BaseUserRepository):
         raise UserNotFoundException(user_id)
 
 
+@dataclass
+class FakeUserRepositoryCacher(BaseUserRepositoryCacher):
+    users: dict[UUID, bytes | object] = field(default_factory=dict)
+
+    async def get_from_cache(self, user_id: UUID) -> UserEntity | object | None:
+        user = self.users.get(user_id)
+        if user is USER_NOT_FOUND:
+            return USER_NOT_FOUND
+        return convert_user_json_to_entity(user) if user else None
+
+    async def add_to_cache(self, user: UserEntity) -> None:
+        self.users[user.id] = convert_user_entity_to_json(user)
+
+    async def add_not_found_to_cache(self, user_id: UUID) -> None:
+        self.users[user_id] = USER_NOT_FOUND
+
+    async def remove_from_cache(self, user_id: UUID) -> None:
+        self.users.pop(user_id, None)
+
+    async def remove_many_from_cache(self, user_ids: Iterable[UUID]) -> None:
+        for user_id in user_ids:
+            self.users.pop(user_id, None)
+
+
+fake_cache_repository = FakeUserRepositoryCacher()
+
+
+@fake_cache_repository
+class CachedFakeUserRepository(FakeUserRepository):
+    ...
+
+
 class FakeUserUnitOfWork(BaseUserUnitOfWork):
     def __init__(self):
         logger.debug('Initializing FakeUserUnitOfWork')
@@ -135,10 +208,11 @@ class FakeUserUnitOfWork(BaseUserUnitOfWork):
     async def commit(self):
         logger.debug('Committing FakeUserUnitOfWork')
         self.committed = True
+        await self.users.after_commit()
 
     async def rollback(self):
         logger.debug('Rolling back FakeUserUnitOfWork')
-        pass
+        await self.users.after_rollback()
 
 
 @dataclass
@@ -159,7 +233,11 @@ class FakeProducer(BaseProducer):
 
     async def publish(self, event: BaseEvent, topic: str):
         logger.debug('Publishing event to topic: %s', topic)
-        self.broker.queue.append({'topic': topic, 'event': event.__class__.__name__, 'body': event.__dict__})
+        self.broker.queue.append({'topic': topic, 'event': event.__class__.__name__, 'body': convert_event_to_dict(event)})
+
+    async def publish_message(self, body: bytes, topic: str, message_id: str, headers: dict[str, str | int] | None = None):
+        logger.debug('Publishing message \'%s\' to topic: %s', message_id, topic)
+        self.broker.queue.append({'topic': topic, 'message_id': message_id, 'body': orjson.loads(body), 'headers': headers})
 
 
 @dataclass
@@ -196,6 +274,215 @@ class FakeConsumer(BaseConsumer):
             await asyncio.sleep(0.1)
 
 
+@dataclass(eq=False)
+class FakeIncomingMessage:
+    routing_key: str
+    body: bytes
+    acked: bool = False
+    rejected: bool = False
+    queue: 'FakeRabbitMQQueue | None' = None
+    message_id: str | None = None
+    headers: dict = field(default_factory=dict)
+    content_type: str | None = 'application/json'
+    requeued: bool = False
+
+    @property
+    def processed(self) -> bool:
+        return self.acked or self.rejected or self.requeued
+
+
+    async def ack(self, multiple: bool = False):
+        if multiple and self.queue:
+            for message in self.queue.delivered[:self.queue.delivered.index(self) + 1]:
+                message.acked = message.acked or not message.processed
+        self.acked = True
+
+
+    async def nack(self, requeue: bool = True):
+        self.requeued = requeue
+        self.rejected = not requeue
+
+
+    @asynccontextmanager
+    async def process(self, requeue: bool = False, ignore_processed: bool = False):
+        try:
+            yield
+        except BaseException:
+            if not (ignore_processed and self.processed):
+                self.requeued = requeue
+                self.rejected = not requeue
+            raise
+        else:
+            if not (ignore_processed and self.processed):
+                self.acked = True
+
+
+@dataclass
+class FakeRabbitMQQueue:
+    """In-memory stand-in for an aio_pika queue, as far as RabbitMQConsumer.consume uses it."""
+    messages: asyncio.Queue = field(default_factory=asyncio.Queue)
+    delivered: list[FakeIncomingMessage] = field(default_factory=list)
+    name: str = 'queue'
+
+    @property
+    def declaration_result(self):
+        return SimpleNamespace(message_count=self.messages.qsize())
+
+
+    def put(self, message: FakeIncomingMessage):
+        message.queue = self
+        self.messages.put_nowait(message)
+
+
+    async def get(self, fail: bool = True) -> FakeIncomingMessage | None:
+        if self.messages.empty() and not fail:
+            return None
+        message = self.messages.get_nowait()
+        self.delivered.append(message)
+        return message
+
+
+    @asynccontextmanager
+    async def iterator(self):
+        yield self
+
+
+    def __aiter__(self):
+        return self
+
+
+    async def __anext__(self) -> FakeIncomingMessage:
+        message = await self.messages.get()
+        self.delivered.append(message)
+        return message
+
+
+@dataclass
+class FakeRabbitMQDefaultExchange:
+    """Routes published messages straight to the channel's queue of the same name."""
+    channel: 'FakeRabbitMQChannel'
+    published: list[tuple[str, object]] = field(default_factory=list)
+
+    async def publish(self, message, routing_key: str):
+        self.published.append((routing_key, message))
+        if queue := self.channel.queues.get(routing_key):
+            queue.put(
+                FakeIncomingMessage(
+                    routing_key=routing_key,
+                    body=message.body,
+                    message_id=message.message_id,
+                    headers=dict(message.headers or {}),
+                )
+            )
+
+
+@dataclass
+class FakeRabbitMQExchange:
+    """Confirms each publish after confirm_delay, and tracks how many confirms were awaited at once."""
+    name: str = 'exchange'
+    confirm_delay: float = 0.001
+    confirm_delays: dict[str, float] = field(default_factory=dict)
+    failing_routing_keys: set[str] = field(default_factory=set)
+    published: list[tuple[str, object]] = field(default_factory=list)
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    async def publish(self, message, routing_key: str):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.confirm_delays.get(routing_key, self.confirm_delay))
+            if routing_key in self.failing_routing_keys:
+                raise ConnectionError(f'Publish to \'{routing_key}\' was not confirmed')
+            self.published.append((routing_key, message))
+        finally:
+            self.in_flight -= 1
+
+
+@dataclass
+class FakeRabbitMQChannel:
+    queues: dict[str, FakeRabbitMQQueue] = field(default_factory=dict)
+    exchange: FakeRabbitMQExchange = field(default_factory=FakeRabbitMQExchange)
+    default_exchange: FakeRabbitMQDefaultExchange = field(init=False)
+    closed: bool = False
+
+    def __post_init__(self):
+        self.default_exchange = FakeRabbitMQDefaultExchange(channel=self)
+
+
+    async def declare_queue(self, name: str, **kwargs) -> FakeRabbitMQQueue:
+        return self.queues.setdefault(name, FakeRabbitMQQueue(name=name))
+
+
+    async def declare_exchange(self, name: str, *args, **kwargs) -> FakeRabbitMQExchange:
+        self.exchange.name = name
+        return self.exchange
+
+
+    async def close(self):
+        self.closed = True
+
+
+@dataclass
+class FakeRabbitMQConnection:
+    channels: list[FakeRabbitMQChannel] = field(default_factory=list)
+    failing_routing_keys: set[str] = field(default_factory=set)
+    confirm_delays: dict[str, float] = field(default_factory=dict)
+    closed: bool = False
+
+    async def channel(self, **kwargs) -> FakeRabbitMQChannel:
+        channel = FakeRabbitMQChannel(
+            exchange=FakeRabbitMQExchange(
+                failing_routing_keys=self.failing_routing_keys,
+                confirm_delays=self.confirm_delays,
+            )
+        )
+        self.channels.append(channel)
+        return channel
+
+
+    async def close(self):
+        self.closed = True
+
+
+@dataclass
+class FakeIdempotencyStore(BaseIdempotencyStore):
+    processed: set[str] = field(default_factory=set)
+    in_flight: set[str] = field(default_factory=set)
+
+    async def claim(self, key: str) -> bool:
+        if key in self.in_flight:
+            raise MessageInProgressException(key=key)
+        if key in self.processed:
+            self.duplicates += 1
+            return False
+        self.in_flight.add(key)
+        return True
+
+
+    async def complete(self, key: str) -> None:
+        self.in_flight.discard(key)
+        self.processed.add(key)
+
+
+    async def release(self, key: str) -> None:
+        self.in_flight.discard(key)
+
+
+@dataclass
+class FakePresignedURLCacher(BasePresignedURLCacher):
+    urls: dict[str, dict[str, str]] = field(default_factory=dict)
+
+    async def get_from_cache(self, key: str, content_type: str) -> str | None:
+        return self.urls.get(key, {}).get(content_type)
+
+    async def add_to_cache(self, key: str, content_type: str, url: str, expires_in: int) -> None:
+        self.urls.setdefault(key, {})[content_type] = url
+
+    async def remove_from_cache(self, key: str) -> None:
+        self.urls.pop(key, None)
+
+
 class FakeCommand(BaseCommand):
     ...
 
@@ -3,6 +3,7 @@ import asyncio
 import orjson
 import pytest
 
+from infrastructure.converters.events import convert_event_to_json
 from tests.fakes import FakeEvent, get_fake_external_events_map
 
 
@@ -29,6 +30,6 @@ class TestRabbitMQConsumer:
             await asyncio.sleep(0.1)
             retry_count += 1
 
-        assert handler.body == orjson.loads(orjson.dumps(event.__dict__))
+        assert handler.body == orjson.loads(convert_event_to_json(event))
 
         consuming_task.cancel()
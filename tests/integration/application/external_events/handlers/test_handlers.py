@@ -45,7 +45,7 @@ class TestExternalEventHandlers:
 
         handler = UserCredentialsCreatedExternalEventHandler(bus=message_bus)
         with expectation:
-            await handler(body)
+            await handler(handler.decode(body))
 
         async with sqlalchemy_user_uow:
             user = await sqlalchemy_user_uow.users.get(body['user_id'])
@@ -89,7 +89,7 @@ class TestExternalEventHandlers:
 
         handler = UserEmailUpdatedExternalEventHandler(bus=message_bus)
         with expectation:
-            await handler(body)
+            await handler(handler.decode(body))
 
         async with sqlalchemy_user_uow:
             user = await sqlalchemy_user_uow.users.get(body['user_id'])
@@ -120,7 +120,7 @@ class TestExternalEventHandlers:
 
         handler = UserPhoneNumberUpdatedExternalEventHandler(bus=message_bus)
         with expectation:
-            await handler(body)
+            await handler(handler.decode(body))
 
         async with sqlalchemy_user_uow:
             user = await sqlalchemy_user_uow.users.get(body['user_id'])
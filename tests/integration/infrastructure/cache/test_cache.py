@@ -1 +1,79 @@
-# TODO: Add cache functionality tests
\ No newline at end of file
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from infrastructure.cache.base import USER_NOT_FOUND
+from infrastructure.cache.redis import RedisUserRepositoryCacher
+
+
+@pytest_asyncio.fixture
+async def redis_user_cacher():
+    cacher = RedisUserRepositoryCacher()
+    await cacher.start()
+    yield cacher
+    await cacher.stop()
+
+
+@pytest.mark.asyncio
+class TestRedisUserRepositoryCacher:
+    async def test_local_cache_serves_repeated_reads(self, random_user_entity, redis_user_cacher):
+        await redis_user_cacher.add_to_cache(random_user_entity)
+        redis_user_cacher.local.clear()
+
+        first = await redis_user_cacher.get_from_cache(random_user_entity.id)
+        second = await redis_user_cacher.get_from_cache(random_user_entity.id)
+
+        assert first.id == second.id == random_user_entity.id
+        assert first is not second
+        assert redis_user_cacher.local.hits == 1
+
+        await redis_user_cacher.remove_from_cache(random_user_entity.id)
+
+
+    async def test_invalidation_reaches_other_workers(self, random_user_entity, redis_user_cacher):
+        other_worker = RedisUserRepositoryCacher()
+        await other_worker.start()
+        try:
+            await redis_user_cacher.add_to_cache(random_user_entity)
+            assert await other_worker.get_from_cache(random_user_entity.id) is not None
+            assert random_user_entity.id in other_worker.local.entries
+
+            await redis_user_cacher.remove_from_cache(random_user_entity.id)
+            await asyncio.sleep(0.1)
+
+            assert random_user_entity.id not in other_worker.local.entries
+            assert await other_worker.get_from_cache(random_user_entity.id) is None
+        finally:
+            await other_worker.stop()
+
+
+    async def test_lock_coalesces_loads_across_processes(self, random_user_entity):
+        loads = 0
+
+        async def loader():
+            nonlocal loads
+            loads += 1
+            await asyncio.sleep(0.2)
+            return random_user_entity
+
+        workers = [RedisUserRepositoryCacher(lock_enabled=True) for _ in range(3)]
+        try:
+            users = await asyncio.gather(
+                *(worker.load_single_flight(random_user_entity.id, loader) for worker in workers)
+            )
+        finally:
+            await workers[0].remove_from_cache(random_user_entity.id)
+
+        assert loads == 1
+        assert all(user.id == random_user_entity.id for user in users)
+
+
+    async def test_not_found_marker(self, random_user_entity, redis_user_cacher):
+        await redis_user_cacher.add_not_found_to_cache(random_user_entity.id)
+        redis_user_cacher.local.clear()
+
+        assert await redis_user_cacher.get_from_cache(random_user_entity.id) is USER_NOT_FOUND
+
+        await redis_user_cacher.remove_from_cache(random_user_entity.id)
+        assert await redis_user_cacher.get_from_cache(random_user_entity.id) is None
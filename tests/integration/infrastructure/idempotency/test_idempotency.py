@@ -0,0 +1,55 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, update
+
+from infrastructure.idempotency.postgresql import SQLAlchemyIdempotencyStore
+from infrastructure.models.messages import ProcessedMessageModel
+
+
+@pytest.mark.asyncio
+class TestSQLAlchemyIdempotencyStore:
+    async def test_key_is_committed_with_handler_transaction(self, random_user_entity, postgres_session_factory, sqlalchemy_user_uow):
+        store = SQLAlchemyIdempotencyStore(session_factory=postgres_session_factory)
+        key = f'user.created:{uuid.uuid4()}'
+
+        assert await store.claim(key)
+        async with sqlalchemy_user_uow as uow:
+            await uow.users.add(random_user_entity)
+            await uow.commit()
+        await store.complete(key)
+
+        assert not await store.claim(key)
+        assert store.duplicates == 1
+
+
+    async def test_released_key_can_be_claimed_again(self, postgres_session_factory):
+        store = SQLAlchemyIdempotencyStore(session_factory=postgres_session_factory)
+        key = f'user.created:{uuid.uuid4()}'
+
+        assert await store.claim(key)
+        await store.release(key)
+
+        assert await store.claim(key)
+        await store.complete(key)
+        assert not await store.claim(key)
+
+
+    async def test_purge_forgets_keys_past_the_expiration(self, postgres_session_factory):
+        store = SQLAlchemyIdempotencyStore(session_factory=postgres_session_factory, expiration_seconds=3600)
+        expired, recent = f'user.created:{uuid.uuid4()}', f'user.created:{uuid.uuid4()}'
+        for key in (expired, recent):
+            assert await store.claim(key)
+            await store.complete(key)
+
+        async with postgres_session_factory() as session, session.begin():
+            await session.execute(
+                update(ProcessedMessageModel)
+                .where(ProcessedMessageModel.message_id == expired)
+                .values(processed_at=func.now() - timedelta(hours=2))
+            )
+        await store.purge_expired()
+
+        assert await store.claim(expired)
+        assert not await store.claim(recent)
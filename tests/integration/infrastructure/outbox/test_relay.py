@@ -0,0 +1,87 @@
+from uuid import UUID
+
+import pytest
+from sqlalchemy import select
+
+from domain.commands.users import DeleteUserCommand
+from domain.events.users import UserDeletedEvent
+from infrastructure.models.outbox import OutboxMessageModel
+from infrastructure.outbox.postgresql import SQLAlchemyOutboxRelay
+from service.units_of_work.users.postgresql import SQLAlchemyUserUnitOfWork
+from settings.container import get_commands_map, get_event_topics
+from tests.fakes import FakeProducer
+
+
+@pytest.mark.asyncio
+class TestSQLAlchemyOutboxRelay:
+    async def test_event_is_committed_to_outbox_and_relayed(self, random_user_entity, postgres_session_factory):
+        producer = FakeProducer()
+        producer.broker.queue.clear()
+        relay = SQLAlchemyOutboxRelay(session_factory=postgres_session_factory, producer=producer, batch_size=10)
+        uow = SQLAlchemyUserUnitOfWork(
+            session_factory=postgres_session_factory,
+            outbox_topics=get_event_topics(),
+            on_outbox_written=relay.wake,
+        )
+        async with uow:
+            await uow.users.add(random_user_entity)
+            await uow.commit()
+
+        await get_commands_map()[DeleteUserCommand](DeleteUserCommand(user_id=random_user_entity.id), uow)
+
+        assert list(uow.collect_new_event()) == []
+        assert relay.written.is_set()
+        assert not producer.broker.queue
+
+        while await relay.relay_batch():
+            pass
+
+        message = next(message for message in producer.broker.queue if message['topic'] == 'user.deleted')
+        assert message['body']['user_id'] == str(random_user_entity.id)
+        assert message['headers']['user_id'] == str(random_user_entity.id)
+        assert message['headers']['x-schema-version'] == 1
+        async with postgres_session_factory() as session:
+            row = await session.get(OutboxMessageModel, UUID(message['message_id']))
+        assert row.sent_at is not None
+
+
+    async def test_rolled_back_events_are_not_written(self, random_user_entity, postgres_session_factory):
+        uow = SQLAlchemyUserUnitOfWork(session_factory=postgres_session_factory, outbox_topics=get_event_topics())
+        async with uow:
+            await uow.users.add(random_user_entity)
+            await uow.commit()
+
+        event = UserDeletedEvent(user_id=random_user_entity.id)
+        async with uow:
+            user = await uow.users.remove(user_id=random_user_entity.id)
+            uow.users.register_events(user, [event])
+            await uow.rollback()
+
+        async with postgres_session_factory() as session:
+            assert await session.get(OutboxMessageModel, event.event_id) is None
+
+
+    async def test_failed_publishes_stay_unsent(self, random_user_entity, postgres_session_factory):
+        class FailingProducer(FakeProducer):
+            async def publish_message(self, *args, **kwargs):
+                raise ConnectionError
+
+        relay = SQLAlchemyOutboxRelay(
+            session_factory=postgres_session_factory,
+            producer=FailingProducer(),
+            batch_size=10,
+        )
+        uow = SQLAlchemyUserUnitOfWork(session_factory=postgres_session_factory, outbox_topics=get_event_topics())
+        async with uow:
+            await uow.users.add(random_user_entity)
+            await uow.commit()
+        await get_commands_map()[DeleteUserCommand](DeleteUserCommand(user_id=random_user_entity.id), uow)
+
+        assert await relay.relay_batch() == 0
+        assert relay.failed
+
+        async with postgres_session_factory() as session:
+            unsent = (await session.scalars(
+                select(OutboxMessageModel.id).where(OutboxMessageModel.sent_at.is_(None))
+            )).all()
+        assert unsent
@@ -1,6 +1,7 @@
 import orjson
 import pytest
 
+from infrastructure.converters.events import convert_event_to_json
 from tests.fakes import FakeEvent
 
 
@@ -27,5 +28,5 @@ class TestRabbitMQProducer:
 
         assert len(messages) == 1
         consumed_message = orjson.loads(messages[0].body)
-        assert consumed_message == orjson.loads(orjson.dumps(event.__dict__))
+        assert consumed_message == orjson.loads(convert_event_to_json(event))
         assert consumed_message['event_id'] == str(event.event_id)
@@ -1,5 +1,6 @@
 import random
 import string
+import uuid
 
 import pytest
 import logging
@@ -86,3 +87,50 @@ class TestSQLAlchemyRepository:
         result = await sqlalchemy_user_repository.get(random_user_entity.id)
         assert result.phone_number.as_generic() == new_phone_number
         assert result in sqlalchemy_user_repository.loaded_users
+
+
+    async def test_update_missing_user(self, random_user_entity, sqlalchemy_user_repository):
+        with pytest.raises(UserNotFoundException):
+            await sqlalchemy_user_repository.update_status(random_user_entity.id, UserCredentialsStatus.SUCCESS)
+
+        with pytest.raises(UserNotFoundException):
+            await sqlalchemy_user_repository.update_photo(random_user_entity.id, 'new_photo.jpg')
+
+
+    async def test_remove_missing_user(self, random_user_entity, sqlalchemy_user_repository):
+        with pytest.raises(UserNotFoundException):
+            await sqlalchemy_user_repository.remove(random_user_entity.id)
+
+
+    async def test_update_returns_updated_entity(self, random_user_entity, sqlalchemy_user_repository):
+        await sqlalchemy_user_repository.add(random_user_entity)
+
+        result = await sqlalchemy_user_repository.update_status(random_user_entity.id, UserCredentialsStatus.FAILED)
+
+        assert result.id == random_user_entity.id
+        assert result.email == random_user_entity.email
+        assert result.credentials_status == UserCredentialsStatus.FAILED
+
+
+    async def test_add_get_many(self, random_user_entities, sqlalchemy_user_repository):
+        await sqlalchemy_user_repository.add_many(random_user_entities)
+
+        missing_id = uuid.uuid4()
+        result = await sqlalchemy_user_repository.get_many([user.id for user in random_user_entities] + [missing_id])
+
+        assert {user.id for user in result} == {user.id for user in random_user_entities}
+        assert all(user in sqlalchemy_user_repository.loaded_users for user in result)
+
+
+    async def test_update_status_many(self, random_user_entities, sqlalchemy_user_repository):
+        await sqlalchemy_user_repository.add_many(random_user_entities)
+
+        statuses = {
+            user.id: UserCredentialsStatus.SUCCESS if i % 2 else UserCredentialsStatus.FAILED
+            for i, user in enumerate(random_user_entities)
+        }
+        result = await sqlalchemy_user_repository.update_status_many({**statuses, uuid.uuid4(): UserCredentialsStatus.SUCCESS})
+
+        assert {user.id: user.credentials_status for user in result} == statuses
+        for user in await sqlalchemy_user_repository.get_many(statuses):
+            assert user.credentials_status == statuses[user.id]
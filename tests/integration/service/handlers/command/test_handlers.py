@@ -36,8 +36,8 @@ class TestCommandHandlers:
                 password=PasswordVO('VerySecretPa$$word1234'),
             )
         )
-        handler = CreateUserCommandHandler(uow=sqlalchemy_user_uow)
-        await handler(command=command)
+        handler = CreateUserCommandHandler()
+        await handler(command=command, uow=sqlalchemy_user_uow)
 
         async with sqlalchemy_user_uow:
             user = await sqlalchemy_user_uow.users.get(user_id=random_user_entity.id)
@@ -58,8 +58,8 @@ class TestCommandHandlers:
             await sqlalchemy_user_uow.commit()
 
         command = DeleteUserCommand(user_id=random_user_entity.id)
-        handler = DeleteUserCommandHandler(uow=sqlalchemy_user_uow)
-        await handler(command=command)
+        handler = DeleteUserCommandHandler()
+        await handler(command=command, uow=sqlalchemy_user_uow)
 
         loaded_users = sqlalchemy_user_uow.users.loaded_users
         assert len(loaded_users) == 1
@@ -89,8 +89,8 @@ class TestCommandHandlers:
             user_id=random_user_entity.id,
             status=new_status
         )
-        handler = UpdateUserCredentialsStatusCommandHandler(uow=sqlalchemy_user_uow)
-        await handler(command=command)
+        handler = UpdateUserCredentialsStatusCommandHandler()
+        await handler(command=command, uow=sqlalchemy_user_uow)
 
         async with sqlalchemy_user_uow:
             user = await sqlalchemy_user_uow.users.get(user_id=random_user_entity.id)
@@ -114,8 +114,8 @@ class TestCommandHandlers:
             user_id=random_user_entity.id,
             photo=new_photo,
         )
-        handler = UpdateUserPhotoCommandHandler(uow=sqlalchemy_user_uow)
-        await handler(command=command)
+        handler = UpdateUserPhotoCommandHandler()
+        await handler(command=command, uow=sqlalchemy_user_uow)
 
         async with sqlalchemy_user_uow:
             user = await sqlalchemy_user_uow.users.get(user_id=random_user_entity.id)
@@ -138,8 +138,8 @@ class TestCommandHandlers:
             user_id=random_user_entity.id,
             new_email=new_email,
         )
-        handler = UpdateUserEmailCommandHandler(uow=sqlalchemy_user_uow)
-        await handler(command=command)
+        handler = UpdateUserEmailCommandHandler()
+        await handler(command=command, uow=sqlalchemy_user_uow)
         async with sqlalchemy_user_uow:
             user = await sqlalchemy_user_uow.users.get(user_id=random_user_entity.id)
 
@@ -162,8 +162,8 @@ class TestCommandHandlers:
             user_id=random_user_entity.id,
             new_phone_number=new_phone_number,
         )
-        handler = UpdateUserPhoneNumberCommandHandler(uow=sqlalchemy_user_uow)
-        await handler(command=command)
+        handler = UpdateUserPhoneNumberCommandHandler()
+        await handler(command=command, uow=sqlalchemy_user_uow)
 
         async with sqlalchemy_user_uow:
             user = await sqlalchemy_user_uow.users.get(user_id=random_user_entity.id)
@@ -0,0 +1,552 @@
+import asyncio
+import random
+from dataclasses import dataclass, field
+from unittest import mock
+from uuid import uuid4
+
+import orjson
+import pytest
+from aio_pika.abc import ExchangeType
+
+from application.external_events.consumers.rabbitmq import RabbitMQConsumer
+from application.external_events.events.users import UserCredentialsCreatedExternalEvent
+from application.external_events.handlers.base import BaseExternalEventHandler, BaseBatchExternalEventHandler
+from domain.entities.users import UserCredentialsStatus
+from tests.fakes import FakeIdempotencyStore, FakeIncomingMessage, FakeRabbitMQChannel, FakeRabbitMQQueue
+
+
+@dataclass
+class SlowExternalEventHandler(BaseExternalEventHandler):
+    running: list = field(default_factory=list)
+    max_running: list = field(default_factory=lambda: [0])
+
+    async def __call__(self, body: dict) -> None:
+        self.running.append(body)
+        self.max_running[0] = max(self.max_running[0], len(self.running))
+        await asyncio.sleep(0.01)
+        self.running.remove(body)
+        if body.get('fail'):
+            raise RuntimeError('handler failed')
+
+
+@dataclass
+class RecordingExternalEventHandler(BaseExternalEventHandler):
+    processed: list = field(default_factory=list)
+
+    async def __call__(self, body: dict) -> None:
+        await asyncio.sleep(random.uniform(0, 0.005))
+        self.processed.append((body['user_id'], body['sequence']))
+
+
+@dataclass
+class RecordingBatchExternalEventHandler(BaseBatchExternalEventHandler):
+    batches: list = field(default_factory=list)
+    single: list = field(default_factory=list)
+    fail_batches: bool = False
+
+    async def __call__(self, body: dict) -> None:
+        self.single.append(body)
+
+    async def handle_batch(self, bodies: list[dict]) -> None:
+        if self.fail_batches:
+            raise RuntimeError('batch failed')
+        self.batches.append(bodies)
+
+
+@dataclass
+class TypedBatchExternalEventHandler(BaseBatchExternalEventHandler):
+    event_type = UserCredentialsCreatedExternalEvent
+    events: list = field(default_factory=list)
+    batches: list = field(default_factory=list)
+
+    async def __call__(self, event: UserCredentialsCreatedExternalEvent) -> None:
+        self.events.append(event)
+
+    async def handle_batch(self, events: list[UserCredentialsCreatedExternalEvent]) -> None:
+        self.batches.append(events)
+
+
+def make_consumer(**kwargs) -> RabbitMQConsumer:
+    return RabbitMQConsumer(
+        host='localhost',
+        port=5672,
+        login='guest',
+        password='guest',
+        virtual_host='/',
+        exchange_name='exchange',
+        queue_name='queue',
+        connection=object(),
+        channel=FakeRabbitMQChannel(),
+        queue=FakeRabbitMQQueue(),
+        **kwargs,
+    )
+
+
+async def drain(consumer: RabbitMQConsumer, messages: list[FakeIncomingMessage]):
+    for message in messages:
+        consumer.queue.put(message)
+
+    consuming_task = asyncio.create_task(consumer.consume())
+    while not all(message.acked or message.rejected for message in messages):
+        await asyncio.sleep(0.005)
+
+    consuming_task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await consuming_task
+
+
+@pytest.mark.asyncio
+async def test_hash_partition_hashes_on_the_hash_header():
+    consumer = make_consumer(hash_partition=2, hash_header='x-user-id', consuming_topics=['user.#'])
+    consumer.channel = mock.AsyncMock()
+
+    await consumer.declare_hash_partition()
+
+    declared = consumer.channel.declare_exchange.await_args
+    assert declared.args == ('queue.x-user-id-hash', ExchangeType.X_CONSISTENT_HASH)
+    assert declared.kwargs['arguments'] == {'hash-header': 'x-user-id'}
+    consumer.channel.declare_queue.assert_awaited_once_with('queue.2', durable=True)
+
+
+@pytest.mark.asyncio
+async def test_messages_without_hash_header_are_counted():
+    consumer = make_consumer(hash_partition=0, external_events_map={'user.test': SlowExternalEventHandler(bus=None)})
+    messages = [
+        FakeIncomingMessage('user.test', orjson.dumps({'n': 0}), headers={'user_id': str(uuid4())}),
+        FakeIncomingMessage('user.test', orjson.dumps({'n': 1})),
+    ]
+
+    await drain(consumer, messages)
+
+    assert consumer.stats()['partitioning'] == {'unpartitioned_messages': 1}
+
+
+def test_lane_depends_only_on_partition_key():
+    consumer = make_consumer(workers=4)
+    user_id = str(uuid4())
+
+    lanes = {consumer.get_lane({'user_id': user_id, 'sequence': sequence}, 4) for sequence in range(20)}
+
+    assert len(lanes) == 1
+    assert {consumer.get_lane({}, 4) for _ in range(4)} == {0, 1, 2, 3}
+
+
+@pytest.mark.asyncio
+class TestRabbitMQConsumer:
+    async def test_workers_process_messages_concurrently(self):
+        running, max_running = [], [0]
+        worker_maps = []
+
+        def external_events_map_factory():
+            handler = SlowExternalEventHandler(bus=None, running=running, max_running=max_running)
+            worker_maps.append({'user.test': handler})
+            return worker_maps[-1]
+
+        consumer = make_consumer(workers=4, external_events_map_factory=external_events_map_factory)
+        messages = [FakeIncomingMessage('user.test', orjson.dumps({'n': n})) for n in range(20)]
+
+        await drain(consumer, messages)
+
+        assert all(message.acked for message in messages)
+        assert max_running[0] == 4
+        assert len(worker_maps) == 4
+
+
+    async def test_failed_message_is_still_settled(self):
+        handler = SlowExternalEventHandler(bus=None)
+        consumer = make_consumer(workers=2, external_events_map={'user.test': handler})
+        messages = [
+            FakeIncomingMessage('user.test', orjson.dumps({'fail': True})),
+            FakeIncomingMessage('user.test', orjson.dumps({'n': 1})),
+            FakeIncomingMessage('user.unknown', b'{}'),
+        ]
+
+        await drain(consumer, messages)
+
+        assert all(message.acked for message in messages)
+
+
+    async def test_messages_of_one_user_keep_their_order(self):
+        processed = []
+        consumer = make_consumer(
+            workers=4,
+            external_events_map_factory=lambda: {'user.test': RecordingExternalEventHandler(bus=None, processed=processed)},
+        )
+        user_ids = [str(uuid4()) for _ in range(8)]
+        messages = [
+            FakeIncomingMessage('user.test', orjson.dumps({'user_id': user_id, 'sequence': sequence}))
+            for sequence in range(10)
+            for user_id in user_ids
+        ]
+
+        await drain(consumer, messages)
+
+        assert len(processed) == len(messages)
+        for user_id in user_ids:
+            assert [sequence for processed_user_id, sequence in processed if processed_user_id == user_id] == list(range(10))
+
+
+
+    async def test_batch_mode_groups_messages_by_routing_key(self):
+        created = RecordingBatchExternalEventHandler(bus=None)
+        updated = RecordingBatchExternalEventHandler(bus=None)
+        consumer = make_consumer(
+            batch_size=10,
+            batch_timeout_ms=20,
+            external_events_map={'user.created': created, 'user.updated': updated},
+        )
+        messages = [
+            FakeIncomingMessage('user.created' if n % 2 else 'user.updated', orjson.dumps({'n': n}))
+            for n in range(13)
+        ]
+
+        await drain(consumer, messages)
+
+        assert [[body['n'] for body in batch] for batch in created.batches] == [[1, 3, 5, 7, 9]]
+        assert created.single == [{'n': 11}]
+        assert [[body['n'] for body in batch] for batch in updated.batches] == [[0, 2, 4, 6, 8], [10, 12]]
+        assert all(message.acked for message in messages)
+
+
+    async def test_batch_mode_flushes_partial_batch_after_timeout(self):
+        handler = RecordingBatchExternalEventHandler(bus=None)
+        consumer = make_consumer(batch_size=100, batch_timeout_ms=20, external_events_map={'user.created': handler})
+        messages = [FakeIncomingMessage('user.created', orjson.dumps({'n': n})) for n in range(3)]
+
+        await drain(consumer, messages)
+
+        assert handler.batches == [[{'n': 0}, {'n': 1}, {'n': 2}]]
+
+
+    async def test_batch_mode_falls_back_to_single_messages(self):
+        handler = RecordingBatchExternalEventHandler(bus=None, fail_batches=True)
+        consumer = make_consumer(batch_size=10, batch_timeout_ms=20, external_events_map={'user.created': handler})
+        messages = [FakeIncomingMessage('user.created', orjson.dumps({'n': n})) for n in range(4)]
+
+        await drain(consumer, messages)
+
+        assert handler.batches == []
+        assert handler.single == [{'n': n} for n in range(4)]
+
+
+    async def test_redelivered_message_is_acked_without_processing(self):
+        handler = RecordingBatchExternalEventHandler(bus=None)
+        store = FakeIdempotencyStore()
+        consumer = make_consumer(external_events_map={'user.created': handler}, idempotency_store=store)
+        messages = [
+            FakeIncomingMessage('user.created', orjson.dumps({'n': 0}), message_id='first'),
+            FakeIncomingMessage('user.created', orjson.dumps({'n': 0}), message_id='first'),
+            FakeIncomingMessage('user.created', orjson.dumps({'n': 1, 'event_id': 'second'})),
+            FakeIncomingMessage('user.created', orjson.dumps({'n': 1, 'event_id': 'second'})),
+        ]
+
+        await drain(consumer, messages)
+
+        assert handler.single == [{'n': 0}, {'n': 1, 'event_id': 'second'}]
+        assert all(message.acked for message in messages)
+        assert store.stats() == {'duplicates': 2}
+
+
+    async def test_failed_message_is_released_for_redelivery(self):
+        handler = SlowExternalEventHandler(bus=None)
+        store = FakeIdempotencyStore()
+        consumer = make_consumer(external_events_map={'user.test': handler}, idempotency_store=store)
+        message = FakeIncomingMessage('user.test', orjson.dumps({'fail': True}), message_id='failing')
+
+        await drain(consumer, [message])
+
+        assert store.processed == set()
+        assert store.in_flight == set()
+
+
+    async def test_batch_mode_skips_duplicates(self):
+        handler = RecordingBatchExternalEventHandler(bus=None)
+        store = FakeIdempotencyStore(processed={'user.created:0'})
+        consumer = make_consumer(
+            batch_size=10,
+            batch_timeout_ms=20,
+            external_events_map={'user.created': handler},
+            idempotency_store=store,
+        )
+        messages = [
+            FakeIncomingMessage('user.created', orjson.dumps({'n': n}), message_id=str(n % 3))
+            for n in range(5)
+        ]
+
+        await drain(consumer, messages)
+
+        assert handler.batches == [[{'n': 1}, {'n': 2}]]
+        assert store.processed == {'user.created:0', 'user.created:1', 'user.created:2'}
+        assert store.duplicates == 2
+        [(routing_key, in_progress)] = consumer.channel.default_exchange.published
+        assert routing_key == 'queue.in-progress.300000ms'
+        assert in_progress.message_id == '1'
+        assert in_progress.headers['x-attempt'] == 1
+
+
+    async def test_message_of_crashed_consumer_waits_out_its_marker_without_using_attempts(self):
+        handler = RecordingBatchExternalEventHandler(bus=None)
+        store = FakeIdempotencyStore()
+        consumer = make_consumer(
+            external_events_map={'user.test': handler},
+            idempotency_store=store,
+            max_attempts=3,
+            in_progress_delay_ms=1000,
+        )
+        in_progress_queue = await consumer.channel.declare_queue('queue.in-progress.1000ms')
+
+        # a consumer claims the message and dies before finishing it, so the broker redelivers it
+        assert await store.claim('user.test:crashed')
+        message = FakeIncomingMessage('user.test', orjson.dumps({'n': 0}), message_id='crashed')
+
+        # parked more often than max_attempts allows while the marker is still live
+        for _ in range(consumer.max_attempts + 2):
+            await drain(consumer, [message])
+            message = await in_progress_queue.get()
+
+        assert handler.single == []
+        assert 'queue.dead-letter' not in consumer.channel.queues
+        assert message.headers['x-attempt'] == 1
+
+        # the marker expires and the parked message comes back onto the consumed queue
+        store.in_flight.clear()
+        await drain(consumer, [message])
+
+        assert handler.single == [{'n': 0}]
+        assert store.processed == {'user.test:crashed'}
+        assert in_progress_queue.messages.empty()
+
+
+    async def test_failed_message_is_parked_in_delay_queue(self):
+        handler = SlowExternalEventHandler(bus=None)
+        consumer = make_consumer(external_events_map={'user.test': handler}, max_attempts=3, retry_base_delay_ms=1000)
+        message = FakeIncomingMessage('user.test', orjson.dumps({'fail': True}), message_id='failing')
+
+        await drain(consumer, [message])
+
+        [(routing_key, retried)] = consumer.channel.default_exchange.published
+        assert routing_key == 'queue.retry.1000ms'
+        assert retried.headers['x-attempt'] == 2
+        assert retried.headers['x-original-routing-key'] == 'user.test'
+        assert retried.message_id == 'failing'
+        assert message.acked
+
+
+    async def test_retried_message_backs_off_exponentially(self):
+        handler = SlowExternalEventHandler(bus=None)
+        consumer = make_consumer(external_events_map={'user.test': handler}, max_attempts=4, retry_base_delay_ms=1000)
+        message = FakeIncomingMessage(
+            'queue',
+            orjson.dumps({'fail': True}),
+            headers={'x-attempt': 3, 'x-original-routing-key': 'user.test'},
+        )
+
+        await drain(consumer, [message])
+
+        [(routing_key, retried)] = consumer.channel.default_exchange.published
+        assert routing_key == 'queue.retry.4000ms'
+        assert retried.headers['x-attempt'] == 4
+
+
+    async def test_exhausted_and_undecodable_messages_are_dead_lettered(self):
+        handler = SlowExternalEventHandler(bus=None)
+        consumer = make_consumer(external_events_map={'user.test': handler}, max_attempts=3)
+        messages = [
+            FakeIncomingMessage('queue', orjson.dumps({'fail': True}), headers={'x-attempt': 3, 'x-original-routing-key': 'user.test'}),
+            FakeIncomingMessage('user.test', b'not json'),
+        ]
+
+        await drain(consumer, messages)
+
+        assert [routing_key for routing_key, _ in consumer.channel.default_exchange.published] == [
+            'queue.dead-letter',
+            'queue.dead-letter',
+        ]
+
+
+    async def test_message_is_requeued_when_parking_fails(self):
+        async def failing_publish(message, routing_key):
+            raise ConnectionError('channel closed')
+
+        handler = SlowExternalEventHandler(bus=None)
+        consumer = make_consumer(external_events_map={'user.test': handler})
+        consumer.channel.default_exchange.publish = failing_publish
+        message = FakeIncomingMessage('user.test', orjson.dumps({'fail': True}))
+        consumer.queue.put(message)
+
+        consuming_task = asyncio.create_task(consumer.consume())
+        while not message.processed:
+            await asyncio.sleep(0.005)
+        consuming_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consuming_task
+
+        assert message.requeued
+        assert not message.acked
+
+
+    async def test_replay_drains_only_messages_counted_at_start(self):
+        handler = SlowExternalEventHandler(bus=None)
+        consumer = make_consumer(external_events_map={'user.test': handler})
+        dead_letter_queue = await consumer.channel.declare_queue('queue.dead-letter')
+        headers = {'x-attempt': 6, 'x-original-routing-key': 'user.test'}
+        messages = [
+            FakeIncomingMessage('queue.dead-letter', orjson.dumps({'n': n, 'fail': n == 0}), headers=headers)
+            for n in range(5)
+        ]
+        for message in messages:
+            dead_letter_queue.put(message)
+
+        replayed = await consumer.replay_dead_letters(batch_size=2)
+
+        assert replayed == 5
+        assert all(message.acked for message in messages)
+        assert dead_letter_queue.messages.qsize() == 1
+
+
+    async def test_worker_survives_a_message_it_cannot_settle(self):
+        handler = SlowExternalEventHandler(bus=None)
+        consumer = make_consumer(workers=2, external_events_map={'user.test': handler})
+        process_message = consumer.process_message
+
+        async def process_message_on_closed_channel(message, external_events_map=None, body=None):
+            if body.get('closed'):
+                raise ConnectionError('channel closed')
+            await process_message(message, external_events_map, body)
+
+        consumer.process_message = process_message_on_closed_channel
+        user_id = str(uuid4())
+        messages = [
+            FakeIncomingMessage('user.test', orjson.dumps({'user_id': user_id, 'closed': n == 0}))
+            for n in range(consumer.prefetch_count + 4)
+        ]
+        for message in messages:
+            consumer.queue.put(message)
+
+        consuming_task = asyncio.create_task(consumer.consume())
+        async with asyncio.timeout(5):
+            while not all(message.processed for message in messages):
+                await asyncio.sleep(0.005)
+        consuming_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consuming_task
+
+        assert messages[0].requeued
+        assert all(message.acked for message in messages[1:])
+
+
+    async def test_shutdown_drains_lanes_before_cancelling_workers(self):
+        handler = SlowExternalEventHandler(bus=None)
+        consumer = make_consumer(workers=2, external_events_map={'user.test': handler})
+        messages = [FakeIncomingMessage('user.test', orjson.dumps({'n': n})) for n in range(6)]
+        for message in messages:
+            consumer.queue.put(message)
+
+        consuming_task = asyncio.create_task(consumer.consume())
+        while not handler.running:
+            await asyncio.sleep(0.001)
+        consuming_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consuming_task
+
+        assert all(message.acked for message in messages)
+
+
+    async def test_shutdown_requeues_messages_still_in_flight(self):
+        class StuckExternalEventHandler(BaseExternalEventHandler):
+            async def __call__(self, body: dict) -> None:
+                await asyncio.Event().wait()
+
+        consumer = make_consumer(
+            workers=2,
+            shutdown_timeout_seconds=0.01,
+            external_events_map={'user.test': StuckExternalEventHandler(bus=None)},
+        )
+        message = FakeIncomingMessage('user.test', orjson.dumps({'n': 0}))
+        consumer.queue.put(message)
+
+        consuming_task = asyncio.create_task(consumer.consume())
+        while not consumer.queue.delivered:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+        consuming_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consuming_task
+
+        assert message.requeued
+        assert not message.acked
+
+
+    async def test_cancelled_handler_releases_its_claim(self):
+        started = asyncio.Event()
+
+        class StuckExternalEventHandler(BaseExternalEventHandler):
+            async def __call__(self, body: dict) -> None:
+                started.set()
+                await asyncio.Event().wait()
+
+        store = FakeIdempotencyStore()
+        consumer = make_consumer(
+            external_events_map={'user.test': StuckExternalEventHandler(bus=None)},
+            idempotency_store=store,
+        )
+        message = FakeIncomingMessage('user.test', orjson.dumps({'n': 0}), message_id='stuck')
+        consumer.queue.put(message)
+
+        consuming_task = asyncio.create_task(consumer.consume())
+        await started.wait()
+        consuming_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consuming_task
+
+        assert message.requeued
+        assert store.in_flight == set()
+        assert store.processed == set()
+
+
+    @pytest.mark.parametrize('batch_size', [1, 10])
+    async def test_typed_handler_receives_decoded_events(self, batch_size):
+        handler = TypedBatchExternalEventHandler(bus=None)
+        consumer = make_consumer(
+            batch_size=batch_size,
+            batch_timeout_ms=20,
+            external_events_map={'user.credentials.created': handler},
+        )
+        user_ids = [uuid4(), uuid4()]
+        messages = [
+            FakeIncomingMessage(
+                'user.credentials.created',
+                orjson.dumps({'user_id': str(user_ids[0]), 'status': 'success', 'added_later': True}),
+                headers={'x-schema-version': 2},
+            ),
+            FakeIncomingMessage(
+                'user.credentials.created',
+                orjson.dumps([str(user_ids[1]), 'failed']),
+                headers={'x-schema-version': 1},
+            ),
+        ]
+
+        await drain(consumer, messages)
+
+        events = handler.events + [event for batch in handler.batches for event in batch]
+        assert events == [
+            UserCredentialsCreatedExternalEvent(user_id=user_ids[0], status=UserCredentialsStatus.SUCCESS),
+            UserCredentialsCreatedExternalEvent(user_id=user_ids[1], status=UserCredentialsStatus.FAILED),
+        ]
+        assert all(message.acked for message in messages)
+
+
+    async def test_compact_body_of_unknown_schema_version_is_not_decoded(self):
+        handler = TypedBatchExternalEventHandler(bus=None)
+        consumer = make_consumer(external_events_map={'user.credentials.created': handler}, max_attempts=1)
+        message = FakeIncomingMessage(
+            'user.credentials.created',
+            orjson.dumps([str(uuid4()), 'failed']),
+            headers={'x-schema-version': 2},
+        )
+
+        await drain(consumer, [message])
+
+        assert handler.events == []
+        assert [routing_key for routing_key, _ in consumer.channel.default_exchange.published] == ['queue.dead-letter']
+
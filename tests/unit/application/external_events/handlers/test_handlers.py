@@ -12,6 +12,7 @@ from domain.entities.users import UserCredentialsStatus
 from domain.events.users import (
     UserRegistrationCompletedEvent,
 )
+from infrastructure.exception.users import UserNotFoundException
 
 
 @pytest.mark.asyncio
@@ -35,7 +36,7 @@ class TestExternalEventHandlers:
         handler = UserCredentialsCreatedExternalEventHandler(bus=fake_message_bus)
         async with fake_consumer:
             with expectation:
-                await handler(body=body)
+                await handler(handler.decode(body))
 
                 async with fake_user_uow:
                     user = await fake_user_uow.users.get(user_id=random_user_entity.id)
@@ -44,6 +45,46 @@ class TestExternalEventHandlers:
         assert fake_consumer.broker.queue.pop()['event'] == UserRegistrationCompletedEvent.__name__
 
 
+    async def test_user_credentials_created_external_event_handler_batch(
+            self, random_user_entities, fake_user_uow, fake_consumer, fake_message_bus
+    ):
+        async with fake_user_uow:
+            await fake_user_uow.users.add_many(random_user_entities)
+            await fake_user_uow.commit()
+
+        bodies = [
+            {'user_id': str(user.id), 'status': UserCredentialsStatus.SUCCESS.value}
+            for user in random_user_entities
+        ]
+        handler = UserCredentialsCreatedExternalEventHandler(bus=fake_message_bus)
+        fake_consumer.broker.queue.clear()
+        async with fake_consumer:
+            await handler.handle_batch([handler.decode(body) for body in bodies])
+
+        assert all(user.credentials_status == UserCredentialsStatus.SUCCESS for user in random_user_entities)
+        published = [message for message in fake_consumer.broker.queue if message['event'] == UserRegistrationCompletedEvent.__name__]
+        assert {message['body']['user_id'] for message in published} == {user.id for user in random_user_entities}
+
+
+    async def test_user_credentials_created_external_event_handler_batch_with_missing_user(
+            self, random_user_entities, fake_user_uow, fake_consumer, fake_message_bus
+    ):
+        async with fake_user_uow:
+            await fake_user_uow.users.add_many(random_user_entities)
+            await fake_user_uow.commit()
+
+        bodies = [
+            {'user_id': str(user_id), 'status': UserCredentialsStatus.SUCCESS.value}
+            for user_id in [*(user.id for user in random_user_entities), uuid4()]
+        ]
+        handler = UserCredentialsCreatedExternalEventHandler(bus=fake_message_bus)
+        fake_consumer.broker.queue.clear()
+        with pytest.raises(UserNotFoundException):
+            await handler.handle_batch([handler.decode(body) for body in bodies])
+
+        assert not [message for message in fake_consumer.broker.queue if message['event'] == UserRegistrationCompletedEvent.__name__]
+
+
     @pytest.mark.parametrize(
         'body, expectation',
         [
@@ -61,7 +102,7 @@ class TestExternalEventHandlers:
         handler = UserEmailUpdatedExternalEventHandler(bus=fake_message_bus)
         async with fake_consumer:
             with expectation:
-                await handler(body=body)
+                await handler(handler.decode(body))
 
                 async with fake_user_uow:
                     user = await fake_user_uow.users.get(user_id=random_user_entity.id)
@@ -85,7 +126,7 @@ class TestExternalEventHandlers:
         handler = UserPhoneNumberUpdatedExternalEventHandler(bus=fake_message_bus)
         async with fake_consumer:
             with expectation:
-                await handler(body=body)
+                await handler(handler.decode(body))
 
                 async with fake_user_uow:
                     user = await fake_user_uow.users.get(user_id=random_user_entity.id)
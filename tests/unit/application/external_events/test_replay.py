@@ -0,0 +1,31 @@
+from unittest import mock
+
+import pytest
+
+from application.external_events.consumers.rabbitmq import RabbitMQConsumer
+from application.external_events.replay import replay_dead_letters
+from domain.events.users import UserCreatedEvent
+from infrastructure.producers.rabbitmq import RabbitMQProducer
+from infrastructure.producers.spool import SpoolingProducer
+from settings.container import _initialize_container
+
+
+@pytest.mark.asyncio
+async def test_replay_publishes_without_the_apps_spool():
+    with (
+        mock.patch('application.external_events.replay.initialize_container', _initialize_container),
+        mock.patch.object(RabbitMQProducer, 'start') as producer_start,
+        mock.patch.object(RabbitMQProducer, 'stop'),
+        mock.patch.object(SpoolingProducer, 'start') as spooling_start,
+        mock.patch.object(RabbitMQConsumer, 'start'),
+        mock.patch.object(RabbitMQConsumer, 'stop'),
+        mock.patch.object(RabbitMQConsumer, 'replay_dead_letters', autospec=True, return_value=3) as replay,
+    ):
+        assert await replay_dead_letters(limit=None, batch_size=10) == 3
+
+    producer_start.assert_awaited_once()
+    spooling_start.assert_not_awaited()
+    consumer = replay.call_args.args[0]
+    for handler in consumer.external_events_map.values():
+        [user_created_handler] = handler.bus.events_map[UserCreatedEvent]
+        assert isinstance(user_created_handler.producer, RabbitMQProducer)
@@ -57,4 +57,13 @@ from domain.value_objects.users import EmailVO, PhoneNumberVO, NameVO
 )
 def test_user_entity(user1, user2, expectation):
     with expectation:
-        assert user1 == user2
\ No newline at end of file
+        assert user1 == user2
+
+def test_user_entity_is_slotted(random_user_entity):
+    assert not hasattr(random_user_entity, '__dict__')
+    assert not hasattr(random_user_entity.email, '__dict__')
+    assert hash(random_user_entity) == hash(random_user_entity.id)
+    assert random_user_entity in {random_user_entity}
+
+    with pytest.raises(AttributeError):
+        random_user_entity.unknown_attribute = 'value'
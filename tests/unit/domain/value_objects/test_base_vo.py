@@ -0,0 +1,35 @@
+import pytest
+
+from domain.exceptions.users import EmailNotContainingAtSymbolException
+from domain.value_objects.users import EmailVO, NameVO, PhoneNumberVO
+
+
+@pytest.mark.parametrize(
+    'vo_class, value',
+    [
+        (EmailVO, 'user@example.com'),
+        (PhoneNumberVO, '+1234567890'),
+        (NameVO, 'John'),
+    ]
+)
+def test_trusted_vo_equals_validated_vo(vo_class, value):
+    trusted = vo_class.trusted(value)
+
+    assert type(trusted) is vo_class
+    assert trusted == vo_class(value)
+    assert hash(trusted) == hash(vo_class(value))
+    assert trusted.as_generic() == value
+
+
+def test_trusted_vo_skips_validation():
+    with pytest.raises(EmailNotContainingAtSymbolException):
+        EmailVO('not-an-email')
+
+    assert EmailVO.trusted('not-an-email').as_generic() == 'not-an-email'
+
+
+def test_trusted_vo_is_frozen():
+    vo = NameVO.trusted('John')
+
+    with pytest.raises(AttributeError):
+        vo.value = 'Jane'
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from infrastructure.cache.memory import TTLLRUCache
+
+
+class TestTTLLRUCache:
+    def test_get_returns_stored_value(self):
+        cache = TTLLRUCache(max_entries=2, ttl_seconds=60)
+        cache.set('key', 'value')
+
+        assert cache.get('key') == 'value'
+        assert cache.get('missing') is None
+
+
+    def test_entries_expire(self):
+        cache = TTLLRUCache(max_entries=2, ttl_seconds=60)
+        with mock.patch('infrastructure.cache.memory.time.monotonic', return_value=100.0):
+            cache.set('default', 'value')
+            cache.set('short', 'value', ttl_seconds=10)
+            cache.set('long', 'value', ttl_seconds=600)
+
+        with mock.patch('infrastructure.cache.memory.time.monotonic', return_value=111.0):
+            assert cache.get('short') is None
+            assert cache.get('long') == 'value'
+
+        with mock.patch('infrastructure.cache.memory.time.monotonic', return_value=161.0):
+            assert cache.get('long') is None
+
+        assert len(cache) == 0
+
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLLRUCache(max_entries=2, ttl_seconds=60)
+        cache.set('first', 1)
+        cache.set('second', 2)
+        cache.get('first')
+        cache.set('third', 3)
+
+        assert cache.get('second') is None
+        assert cache.get('first') == 1
+        assert cache.get('third') == 3
+        assert len(cache) == 2
+
+
+    def test_pop_and_clear(self):
+        cache = TTLLRUCache(max_entries=2, ttl_seconds=60)
+        cache.set('first', 1)
+        cache.set('second', 2)
+
+        assert cache.pop('first') == 1
+        assert cache.pop('first') is None
+
+        cache.clear()
+        assert len(cache) == 0
+
+
+    def test_counters(self):
+        cache = TTLLRUCache(max_entries=1, ttl_seconds=60)
+        with mock.patch('infrastructure.cache.memory.time.monotonic', return_value=100.0):
+            cache.set('first', 1)
+            cache.get('first')
+            cache.get('missing')
+            cache.set('second', 2, ttl_seconds=1)
+
+        with mock.patch('infrastructure.cache.memory.time.monotonic', return_value=102.0):
+            cache.get('second')
+
+        assert cache.stats() == {'size': 0, 'hits': 1, 'misses': 2, 'evictions': 1, 'expirations': 1}
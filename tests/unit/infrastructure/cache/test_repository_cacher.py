@@ -0,0 +1,273 @@
+import asyncio
+from unittest import mock
+from uuid import uuid4
+
+import pytest
+
+from domain.commands.users import CreateUserCommand
+from domain.entities.users import UserCredentialsStatus, UserWithCredentialsEntity
+from domain.value_objects.users import PasswordVO
+from infrastructure.cache.base import copy_user
+from infrastructure.cache.redis import RedisUserRepositoryCacher
+from infrastructure.exception.users import UserNotFoundException
+from service.handlers.command.users import CreateUserCommandHandler
+from tests.fakes import CachedFakeUserRepository, FakeUserUnitOfWork, fake_cache_repository
+
+
+@pytest.fixture
+def cached_fake_user_uow():
+    fake_cache_repository.users.clear()
+    uow = FakeUserUnitOfWork()
+    uow.users = CachedFakeUserRepository()
+    yield uow
+    fake_cache_repository.users.clear()
+
+
+@pytest.mark.asyncio
+class TestUserRepositoryCacher:
+    async def test_get_reads_through_cache(self, random_user_entity, cached_fake_user_uow):
+        repo = cached_fake_user_uow.users
+        repo.users_list.append(random_user_entity)
+
+        await repo.get(random_user_entity.id)
+        assert random_user_entity.id in fake_cache_repository.users
+
+        repo.users_list.clear()
+        repo.loaded_users.clear()
+        user = await repo.get(random_user_entity.id)
+
+        assert user.id == random_user_entity.id
+        assert user.email == random_user_entity.email
+        assert user in repo.loaded_users
+
+
+    @pytest.mark.parametrize(
+        'method, args',
+        [
+            ('update_status', (UserCredentialsStatus.SUCCESS,)),
+            ('update_photo', ('new_photo.png',)),
+            ('update_email', ('new_email@testmail.com',)),
+            ('update_phone_number', ('+380000000000',)),
+            ('remove', ()),
+        ],
+    )
+    async def test_mutators_invalidate_after_commit(self, random_user_entity, cached_fake_user_uow, method, args):
+        async with cached_fake_user_uow:
+            cached_fake_user_uow.users.users_list.append(random_user_entity)
+            await cached_fake_user_uow.users.get(random_user_entity.id)
+
+            await getattr(cached_fake_user_uow.users, method)(random_user_entity.id, *args)
+            assert random_user_entity.id in fake_cache_repository.users
+
+            await cached_fake_user_uow.commit()
+            assert random_user_entity.id not in fake_cache_repository.users
+
+
+    async def test_update_status_many_invalidates_after_commit(self, random_user_entities, cached_fake_user_uow):
+        async with cached_fake_user_uow:
+            cached_fake_user_uow.users.users_list.extend(random_user_entities)
+            for user in random_user_entities:
+                await cached_fake_user_uow.users.get(user.id)
+
+            await cached_fake_user_uow.users.update_status_many(
+                {user.id: UserCredentialsStatus.SUCCESS for user in random_user_entities[:2]}
+            )
+            await cached_fake_user_uow.commit()
+
+        assert set(fake_cache_repository.users) == {user.id for user in random_user_entities[2:]}
+
+
+    async def test_rollback_drops_pending_invalidations(self, random_user_entity, cached_fake_user_uow):
+        async with cached_fake_user_uow:
+            cached_fake_user_uow.users.users_list.append(random_user_entity)
+            await cached_fake_user_uow.users.get(random_user_entity.id)
+            await cached_fake_user_uow.users.update_photo(random_user_entity.id, 'new_photo.png')
+
+        assert not cached_fake_user_uow.users.pending_cache_invalidations
+        assert random_user_entity.id in fake_cache_repository.users
+
+
+    async def test_uncommitted_changes_are_not_cached(self, random_user_entity, cached_fake_user_uow):
+        async with cached_fake_user_uow:
+            cached_fake_user_uow.users.users_list.append(random_user_entity)
+            await cached_fake_user_uow.users.update_photo(random_user_entity.id, 'new_photo.png')
+            await cached_fake_user_uow.users.get(random_user_entity.id)
+
+            assert random_user_entity.id not in fake_cache_repository.users
+
+
+    async def test_concurrent_misses_share_one_load(self, random_user_entity):
+        loads = 0
+
+        async def loader():
+            nonlocal loads
+            loads += 1
+            await asyncio.sleep(0.01)
+            return random_user_entity
+
+        users = await asyncio.gather(
+            *(fake_cache_repository.load_single_flight(random_user_entity.id, loader) for _ in range(10))
+        )
+
+        assert loads == 1
+        assert all(user.id == random_user_entity.id for user in users)
+        assert len({id(user) for user in users}) == 10
+        assert not fake_cache_repository.inflight
+
+
+    async def test_concurrent_misses_share_load_failure(self, random_user_entity):
+        async def loader():
+            await asyncio.sleep(0.01)
+            raise UserNotFoundException(user_id=random_user_entity.id)
+
+        results = await asyncio.gather(
+            *(fake_cache_repository.load_single_flight(random_user_entity.id, loader) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, UserNotFoundException) for result in results)
+        assert not fake_cache_repository.inflight
+
+
+    async def test_load_is_not_cached_when_invalidated_meanwhile(self, random_user_entity, cached_fake_user_uow):
+        repo = cached_fake_user_uow.users
+        repo.users_list.append(random_user_entity)
+        stale_user = copy_user(random_user_entity)
+        committed = asyncio.Event()
+
+        async def stale_loader():
+            await committed.wait()
+            return stale_user
+
+        async def update_email():
+            async with cached_fake_user_uow:
+                await repo.update_email(random_user_entity.id, 'new_email@testmail.com')
+                await cached_fake_user_uow.commit()
+            committed.set()
+
+        user, _ = await asyncio.gather(
+            fake_cache_repository.load_single_flight(random_user_entity.id, stale_loader),
+            update_email(),
+        )
+
+        assert user is stale_user
+        assert random_user_entity.id not in fake_cache_repository.users
+
+
+    async def test_load_is_cached_when_other_users_are_invalidated_meanwhile(self, random_user_entity):
+        fake_cache_repository.users.clear()
+        invalidated = asyncio.Event()
+
+        async def loader():
+            await invalidated.wait()
+            return random_user_entity
+
+        async def invalidate_other_user():
+            fake_cache_repository.invalidate([uuid4()])
+            invalidated.set()
+
+        await asyncio.gather(
+            fake_cache_repository.load_single_flight(random_user_entity.id, loader),
+            invalidate_other_user(),
+        )
+
+        assert random_user_entity.id in fake_cache_repository.users
+        assert not fake_cache_repository.versions
+        assert not fake_cache_repository.watchers
+
+
+class TestRedisUserRepositoryCacherExpiry:
+    def test_early_refresh_probability_grows_near_expiry(self):
+        cacher = RedisUserRepositoryCacher(early_refresh_beta=1.0)
+        cacher.load_seconds = 0.05
+
+        with mock.patch('infrastructure.cache.redis.random.random', return_value=0.5):
+            assert not cacher._should_refresh_early(ttl_ms=60_000)
+            assert cacher._should_refresh_early(ttl_ms=10)
+            assert not cacher._should_refresh_early(ttl_ms=-1)
+
+        cacher.early_refresh_beta = 0
+        assert not cacher._should_refresh_early(ttl_ms=1)
+
+
+    @pytest.mark.asyncio
+    async def test_expiration_is_jittered(self, random_user_entity):
+        cacher = RedisUserRepositoryCacher(expiration_seconds=1000, expiration_jitter=0.1)
+        cacher.redis = mock.AsyncMock()
+
+        with mock.patch('infrastructure.cache.redis.random.uniform', return_value=0.1):
+            await cacher.add_to_cache(random_user_entity)
+
+        assert cacher.redis.set.await_args.kwargs['ex'] == 900
+
+
+    @pytest.mark.asyncio
+    async def test_waiter_loads_once_lock_is_released_without_an_entry(self, random_user_entity):
+        cacher = RedisUserRepositoryCacher(lock_enabled=True, lock_timeout_seconds=10, lock_poll_interval_seconds=0.001)
+        cacher.redis = mock.AsyncMock()
+        cacher.redis.set.side_effect = [False, True]
+        cacher.redis.exists.return_value = 0
+        cacher.get_from_cache = mock.AsyncMock(return_value=None)
+        loader = mock.AsyncMock(return_value=random_user_entity)
+
+        user = await asyncio.wait_for(cacher.load(random_user_entity.id, loader), 1)
+
+        assert user is random_user_entity
+        loader.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+class TestNegativeUserCache:
+    async def test_unknown_user_is_cached_as_not_found(self, random_user_entity, cached_fake_user_uow):
+        repo = cached_fake_user_uow.users
+        negative_hits = fake_cache_repository.negative_hits
+
+        with pytest.raises(UserNotFoundException):
+            await repo.get(random_user_entity.id)
+
+        repo.users_list.append(random_user_entity)
+        with pytest.raises(UserNotFoundException):
+            await repo.get(random_user_entity.id)
+
+        assert fake_cache_repository.negative_hits == negative_hits + 1
+
+
+    async def test_create_user_clears_not_found_marker(self, random_user_entity, cached_fake_user_uow):
+        with pytest.raises(UserNotFoundException):
+            await cached_fake_user_uow.users.get(random_user_entity.id)
+
+        command = CreateUserCommand(
+            user_with_credentials=UserWithCredentialsEntity(
+                user=random_user_entity,
+                password=PasswordVO('VerySecretPa$$word1234'),
+            )
+        )
+        await CreateUserCommandHandler()(command=command, uow=cached_fake_user_uow)
+
+        user = await cached_fake_user_uow.users.get(random_user_entity.id)
+        assert user.id == random_user_entity.id
+
+
+    async def test_miss_racing_user_creation_is_not_cached_as_not_found(self, random_user_entity, cached_fake_user_uow):
+        repo = cached_fake_user_uow.users
+        committed = asyncio.Event()
+
+        async def stale_loader():
+            await committed.wait()
+            raise UserNotFoundException(user_id=random_user_entity.id)
+
+        async def create_user():
+            async with cached_fake_user_uow:
+                await repo.add(random_user_entity)
+                await cached_fake_user_uow.commit()
+            committed.set()
+
+        results = await asyncio.gather(
+            fake_cache_repository.load_single_flight(random_user_entity.id, stale_loader),
+            create_user(),
+            return_exceptions=True,
+        )
+
+        assert isinstance(results[0], UserNotFoundException)
+        assert random_user_entity.id not in fake_cache_repository.users
+        assert (await repo.get(random_user_entity.id)).id == random_user_entity.id
@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import orjson
+import pytest
+
+from domain.entities.users import UserCredentialsStatus
+from domain.events.users import UserCreatedEvent, UserDeletedEvent, UserRegistrationCompletedEvent
+from infrastructure.converters.events import (
+    EVENT_TYPE_HEADER,
+    SCHEMA_VERSION_HEADER,
+    EventDecoder,
+    EventSerializer,
+    convert_event_to_dict,
+    convert_event_to_json,
+    get_event_headers,
+    get_event_serializer,
+    register_event_serializer,
+)
+
+
+def test_convert_event_to_json():
+    event = UserRegistrationCompletedEvent(
+        user_id=uuid4(),
+        photo='user-service/user-photos/profile-photo.jpg',
+        created_at=datetime.now(timezone.utc),
+        email='user@example.com',
+        phone_number=None,
+        first_name='John',
+        last_name=None,
+        middle_name=None,
+        credentials_status=UserCredentialsStatus.SUCCESS,
+    )
+
+    assert not hasattr(event, '__dict__')
+    assert list(convert_event_to_dict(event)) == [
+        'event_id',
+        'user_id',
+        'photo',
+        'created_at',
+        'email',
+        'phone_number',
+        'first_name',
+        'last_name',
+        'middle_name',
+        'credentials_status',
+    ]
+    assert orjson.loads(convert_event_to_json(event)) == {
+        'event_id': str(event.event_id),
+        'user_id': str(event.user_id),
+        'photo': event.photo,
+        'created_at': event.created_at.isoformat(),
+        'email': event.email,
+        'phone_number': None,
+        'first_name': event.first_name,
+        'last_name': None,
+        'middle_name': None,
+        'credentials_status': 'success',
+    }
+
+
+def make_registration_completed_event(**kwargs) -> UserRegistrationCompletedEvent:
+    return UserRegistrationCompletedEvent(
+        **{
+            'user_id': uuid4(),
+            'photo': 'user-service/user-photos/profile-photo.jpg',
+            'created_at': datetime.now(timezone.utc),
+            'email': 'user@example.com',
+            'phone_number': None,
+            'first_name': 'John',
+            'last_name': None,
+            'middle_name': None,
+            'credentials_status': UserCredentialsStatus.SUCCESS,
+            **kwargs,
+        }
+    )
+
+
+def test_serializer_turns_enums_into_their_values():
+    event = make_registration_completed_event()
+
+    primitive = EventSerializer.build(UserRegistrationCompletedEvent).to_primitive(event)
+
+    assert primitive['credentials_status'] == 'success'
+    assert primitive['created_at'] is event.created_at
+
+
+def test_compact_serializer_writes_values_in_field_order():
+    event = make_registration_completed_event()
+    serializer = EventSerializer.build(UserRegistrationCompletedEvent, compact=True)
+
+    assert orjson.loads(serializer.encode(event)) == [
+        orjson.loads(EventSerializer.build(UserRegistrationCompletedEvent).encode(event))[name]
+        for name in serializer.field_names
+    ]
+
+
+def test_serializer_writes_only_schema_fields():
+    event = UserCreatedEvent(user_id=uuid4(), password='password', email='user@example.com', phone_number=None)
+    serializer = EventSerializer.build(UserCreatedEvent, field_names=('event_id', 'user_id', 'email'))
+
+    assert orjson.loads(serializer.encode(event)) == {
+        'event_id': str(event.event_id),
+        'user_id': str(event.user_id),
+        'email': 'user@example.com',
+    }
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_decoder_round_trips_serialized_events(compact):
+    event = make_registration_completed_event(last_name='Doe', credentials_status=UserCredentialsStatus.FAILED)
+    serializer = EventSerializer.build(UserRegistrationCompletedEvent, version=3, compact=compact)
+    decoder = EventDecoder.build(UserRegistrationCompletedEvent, version=3)
+
+    assert decoder.decode(orjson.loads(serializer.encode(event)), version=3) == event
+
+
+def test_named_decoder_ignores_new_keys_and_missing_optional_fields():
+    event = UserCreatedEvent(user_id=uuid4(), password='password', email='user@example.com', phone_number=None)
+    body = orjson.loads(convert_event_to_json(event))
+    del body['phone_number']
+    body['added_later'] = True
+
+    assert EventDecoder.build(UserCreatedEvent).decode(body, version=2) == event
+
+
+def test_compact_decoder_rejects_other_schema_versions():
+    event = UserDeletedEvent(user_id=uuid4())
+    body = orjson.loads(EventSerializer.build(UserDeletedEvent, compact=True).encode(event))
+
+    with pytest.raises(ValueError):
+        EventDecoder.build(UserDeletedEvent, version=1).decode(body, version=2)
+
+
+def test_registered_serializer_is_used_for_publishing():
+    event = UserDeletedEvent(user_id=uuid4())
+    serializer = register_event_serializer(UserDeletedEvent, version=2, compact=True)
+    try:
+        assert get_event_serializer(UserDeletedEvent) is serializer
+        assert orjson.loads(convert_event_to_json(event)) == [str(event.event_id), str(event.user_id)]
+        assert get_event_headers(event) == {
+            EVENT_TYPE_HEADER: 'UserDeletedEvent',
+            SCHEMA_VERSION_HEADER: 2,
+            'user_id': str(event.user_id),
+        }
+    finally:
+        register_event_serializer(UserDeletedEvent, version=1, compact=False)
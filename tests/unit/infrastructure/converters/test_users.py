@@ -0,0 +1,53 @@
+import pytest
+
+from domain.entities.users import UserEntity, UserCredentialsStatus
+from domain.value_objects.users import EmailVO, NameVO
+from infrastructure.converters.users import (
+    convert_user_cache_to_entity,
+    convert_user_entity_to_bytes,
+    convert_user_entity_to_json,
+)
+
+
+def assert_same_user(result: UserEntity, expected: UserEntity):
+    assert result.id == expected.id
+    assert result.created_at == expected.created_at
+    assert result.photo == expected.photo
+    assert result.email == expected.email
+    assert result.phone_number == expected.phone_number
+    assert result.first_name == expected.first_name
+    assert result.last_name == expected.last_name
+    assert result.middle_name == expected.middle_name
+    assert result.credentials_status == expected.credentials_status
+
+
+class TestUserCacheEncoding:
+    @pytest.mark.parametrize('encoder', [convert_user_entity_to_json, convert_user_entity_to_bytes])
+    def test_round_trip(self, random_user_entity, encoder):
+        random_user_entity.photo = 'user-service/user-photos/profile-photo.jpg'
+        random_user_entity.credentials_status = UserCredentialsStatus.FAILED
+
+        assert_same_user(convert_user_cache_to_entity(encoder(random_user_entity)), random_user_entity)
+
+
+    def test_binary_round_trip_with_missing_fields(self):
+        user = UserEntity(
+            email=EmailVO('ünïcødé@example.com'),
+            phone_number=None,
+            first_name=NameVO('Тарас'),
+            last_name=None,
+            middle_name=None,
+        )
+
+        assert_same_user(convert_user_cache_to_entity(convert_user_entity_to_bytes(user)), user)
+
+
+    def test_binary_is_smaller_than_json(self, random_user_entity):
+        assert len(convert_user_entity_to_bytes(random_user_entity)) < len(convert_user_entity_to_json(random_user_entity)) / 2
+
+
+    def test_unknown_binary_version_is_rejected(self, random_user_entity):
+        data = convert_user_entity_to_bytes(random_user_entity)
+
+        with pytest.raises(ValueError):
+            convert_user_cache_to_entity(b'\x02' + data[1:])
@@ -0,0 +1,50 @@
+from unittest import mock
+
+import pytest
+
+from infrastructure.exception.messages import MessageInProgressException
+from infrastructure.idempotency.redis import IN_PROGRESS, PROCESSED, RedisIdempotencyStore
+
+
+@pytest.fixture
+def store():
+    return RedisIdempotencyStore(redis=mock.AsyncMock(), expiration_seconds=86400, in_progress_seconds=300)
+
+
+@pytest.mark.asyncio
+class TestRedisIdempotencyStore:
+    async def test_claim_only_marks_message_in_progress(self, store):
+        store.redis.set.return_value = True
+
+        assert await store.claim('user.test:1')
+
+        store.redis.set.assert_awaited_once_with('processed_message:user.test:1', IN_PROGRESS, nx=True, ex=300)
+
+
+    async def test_complete_keeps_the_key_for_the_full_expiration(self, store):
+        await store.complete('user.test:1')
+
+        store.redis.set.assert_awaited_once_with('processed_message:user.test:1', PROCESSED, ex=86400)
+
+
+    async def test_processed_message_is_a_duplicate(self, store):
+        store.redis.set.return_value = None
+        store.redis.get.return_value = PROCESSED
+
+        assert not await store.claim('user.test:1')
+        assert store.stats() == {'duplicates': 1}
+
+
+    async def test_message_in_progress_is_not_a_duplicate(self, store):
+        store.redis.set.return_value = None
+        store.redis.get.return_value = IN_PROGRESS
+
+        with pytest.raises(MessageInProgressException):
+            await store.claim('user.test:1')
+        assert store.duplicates == 0
+
+
+    async def test_claim_fails_open(self, store):
+        store.redis.set.side_effect = ConnectionError('redis is down')
+
+        assert await store.claim('user.test:1')
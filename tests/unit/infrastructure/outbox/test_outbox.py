@@ -0,0 +1,41 @@
+from unittest import mock
+
+import pytest
+
+from domain.events.users import UserCreatedEvent, UserDeletedEvent
+from infrastructure.converters.events import convert_event_to_json
+from infrastructure.outbox.postgresql import record_outbox_events
+
+
+@pytest.mark.asyncio
+class TestRecordOutboxEvents:
+    async def test_publishable_events_are_moved_into_outbox_rows(self, random_user_entity):
+        session = mock.AsyncMock()
+        created = UserCreatedEvent(
+            user_id=random_user_entity.id,
+            password='password',
+            email=random_user_entity.email.as_generic(),
+            phone_number=None,
+        )
+        deleted = UserDeletedEvent(user_id=random_user_entity.id)
+        random_user_entity.events = [created, deleted]
+
+        recorded = await record_outbox_events(session, [random_user_entity], {UserCreatedEvent: 'user.created'})
+
+        assert recorded == 1
+        assert random_user_entity.events == [deleted]
+        _, rows = session.execute.await_args.args
+        assert rows == [{
+            'id': created.event_id,
+            'topic': 'user.created',
+            'payload': convert_event_to_json(created),
+            'headers': {'x-event-type': 'UserCreatedEvent', 'x-schema-version': 1, 'user_id': str(random_user_entity.id)},
+        }]
+
+
+    async def test_nothing_is_written_without_publishable_events(self, random_user_entity):
+        session = mock.AsyncMock()
+        random_user_entity.events = [UserDeletedEvent(user_id=random_user_entity.id)]
+
+        assert await record_outbox_events(session, [random_user_entity], {UserCreatedEvent: 'user.created'}) == 0
+        session.execute.assert_not_awaited()
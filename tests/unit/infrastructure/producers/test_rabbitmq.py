@@ -0,0 +1,112 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from infrastructure.producers.rabbitmq import RabbitMQProducer
+from tests.fakes import FakeRabbitMQConnection
+
+
+def make_producer(**kwargs) -> RabbitMQProducer:
+    return RabbitMQProducer(
+        host='localhost',
+        port=5672,
+        login='guest',
+        password='guest',
+        virtual_host='/',
+        exchange_name='exchange',
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def connection():
+    connection = FakeRabbitMQConnection()
+    with mock.patch('aio_pika.connect_robust', mock.AsyncMock(return_value=connection)):
+        yield connection
+
+
+@pytest.mark.asyncio
+class TestRabbitMQProducer:
+    async def test_concurrent_publishes_share_one_batch_of_pipelined_confirms(self, connection):
+        producer = make_producer(channel_pool_size=2, batch_size=100, batch_window_ms=5)
+        await producer.start()
+
+        await asyncio.gather(*(producer.publish_message(b'{}', 'user.created', str(i)) for i in range(50)))
+
+        exchange = connection.channels[0].exchange
+        assert producer.batches == 1
+        assert producer.published == 50
+        assert len(exchange.published) == 50
+        assert exchange.max_in_flight == 50
+        await producer.stop()
+
+
+    async def test_batches_over_batch_size_are_spread_across_the_pool(self, connection):
+        producer = make_producer(channel_pool_size=4, batch_size=10, batch_window_ms=5)
+        await producer.start()
+
+        await asyncio.gather(*(producer.publish_message(b'{}', 'user.created', str(i)) for i in range(40)))
+
+        assert producer.batches == 4
+        assert [len(channel.exchange.published) for channel in connection.channels] == [10, 10, 10, 10]
+        await producer.stop()
+
+
+    async def test_each_caller_gets_its_own_confirm(self, connection):
+        connection.failing_routing_keys.add('user.deleted')
+        producer = make_producer(channel_pool_size=1, batch_window_ms=5)
+        await producer.start()
+
+        results = await asyncio.gather(
+            producer.publish_message(b'{}', 'user.created', '1'),
+            producer.publish_message(b'{}', 'user.deleted', '2'),
+            producer.publish_message(b'{}', 'user.created', '3'),
+            return_exceptions=True,
+        )
+
+        assert results[0] is None
+        assert isinstance(results[1], ConnectionError)
+        assert results[2] is None
+        assert [message.message_id for _, message in connection.channels[0].exchange.published] == ['1', '3']
+        await producer.stop()
+
+
+    async def test_publish_starts_the_producer_once(self, connection):
+        producer = make_producer(channel_pool_size=2)
+
+        with mock.patch('aio_pika.connect_robust', mock.AsyncMock(return_value=connection)) as connect:
+            await asyncio.gather(*(producer.publish_message(b'{}', 'user.created', str(i)) for i in range(5)))
+
+        connect.assert_awaited_once()
+        assert len(connection.channels) == 2
+        await producer.stop()
+
+
+    async def test_stop_publishes_pending_messages_and_closes_the_pool(self, connection):
+        producer = make_producer(channel_pool_size=2, batch_window_ms=1000)
+        await producer.start()
+
+        publishing = asyncio.gather(*(producer.publish_message(b'{}', 'user.created', str(i)) for i in range(3)))
+        await asyncio.sleep(0)
+        await producer.stop()
+        await publishing
+
+        assert producer.published == 3
+        assert all(channel.closed for channel in connection.channels)
+        assert connection.closed
+
+
+    async def test_callers_are_released_by_their_own_confirm(self, connection):
+        connection.confirm_delays['user.deleted'] = 0.5
+        producer = make_producer(channel_pool_size=1, batch_window_ms=5)
+        await producer.start()
+
+        slow = asyncio.create_task(producer.publish_message(b'{}', 'user.deleted', '1'))
+        fast = [asyncio.create_task(producer.publish_message(b'{}', 'user.created', str(i))) for i in range(2, 5)]
+        await asyncio.wait_for(asyncio.gather(*fast), 0.25)
+
+        assert not slow.done()
+        assert producer.exchanges.empty()
+        await slow
+        await producer.stop()
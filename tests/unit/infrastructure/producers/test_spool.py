@@ -0,0 +1,174 @@
+import struct
+from dataclasses import dataclass
+
+import orjson
+import pytest
+
+from infrastructure.producers.breaker import CircuitBreaker
+from infrastructure.producers.spool import (
+    EventSpool,
+    SpooledMessage,
+    SpoolingProducer,
+    decode_spool_records,
+    encode_spool_record,
+)
+from tests.fakes import FakeProducer
+
+
+@dataclass
+class FlakyProducer(FakeProducer):
+    healthy: bool = True
+    attempts: int = 0
+
+    async def start(self):
+        if not self.healthy:
+            raise ConnectionError('broker unavailable')
+
+
+    async def publish_message(self, body: bytes, topic: str, message_id: str, headers: dict[str, str | int] | None = None):
+        self.attempts += 1
+        if not self.healthy:
+            raise ConnectionError('broker unavailable')
+        await super().publish_message(body, topic, message_id, headers)
+
+
+def make_message(i: int) -> SpooledMessage:
+    return SpooledMessage(
+        body=orjson.dumps({'user_id': f'user-{i}', 'credentials_status': 'SUCCESS'}),
+        topic='user.created',
+        message_id=str(i),
+        headers={'user_id': f'user-{i}'},
+    )
+
+
+@pytest.fixture
+def producer():
+    producer = FlakyProducer()
+    producer.broker.queue.clear()
+    yield producer
+    producer.broker.queue.clear()
+
+
+@pytest.fixture
+def spool(tmp_path):
+    spool = EventSpool(path=tmp_path / 'spool' / 'events.spool')
+    yield spool
+    spool.close()
+
+
+def make_spooling_producer(producer: FlakyProducer, spool: EventSpool, failure_threshold: int = 1) -> SpoolingProducer:
+    return SpoolingProducer(
+        producer=producer,
+        spool=spool,
+        breaker=CircuitBreaker(failure_threshold=failure_threshold, reset_timeout_seconds=60),
+        replay_batch_size=2,
+    )
+
+
+class TestSpoolFormat:
+    def test_record_is_length_prefixed_orjson(self):
+        message = make_message(1)
+
+        record = encode_spool_record(message)
+
+        (length,) = struct.unpack('>I', record[:4])
+        assert length == len(record) - 4
+        assert orjson.loads(record[4:]) == {
+            'topic': 'user.created',
+            'message_id': '1',
+            'headers': {'user_id': 'user-1'},
+            'body': {'user_id': 'user-1', 'credentials_status': 'SUCCESS'},
+        }
+
+
+    def test_records_round_trip(self):
+        messages = [make_message(i) for i in range(3)]
+
+        assert decode_spool_records(b''.join(encode_spool_record(message) for message in messages)) == messages
+
+
+    def test_truncated_trailing_record_is_ignored(self):
+        data = encode_spool_record(make_message(1)) + encode_spool_record(make_message(2))
+
+        assert decode_spool_records(data[:-3]) == [make_message(1)]
+        assert decode_spool_records(data[:2]) == []
+
+
+    def test_spool_appends_and_rotates(self, spool):
+        spool.append(make_message(1))
+        spool.append(make_message(2))
+
+        assert spool.rotate()
+        spool.append(make_message(3))
+
+        assert spool.read() == [make_message(1), make_message(2)]
+        assert decode_spool_records(spool.path.read_bytes()) == [make_message(3)]
+
+        spool.keep([make_message(2)])
+        assert spool.rotate()
+        assert spool.read() == [make_message(2)]
+
+        spool.keep([])
+        assert not spool.replaying_path.exists()
+
+
+@pytest.mark.asyncio
+class TestSpoolingProducer:
+    async def test_failed_publish_is_spooled_and_opens_the_breaker(self, producer, spool):
+        spooling_producer = make_spooling_producer(producer, spool)
+        producer.healthy = False
+
+        await spooling_producer.publish_message(b'{}', 'user.created', '1')
+        await spooling_producer.publish_message(b'{}', 'user.created', '2')
+
+        assert producer.attempts == 1
+        assert spooling_producer.breaker.state == 'open'
+        assert spooling_producer.spooled == 2
+        assert [message.message_id for message in decode_spool_records(spool.path.read_bytes())] == ['1', '2']
+
+
+    async def test_unavailable_broker_at_start_opens_the_breaker(self, producer, spool):
+        spooling_producer = make_spooling_producer(producer, spool)
+        producer.healthy = False
+
+        await spooling_producer.start()
+        await spooling_producer.publish_message(b'{}', 'user.created', '1')
+
+        assert producer.attempts == 0
+        assert spooling_producer.spooled == 1
+        await spooling_producer.stop()
+
+
+    async def test_replay_publishes_the_spool_in_order_and_closes_the_breaker(self, producer, spool):
+        spooling_producer = make_spooling_producer(producer, spool)
+        for i in range(5):
+            spool.append(make_message(i))
+        spooling_producer.breaker.trip()
+
+        assert await spooling_producer.replay() == 5
+
+        assert [message['message_id'] for message in producer.broker.queue] == ['0', '1', '2', '3', '4']
+        assert producer.broker.queue[0]['body'] == {'user_id': 'user-0', 'credentials_status': 'SUCCESS'}
+        assert spooling_producer.breaker.closed
+        assert not spool.path.exists() and not spool.replaying_path.exists()
+
+
+    async def test_failed_replay_keeps_the_unpublished_rest(self, producer, spool):
+        spooling_producer = make_spooling_producer(producer, spool)
+        for i in range(5):
+            spool.append(make_message(i))
+
+        async def fail_after_first_batch(*args, **kwargs):
+            if len(producer.broker.queue) >= 2:
+                raise ConnectionError('broker unavailable')
+            await FakeProducer.publish_message(producer, *args, **kwargs)
+
+        producer.publish_message = fail_after_first_batch
+        assert await spooling_producer.replay() == 2
+
+        assert not spooling_producer.breaker.closed
+        assert [message.message_id for message in spool.read()] == ['2', '3', '4']
+
+        del producer.publish_message
+        assert await spooling_producer.replay() == 3
+        assert [message['message_id'] for message in producer.broker.queue] == ['0', '1', '2', '3', '4']
@@ -0,0 +1,36 @@
+import uuid
+
+import pytest
+
+from domain.entities.users import UserCredentialsStatus
+
+
+@pytest.mark.asyncio
+class TestBatchRepositoryMethods:
+    async def test_add_many_tracks_loaded_users(self, random_user_entities, fake_user_repository):
+        await fake_user_repository.add_many(user for user in random_user_entities)
+
+        assert fake_user_repository.loaded_users == set(random_user_entities)
+
+
+    async def test_get_many_skips_missing_users(self, random_user_entities, fake_user_repository):
+        await fake_user_repository.add_many(random_user_entities[:3])
+        fake_user_repository.loaded_users.clear()
+
+        result = await fake_user_repository.get_many([user.id for user in random_user_entities])
+
+        assert result == random_user_entities[:3]
+        assert fake_user_repository.loaded_users == set(random_user_entities[:3])
+
+
+    async def test_update_status_many(self, random_user_entities, fake_user_repository):
+        await fake_user_repository.add_many(random_user_entities)
+        fake_user_repository.loaded_users.clear()
+
+        statuses = {user.id: UserCredentialsStatus.SUCCESS for user in random_user_entities[:2]}
+        result = await fake_user_repository.update_status_many({**statuses, uuid.uuid4(): UserCredentialsStatus.FAILED})
+
+        assert result == random_user_entities[:2]
+        assert all(user.credentials_status == UserCredentialsStatus.SUCCESS for user in result)
+        assert random_user_entities[2].credentials_status == UserCredentialsStatus.PENDING
+        assert fake_user_repository.loaded_users == set(result)
@@ -3,6 +3,7 @@ import pytest
 from domain.commands.users import (
     CreateUserCommand,
     UpdateUserCredentialsStatusCommand,
+    UpdateUserCredentialsStatusManyCommand,
     UpdateUserPhotoCommand,
     DeleteUserCommand,
     UpdateUserEmailCommand,
@@ -15,11 +16,13 @@ from infrastructure.exception.users import UserNotFoundException
 from service.handlers.command.users import (
     CreateUserCommandHandler,
     UpdateUserCredentialsStatusCommandHandler,
+    UpdateUserCredentialsStatusManyCommandHandler,
     UpdateUserPhotoCommandHandler,
     DeleteUserCommandHandler,
     UpdateUserEmailCommandHandler,
     UpdateUserPhoneNumberCommandHandler,
 )
+from tests.fakes import FakePresignedURLCacher
 
 
 @pytest.mark.asyncio
@@ -34,8 +37,8 @@ class TestCommandHandlers:
             )
         )
         async with fake_consumer:
-            handler = CreateUserCommandHandler(uow=fake_user_uow)
-            await handler(command=command)
+            handler = CreateUserCommandHandler()
+            await handler(command=command, uow=fake_user_uow)
 
         async with fake_user_uow:
             user = await fake_user_uow.users.get(user_id=random_user_entity.id)
@@ -56,8 +59,8 @@ class TestCommandHandlers:
 
         command = DeleteUserCommand(user_id=random_user_entity.id)
         async with fake_consumer:
-            handler = DeleteUserCommandHandler(uow=fake_user_uow)
-            await handler(command=command)
+            handler = DeleteUserCommandHandler()
+            await handler(command=command, uow=fake_user_uow)
 
         with pytest.raises(UserNotFoundException):
             async with fake_user_uow:
@@ -79,8 +82,8 @@ class TestCommandHandlers:
             user_id=random_user_entity.id,
             status=new_status
         )
-        handler = UpdateUserCredentialsStatusCommandHandler(uow=fake_user_uow)
-        await handler(command=command)
+        handler = UpdateUserCredentialsStatusCommandHandler()
+        await handler(command=command, uow=fake_user_uow)
 
         async with fake_user_uow:
             user = await fake_user_uow.users.get(user_id=random_user_entity.id)
@@ -90,6 +93,28 @@ class TestCommandHandlers:
         assert user.credentials_status == new_status
 
 
+    async def test_update_user_credentials_status_many_command_handler(
+        self, random_user_entities, fake_user_uow
+    ):
+        async with fake_user_uow:
+            await fake_user_uow.users.add_many(random_user_entities)
+            await fake_user_uow.commit()
+
+        statuses = {user.id: UserCredentialsStatus.SUCCESS for user in random_user_entities[:3]}
+        command = UpdateUserCredentialsStatusManyCommand(statuses=statuses)
+        handler = UpdateUserCredentialsStatusManyCommandHandler()
+        await handler(command=command, uow=fake_user_uow)
+
+        assert fake_user_uow.committed
+        async with fake_user_uow:
+            users = await fake_user_uow.users.get_many(user.id for user in random_user_entities)
+
+        assert {user.id: user.credentials_status for user in users} == {
+            **{user.id: UserCredentialsStatus.PENDING for user in random_user_entities},
+            **statuses,
+        }
+
+
     async def test_update_user_photo_command_handler(
         self, random_user_entity, fake_user_uow
     ):
@@ -105,8 +130,8 @@ class TestCommandHandlers:
             user_id=random_user_entity.id,
             photo=new_photo,
         )
-        handler = UpdateUserPhotoCommandHandler(uow=fake_user_uow)
-        await handler(command=command)
+        handler = UpdateUserPhotoCommandHandler()
+        await handler(command=command, uow=fake_user_uow)
 
         async with fake_user_uow:
             user = await fake_user_uow.users.get(user_id=random_user_entity.id)
@@ -116,6 +141,27 @@ class TestCommandHandlers:
         assert user.photo == new_photo != old_photo
 
 
+    async def test_update_user_photo_command_handler_invalidates_presigned_urls(
+        self, random_user_entity, fake_user_uow
+    ):
+        async with fake_user_uow:
+            await fake_user_uow.users.add(random_user_entity)
+            await fake_user_uow.commit()
+
+        new_photo = 'new_photo.png'
+        presigned_url_cacher = FakePresignedURLCacher()
+        await presigned_url_cacher.add_to_cache(new_photo, 'image/png', 'https://stale.url', 3600)
+
+        command = UpdateUserPhotoCommand(
+            user_id=random_user_entity.id,
+            photo=new_photo,
+        )
+        handler = UpdateUserPhotoCommandHandler(presigned_url_cacher=presigned_url_cacher)
+        await handler(command=command, uow=fake_user_uow)
+
+        assert await presigned_url_cacher.get_from_cache(new_photo, 'image/png') is None
+
+
     async def test_update_user_email_command_handler(
         self, random_user_entity, fake_user_uow
     ):
@@ -129,8 +175,8 @@ class TestCommandHandlers:
             user_id=random_user_entity.id,
             new_email=new_email,
         )
-        handler = UpdateUserEmailCommandHandler(uow=fake_user_uow)
-        await handler(command=command)
+        handler = UpdateUserEmailCommandHandler()
+        await handler(command=command, uow=fake_user_uow)
         async with fake_user_uow:
             user = await fake_user_uow.users.get(user_id=random_user_entity.id)
         assert user.id == random_user_entity.id
@@ -150,8 +196,8 @@ class TestCommandHandlers:
             user_id=random_user_entity.id,
             new_phone_number=new_phone_number,
         )
-        handler = UpdateUserPhoneNumberCommandHandler(uow=fake_user_uow)
-        await handler(command=command)
+        handler = UpdateUserPhoneNumberCommandHandler()
+        await handler(command=command, uow=fake_user_uow)
         async with fake_user_uow:
             user = await fake_user_uow.users.get(user_id=random_user_entity.id)
         assert user is not None
@@ -1,10 +1,14 @@
-import pytest
+import asyncio
 import logging
+from dataclasses import dataclass, field
+
+import pytest
 
 from domain.commands.base import BaseCommand
 from domain.events.base import BaseEvent
 from service.handlers.command.base import BaseCommandHandler
 from service.handlers.event.base import BaseEventHandler
+from service.message_bus import EventDispatcher, HandlerTimings, MessageBus
 from contextlib import nullcontext as not_raises
 from service.exceptions.users import HandlerNotFoundException, WrongMessageBusMessageType
 
@@ -23,9 +27,40 @@ class SomeKnownEventEventHandler(BaseEventHandler):
         ...
 
 class SomeKnownCommandCommandHandler(BaseCommandHandler):
-    async def __call__(self, command: SomeKnownCommand) -> None:
+    async def __call__(self, command: SomeKnownCommand, uow) -> None:
         ...
 
+@dataclass
+class TrackingEventHandler(BaseEventHandler):
+    running: list = field(default_factory=list)
+    max_running: list = field(default_factory=lambda: [0])
+    fail: bool = False
+
+    async def __call__(self, event: SomeKnownEvent) -> None:
+        self.running.append(self)
+        self.max_running[0] = max(self.max_running[0], len(self.running))
+        await asyncio.sleep(0.01)
+        self.running.remove(self)
+        if self.fail:
+            raise RuntimeError('handler failed')
+
+class FailingEventHandler(TrackingEventHandler):
+    ...
+
+@dataclass
+class SomeUserEvent(BaseEvent):
+    user_id: int
+
+
+@dataclass
+class RecordingEventHandler(BaseEventHandler):
+    handled: list = field(default_factory=list)
+    release: asyncio.Event = field(default_factory=asyncio.Event)
+
+    async def __call__(self, event: SomeUserEvent) -> None:
+        await self.release.wait()
+        self.handled.append(event)
+
 class SomeUnknownEvent(BaseEvent):
     ...
 
@@ -53,3 +88,148 @@ class TestMessageBus:
         with expectation:
             await fake_message_bus.handle(message)
 
+
+
+    @pytest.mark.parametrize('concurrent', [False, True])
+    async def test_failing_event_handler_does_not_abort_others(self, fake_message_bus, concurrent):
+        running, max_running = [], [0]
+        handlers = [
+            FailingEventHandler(producer=None, topic=None, running=running, max_running=max_running, fail=True),
+            TrackingEventHandler(producer=None, topic=None, running=running, max_running=max_running),
+        ]
+        fake_message_bus.concurrent_event_handlers = concurrent
+        fake_message_bus.events_map = {SomeKnownEvent: handlers}
+
+        await fake_message_bus.handle(SomeKnownEvent())
+
+        assert fake_message_bus.handler_timings['FailingEventHandler'].calls == 1
+        assert fake_message_bus.handler_timings['FailingEventHandler'].failures == 1
+        assert fake_message_bus.handler_timings['TrackingEventHandler'].calls == 1
+        assert fake_message_bus.handler_timings['TrackingEventHandler'].failures == 0
+        assert fake_message_bus.handler_timings['TrackingEventHandler'].max_seconds > 0
+        assert max_running[0] == (2 if concurrent else 1)
+
+
+    async def test_concurrent_event_handlers_respect_limit(self, fake_user_uow):
+        running, max_running = [], [0]
+        bus = MessageBus(
+            uow=fake_user_uow,
+            events_map={
+                SomeKnownEvent: [
+                    TrackingEventHandler(producer=None, topic=None, running=running, max_running=max_running)
+                    for _ in range(6)
+                ],
+            },
+            concurrent_event_handlers=True,
+            max_concurrent_event_handlers=3,
+        )
+
+        await bus.handle(SomeKnownEvent())
+
+        assert max_running[0] == 3
+        assert bus.handler_timings['TrackingEventHandler'].calls == 6
+
+
+    async def test_handler_timings_outlive_the_bus(self, fake_user_uow):
+        handler_timings = HandlerTimings()
+        for _ in range(2):
+            bus = MessageBus(
+                uow=fake_user_uow,
+                events_map={SomeKnownEvent: [TrackingEventHandler(producer=None, topic=None)]},
+                handler_timings=handler_timings,
+            )
+            await bus.handle(SomeKnownEvent())
+
+        assert handler_timings['TrackingEventHandler'].calls == 2
+        assert handler_timings.stats()['TrackingEventHandler']['calls'] == 2
+
+
+def make_dispatcher(fake_user_uow, handler: RecordingEventHandler, **kwargs) -> EventDispatcher:
+    return EventDispatcher(
+        bus_factory=lambda: MessageBus(uow=fake_user_uow, events_map={SomeUserEvent: [handler]}),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+class TestEventDispatcher:
+    async def test_bus_returns_before_dispatched_events_are_handled(self, fake_user_uow):
+        handler = RecordingEventHandler(producer=None, topic=None)
+        dispatcher = make_dispatcher(fake_user_uow, handler, workers_count=2)
+        await dispatcher.start()
+        bus = MessageBus(uow=fake_user_uow, events_map={SomeUserEvent: [handler]}, dispatcher=dispatcher)
+
+        await bus.handle(SomeUserEvent(user_id=1))
+
+        assert handler.handled == []
+        assert dispatcher.queued + dispatcher.lag.calls <= 1
+        handler.release.set()
+        await dispatcher.stop()
+        assert len(handler.handled) == 1
+        assert dispatcher.stats()['dispatched'] == 1
+        assert dispatcher.stats()['lag_max_ms'] >= 0
+
+
+    async def test_events_of_one_user_keep_their_order(self, fake_user_uow):
+        handler = RecordingEventHandler(producer=None, topic=None)
+        handler.release.set()
+        dispatcher = make_dispatcher(fake_user_uow, handler, workers_count=4)
+        await dispatcher.start()
+
+        events = [SomeUserEvent(user_id=user_id) for _ in range(10) for user_id in range(3)]
+        for event in events:
+            await dispatcher.dispatch(event)
+        await dispatcher.stop()
+
+        for user_id in range(3):
+            assert [event for event in handler.handled if event.user_id == user_id] == \
+                [event for event in events if event.user_id == user_id]
+
+
+    async def test_full_queue_makes_the_caller_wait(self, fake_user_uow):
+        handler = RecordingEventHandler(producer=None, topic=None)
+        dispatcher = make_dispatcher(fake_user_uow, handler, workers_count=1, queue_size=1)
+        await dispatcher.start()
+
+        await dispatcher.dispatch(SomeUserEvent(user_id=1))
+        await asyncio.sleep(0)
+        await dispatcher.dispatch(SomeUserEvent(user_id=1))
+        blocked = asyncio.create_task(dispatcher.dispatch(SomeUserEvent(user_id=1)))
+        await asyncio.sleep(0.01)
+
+        assert not blocked.done()
+        assert dispatcher.blocked == 1
+        handler.release.set()
+        await blocked
+        await dispatcher.stop()
+        assert len(handler.handled) == 3
+
+
+    async def test_stop_drains_the_queue_then_handles_inline(self, fake_user_uow):
+        handler = RecordingEventHandler(producer=None, topic=None)
+        dispatcher = make_dispatcher(fake_user_uow, handler, workers_count=2)
+        await dispatcher.start()
+        for user_id in range(5):
+            await dispatcher.dispatch(SomeUserEvent(user_id=user_id))
+
+        handler.release.set()
+        await dispatcher.stop()
+        assert len(handler.handled) == 5
+        assert dispatcher.queued == 0
+
+        await dispatcher.dispatch(SomeUserEvent(user_id=1))
+        assert len(handler.handled) == 6
+
+
+    async def test_stop_gives_up_after_timeout(self, fake_user_uow):
+        handler = RecordingEventHandler(producer=None, topic=None)
+        dispatcher = make_dispatcher(fake_user_uow, handler, workers_count=1, shutdown_timeout_seconds=0.01)
+        await dispatcher.start()
+        await dispatcher.dispatch(SomeUserEvent(user_id=1))
+        workers = dispatcher.workers
+
+        await dispatcher.stop()
+
+        assert handler.handled == []
+        assert all(worker.done() for worker in workers)
+
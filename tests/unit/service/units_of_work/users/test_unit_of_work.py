@@ -0,0 +1,35 @@
+import pytest
+
+from domain.events.users import UserDeletedEvent
+
+
+@pytest.mark.asyncio
+class TestUnitOfWork:
+    async def test_collect_new_event_only_returns_registered_events(self, random_user_entities, fake_user_uow):
+        async with fake_user_uow:
+            await fake_user_uow.users.add_many(random_user_entities)
+            await fake_user_uow.commit()
+
+        first, second = random_user_entities[0], random_user_entities[1]
+        fake_user_uow.users.register_events(first, [UserDeletedEvent(user_id=first.id)])
+        fake_user_uow.users.register_events(second, [UserDeletedEvent(user_id=second.id)])
+        fake_user_uow.users.register_events(first, [UserDeletedEvent(user_id=first.id)])
+
+        events = list(fake_user_uow.collect_new_event())
+
+        assert [event.user_id for event in events] == [first.id, first.id, second.id]
+        assert not first.events
+        assert not second.events
+        assert not fake_user_uow.users.users_with_events
+        assert list(fake_user_uow.collect_new_event()) == []
+
+
+    async def test_collect_new_event_ignores_unregistered_users(self, random_user_entity, fake_user_uow):
+        async with fake_user_uow:
+            await fake_user_uow.users.add(random_user_entity)
+            await fake_user_uow.commit()
+
+        random_user_entity.events.append(UserDeletedEvent(user_id=random_user_entity.id))
+
+        assert list(fake_user_uow.collect_new_event()) == []
+        assert len(random_user_entity.events) == 1
@@ -0,0 +1,56 @@
+from infrastructure.outbox.base import BaseOutboxRelay
+from infrastructure.producers.base import BaseProducer
+from infrastructure.producers.rabbitmq import RabbitMQProducer
+from infrastructure.producers.spool import SpoolingProducer
+from service.message_bus import EventDispatcher, EventsMap, MessageBus
+from service.units_of_work.users.base import BaseUserUnitOfWork
+from settings.container import initialize_container
+
+
+def test_message_bus_shares_dispatch_tables():
+    container = initialize_container()
+
+    first = container.resolve(MessageBus)
+    second = container.resolve(MessageBus)
+
+    assert first is not second
+    assert first.uow is not second.uow
+    assert first.commands_map is second.commands_map
+    assert first.events_map is second.events_map
+
+
+def test_message_buses_share_handler_timings():
+    container = initialize_container()
+
+    assert container.resolve(MessageBus).handler_timings is container.resolve(MessageBus).handler_timings
+
+
+def test_unit_of_work_writes_events_to_outbox():
+    container = initialize_container()
+    uow = container.resolve(BaseUserUnitOfWork)
+
+    assert set(uow.outbox_topics) == set(container.resolve(EventsMap))
+    assert uow.on_outbox_written == container.resolve(BaseOutboxRelay).wake
+
+
+def test_event_dispatcher_workers_handle_events_themselves():
+    container = initialize_container()
+    dispatcher = container.resolve(EventDispatcher)
+
+    assert dispatcher is container.resolve(EventDispatcher)
+    assert dispatcher.bus_factory().dispatcher is None
+
+
+def test_producer_spools_behind_a_circuit_breaker():
+    producer = initialize_container().resolve(BaseProducer)
+
+    assert isinstance(producer, SpoolingProducer)
+    assert isinstance(producer.producer, RabbitMQProducer)
+
+
+def test_outbox_relay_publishes_without_spooling():
+    container = initialize_container()
+    relay = container.resolve(BaseOutboxRelay)
+
+    assert relay.producer is container.resolve(RabbitMQProducer)
+    assert relay.producer is container.resolve(BaseProducer).producer